@@ -10,6 +10,7 @@ import { useE2E } from "../context/E2EContext";
 import { useWebSocket } from "../hooks/useWebSocket";
 import axios from "axios";
 import { getDisplayName } from "../utils/userUtils";
+import { markAsReadRoute } from "../utils/APIRoutes";
 import { generateAESKeyAndIV, encryptMessageWithAES, encryptAESKeyWithRSA } from "../utils/Encryption";
 import { decryptPrivateKey, decryptAESKeyWithPrivateKey, decryptMessageWithAES } from "../utils/Decryption";
 import forge from "node-forge";
@@ -103,6 +104,12 @@ export default function ChatWindow({ chatId }: ChatWindowProps) {
         });
         setChatInfo(response.data);
         console.log("Chat info loaded:", response.data);
+        // opening the chat reads it
+        axios.post(markAsReadRoute(chatId), null, {
+          headers: {
+            'Authorization': `Bearer ${token}`
+          }
+        }).catch((error) => console.error("Error marking chat as read:", error));
       } catch (error) {
         console.error("Error loading chat info:", error);
         setChatInfo(null);
@@ -12,6 +12,7 @@ import { useAuth } from "../context/AuthContext";
 import { useE2E } from "../context/E2EContext";
 import { useChat } from "../context/ChatContext";
 import { decryptAESKeyWithPrivateKey, decryptMessageWithAES, decryptPrivateKey } from "../utils/Decryption";
+import { getInboxRoute } from "../utils/APIRoutes";
 
 interface SidebarProps {
   selectedChat: string | null
@@ -100,55 +101,42 @@ export default function Sidebar({ selectedChat, onSelectChat }: SidebarProps) {
     try {
       setIsLoadingChats(true);
       console.log("Loading chats with E2E decryption...");
-      const response = await axios.get("http://localhost:8000/chat/private/all/");
-      const chatData = response.data;
+      // previews, unread counts and recipient profiles, one page at a time
+      // until the server reports no further page
+      const entries: any[] = [];
+      let cursor: string | null = null;
+      do {
+        const params: Record<string, string | number> = { limit: 100 };
+        if (cursor) params.before = cursor;
+        const response = await axios.get(getInboxRoute, { params });
+        entries.push(...response.data.entries);
+        cursor = response.data.next_cursor;
+      } while (cursor);
 
-      const transformedChats = await Promise.all(
-        chatData.map(async (chat: any) => {
-          try {
-            const chatInfoResponse = await axios.get(`http://localhost:8000/chat/private/info/${chat.chat_id}`)
-            const chatInfo = chatInfoResponse.data
+      const transformedChats = entries.map((entry: any) => {
+        const lastMessage = entry.last_message;
 
-            const lastMessage = chat.messages?.length > 0 
-              ? chat.messages[chat.messages.length - 1]
-              : null;
+        // Check if we have a more recent message from context
+        const contextLastMessage = lastMessages[entry.chat_id];
+        const useContextMessage = contextLastMessage && lastMessage &&
+          new Date(contextLastMessage.created_at) > new Date(lastMessage.created_at);
 
-            // Check if we have a more recent message from context
-            const contextLastMessage = lastMessages[chat.chat_id];
-            const useContextMessage = contextLastMessage && lastMessage && 
-              new Date(contextLastMessage.created_at) > new Date(lastMessage.created_at);
+        const finalLastMessage = useContextMessage ? contextLastMessage.message :
+          (lastMessage ? decryptLastMessage(lastMessage) : "No messages yet");
 
-            const finalLastMessage = useContextMessage ? contextLastMessage.message : 
-              (lastMessage ? decryptLastMessage(lastMessage) : "No messages yet");
+        const finalTimestamp = useContextMessage ? contextLastMessage.timestamp :
+          (lastMessage ? new Date(lastMessage.created_at).toLocaleTimeString() : "Just now");
 
-            const finalTimestamp = useContextMessage ? contextLastMessage.timestamp :
-              (chat.messages?.length > 0
-                ? new Date(chat.messages[chat.messages.length - 1].created_at).toLocaleTimeString()
-                : "Just now");
-
-            return {
-              id: chat.chat_id,
-              name: getDisplayName(chatInfo.recipient_profile),
-              lastMessage: finalLastMessage,
-              timestamp: finalTimestamp,
-              unreadCount: 0,
-              avatar: chatInfo.recipient_profile?.avatar || "/original_user_image.jpg?height=40&width=40",
-              isOnline: chatInfo.recipient_profile?.is_online || false,
-            }
-          } catch (error) {
-            console.error("Error loading chat info:", error)
-            return {
-              id: chat.chat_id,
-              name: 'Unknown User',
-              lastMessage: "No messages yet",
-              timestamp: "Just now",
-              unreadCount: 0,
-              avatar: "/original_user_image.jpg?height=40&width=40",
-              isOnline: false,
-            }
-          }
-        })
-      );
+        return {
+          id: entry.chat_id,
+          name: getDisplayName(entry.recipient_profile),
+          lastMessage: finalLastMessage,
+          timestamp: finalTimestamp,
+          unreadCount: entry.chat_id === selectedChat ? 0 : entry.unread_count,
+          avatar: entry.recipient_profile?.avatar || "/original_user_image.jpg?height=40&width=40",
+          isOnline: entry.recipient_profile?.is_online || false,
+        }
+      });
 
       setChats(transformedChats);
     } catch (error) {
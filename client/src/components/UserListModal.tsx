@@ -4,6 +4,7 @@ import { useState, useEffect, useRef } from "react";
 import { X, Search, Loader2, AlertCircle } from "lucide-react";
 import axios from "axios";
 import { getDisplayName } from "../utils/userUtils";
+import { searchUsersRoute } from "../utils/APIRoutes";
 
 interface User {
   id: string
@@ -28,19 +29,27 @@ export default function UserListModal({ isOpen, onClose, onSelectUser }: UserLis
   const [loading, setLoading] = useState(false)
   const [error, setError] = useState<string | null>(null)
   const [creatingChat, setCreatingChat] = useState<string | null>(null)
+  const [nextCursor, setNextCursor] = useState<string | null>(null)
+  const [loadingMore, setLoadingMore] = useState(false)
 
+  // search on the server by username prefix, debounced while typing
   useEffect(() => {
-    if (isOpen) {
+    if (!isOpen) return;
+    const timeoutId = setTimeout(() => {
       fetchUsers();
-    }
-  }, [isOpen]);
+    }, 250);
+    return () => clearTimeout(timeoutId);
+  }, [isOpen, searchQuery]);
 
   const fetchUsers = async () => {
     setLoading(true);
     setError(null);
     try {
-      const response = await axios.get('http://localhost:8000/users/all')
-      setUsers(response.data)
+      const response = await axios.get(searchUsersRoute, {
+        params: { q: searchQuery.trim() || undefined }
+      })
+      setUsers(response.data.users)
+      setNextCursor(response.data.next_cursor)
     } catch (err) {
       console.error("Error fetching users:", err)
       setError("Failed to load users. Please try again.")
@@ -49,6 +58,22 @@ export default function UserListModal({ isOpen, onClose, onSelectUser }: UserLis
     }
   };
 
+  const fetchMoreUsers = async () => {
+    if (!nextCursor || loadingMore) return;
+    setLoadingMore(true);
+    try {
+      const response = await axios.get(searchUsersRoute, {
+        params: { q: searchQuery.trim() || undefined, after: nextCursor }
+      })
+      setUsers((previous) => [...previous, ...response.data.users])
+      setNextCursor(response.data.next_cursor)
+    } catch (err) {
+      console.error("Error fetching more users:", err)
+    } finally {
+      setLoadingMore(false)
+    }
+  };
+
   const handleUserSelect = async (user: User) => {
     if (creatingChat) return; // Prevent multiple clicks
     
@@ -81,16 +106,7 @@ export default function UserListModal({ isOpen, onClose, onSelectUser }: UserLis
     }
   };
 
-  const filteredUsers = users.filter((user) => {
-    const displayName = getDisplayName(user)
-    const searchLower = searchQuery.toLowerCase()
-
-    return (
-      displayName.toLowerCase().includes(searchLower) ||
-      user.username.toLowerCase().includes(searchLower) ||
-      user.email.toLowerCase().includes(searchLower)
-    )
-  })
+  const filteredUsers = users
 
   // Close modal when clicking outside
   useEffect(() => {
@@ -176,7 +192,16 @@ export default function UserListModal({ isOpen, onClose, onSelectUser }: UserLis
                   </div>
                 )}
               </div>
-            ))
+            )).concat(nextCursor ? [
+              <button
+                key="load-more"
+                onClick={fetchMoreUsers}
+                className="retry-button"
+                disabled={loadingMore}
+              >
+                {loadingMore ? "Loading..." : "Load more"}
+              </button>
+            ] : [])
           ) : (
             <div className="no-results">
               {searchQuery ? "No users found matching your search" : "No users available"}
@@ -4,6 +4,9 @@ import { useState, useEffect, useRef } from "react";
 import axios from "axios";
 import { useChat } from "../context/ChatContext";
 
+// must stay well under the server's PRESENCE_HEARTBEAT_TIMEOUT
+const HEARTBEAT_INTERVAL_MS = 30000;
+
 interface Message {
   id: string;
   message: string;
@@ -41,6 +44,7 @@ export const useWebSocket = ({
   const [connectionError, setConnectionError] = useState<string | null>(null);
   const [isLoadingMessages, setIsLoadingMessages] = useState(false);
   const wsRef = useRef<WebSocket | null>(null);
+  const heartbeatRef = useRef<ReturnType<typeof setInterval> | null>(null);
   const { updateLastMessage } = useChat();
 
   const loadOldMessages = async (currentChatId: string) => {
@@ -77,7 +81,7 @@ export const useWebSocket = ({
 
       // Decrypt messages
       const decryptedMessages = await Promise.all(
-        response.data.map(async (msg: Message) => {
+        response.data.messages.map(async (msg: Message) => {
           try {
             const encryptedKey = msg.created_by === user.id
               ? msg.encrypted_key_sender
@@ -141,13 +145,37 @@ export const useWebSocket = ({
         setIsConnected(true);
         setConnectionError(null);
 
+        // keep the server's presence heartbeat alive while the chat is open
+        if (heartbeatRef.current) clearInterval(heartbeatRef.current);
+        heartbeatRef.current = setInterval(() => {
+          if (websocket.readyState === WebSocket.OPEN) {
+            websocket.send(JSON.stringify({ type: "ping" }));
+          }
+        }, HEARTBEAT_INTERVAL_MS);
+
         loadOldMessages(chatId);
       };
 
       websocket.onmessage = (event) => {
         try {
           const data = JSON.parse(event.data);
-          
+
+          // control frames (presence, ...) are not chat messages
+          if (data.type) {
+            return;
+          }
+
+          // the chat is open, so the other member's message is read;
+          // the server coalesces these acks into a watermark
+          if (data.created_by !== user?.id && data.id && data.created_at) {
+            websocket.send(JSON.stringify({
+              type: "receipt",
+              kind: "read",
+              message_id: data.id,
+              created_at: data.created_at,
+            }));
+          }
+
           // Decrypt the incoming message
           if (!user?.private_key_pem || !EE2EInput) {
             console.warn("Missing encryption data for incoming message");
@@ -220,6 +248,10 @@ export const useWebSocket = ({
       };
 
       websocket.onclose = () => {
+        if (heartbeatRef.current) {
+          clearInterval(heartbeatRef.current);
+          heartbeatRef.current = null;
+        }
         console.log("WebSocket disconnected");
         setIsConnected(false);
       };
@@ -10,11 +10,12 @@ export const resetPasswordRoute = `${host}/auth/reset-password`;
 export const changePasswordRoute = `${host}/auth/change-password`;
 
 // User endpoints
-export const getUsersRoute = `${host}/users/all`;
+export const searchUsersRoute = `${host}/users`;
 export const getMeRoute = `${host}/users/me`;
 
 // Chat endpoints
 export const getAllChatsRoute = `${host}/chat/private/all/`;
+export const getInboxRoute = `${host}/chat/private/inbox`;
 export const getChatInfoRoute = (chatId: string) => `${host}/chat/private/info/${chatId}`;
 export const getRecipientChatRoute = (recipientId: string) => `${host}/chat/private/recipient/chat-id/${recipientId}`;
 export const createChatRoute = (recipientId: string) => `${host}/chat/private/recipient/create-chat/${recipientId}`;
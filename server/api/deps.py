@@ -4,6 +4,7 @@ from jose import JWTError, jwt
 from pydantic import ValidationError
 
 from crud.chat import PrivateChatManager
+from crud.group import GroupChatManager
 from service.token import TokenManager
 from crud.user import User
 from database import get_db
@@ -33,10 +34,10 @@ async def get_token_manager(
 async def get_current_user(
     token: str = Depends(oauth2_scheme),
     token_manager: TokenManager = Depends(get_token_manager),
-) -> schemas.User:
+) -> schemas.UserAuth:
     """
-    Decode the JWT, fetch the User document via Beanie,
-    and return it (minus sensitive fields).
+    Decode the JWT and return the slim auth view of the user
+    (id, username, roles, flags, token_version).
     """
     
     user_data = await token_manager.get_user_form_jwt_token(token, "id")
@@ -44,7 +45,7 @@ async def get_current_user(
         raise credentials_exception
     
     try:
-        return schemas.User(**user_data)
+        return schemas.UserAuth(**user_data)
     except ValidationError:
         raise HTTPException(status.HTTP_401_UNAUTHORIZED, "Invalid user data")
 
@@ -53,8 +54,8 @@ async def get_current_user(
 
 
 async def get_current_active_user(
-        current_user: schemas.User = Depends(get_current_user)
-) -> schemas.User:
+        current_user: schemas.UserAuth = Depends(get_current_user)
+) -> schemas.UserAuth:
 
     if not current_user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
@@ -62,7 +63,7 @@ async def get_current_active_user(
 
 def requires_role(*allowed_roles: str):
     async def role_checker(
-            current_user: schemas.User = Depends(get_current_user)):
+            current_user: schemas.UserAuth = Depends(get_current_user)):
         if not any(role in current_user.roles for role in allowed_roles):
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
@@ -75,4 +76,10 @@ async def get_private_chat_manager(
     db: AsyncIOMotorDatabase = Depends(get_db),
     user_manager: User = Depends(get_user_manager)
 ):
-    return PrivateChatManager(db, user_manager)
\ No newline at end of file
+    return PrivateChatManager(db, user_manager)
+
+async def get_group_chat_manager(
+    db: AsyncIOMotorDatabase = Depends(get_db),
+    user_manager: User = Depends(get_user_manager)
+):
+    return GroupChatManager(db, user_manager)
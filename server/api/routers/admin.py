@@ -0,0 +1,86 @@
+from typing import Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import PlainTextResponse
+from api.deps import requires_role
+from service.connections import connections
+from core.security import password_hasher
+from core.compression import compression_stats
+from core.profiler import ProfilerBusyError, profiler, task_summary
+from config import settings
+from service.user_cache import user_cache
+from service.membership_cache import membership_cache
+import schemas
+
+router = APIRouter(prefix='/admin', tags=["Admin"])
+
+
+@router.get('/ws/stats')
+async def get_websocket_stats(
+    _: schemas.UserAuth = Depends(requires_role("admin")),
+):
+    """Send-queue depth and drop counters for this worker's WebSockets."""
+    return connections.stats()
+
+
+@router.get('/cache/stats')
+async def get_cache_stats(
+    _: schemas.UserAuth = Depends(requires_role("admin")),
+):
+    """Hit/miss counters for this worker's caches."""
+    return {
+        'users': user_cache.stats(),
+        'chat_membership': membership_cache.stats(),
+    }
+
+
+
+@router.get('/hashing/stats')
+async def get_hashing_stats(
+    _: schemas.UserAuth = Depends(requires_role("admin")),
+):
+    """Queue depth, rejections and per-operation bcrypt latency."""
+    return password_hasher.stats()
+
+
+@router.get('/compression/stats')
+async def get_compression_stats(
+    _: schemas.UserAuth = Depends(requires_role("admin")),
+):
+    """Per-route bytes in/out and compression CPU time, HTTP and WebSocket."""
+    return compression_stats.stats()
+
+
+@router.get('/profile')
+async def profile_worker(
+    duration: float = Query(5.0, gt=0, le=settings.PROFILER_MAX_DURATION),
+    interval: float = Query(settings.PROFILER_INTERVAL, ge=0.001, le=1.0),
+    format: Literal['json', 'collapsed'] = 'json',
+    _: schemas.UserAuth = Depends(requires_role("admin")),
+):
+    """
+    Sample this worker's event loop for `duration` seconds. `json` reports
+    loop busy ratio, the coroutines holding the loop longest and pending
+    tasks; `collapsed` returns the stacks for flamegraph.pl or speedscope.
+    """
+    try:
+        report = await profiler.profile(duration, interval)
+    except ProfilerBusyError:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="A profile is already running on this worker.",
+        )
+    if format == 'collapsed':
+        return PlainTextResponse(
+            report['collapsed'],
+            headers={'Content-Disposition': 'attachment; filename="profile.collapsed"'},
+        )
+    return report
+
+
+@router.get('/tasks')
+async def get_task_summary(
+    _: schemas.UserAuth = Depends(requires_role("admin")),
+):
+    """Pending asyncio tasks on this worker, grouped by coroutine."""
+    return task_summary()
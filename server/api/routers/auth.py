@@ -1,3 +1,4 @@
+import logging
 from typing import Any
 from fastapi import APIRouter, Depends, HTTPException, Request, status, BackgroundTasks
 from fastapi.security import OAuth2PasswordRequestForm
@@ -15,21 +16,20 @@ import schemas
 from crud.user import User
 from core.security import (
     create_password_reset_token,
-    verify_password,
-    get_password_hash,
+    password_hasher,
 )
 from .auth_utils import create_password_reset_token
 from core.email import send_reset_email
 from schemas import UserUpdate, UserUpdateToken
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(
     prefix="/auth",
     tags=["auth"],
 )
 
-from slowapi import Limiter
-from slowapi.util import get_remote_address
-limiter = Limiter(key_func=get_remote_address)
+from service.rate_limit import limiter
 
 @router.post("/login", response_model=schemas.Token)
 @limiter.limit("5/minute")  
@@ -48,8 +48,8 @@ async def login_for_access_token(
     subject = str(user['_id'])
     """
         Here we use id for further access token generation.
+        Online status follows WebSocket presence, not logins.
     """
-    await user_manager.update_online_status(subject, True)
 
     access_token = await token_manager.get_jwt_access_token(subject)
     refresh_token = await token_manager.get_jwt_refresh_token(subject)
@@ -115,19 +115,19 @@ async def reset_password(
         raise HTTPException(400, "Invalid or expired token")
 
     # fetch user
-    user = await user_manager.get_by_id(token_doc["user_id"])
+    user = await user_manager.get_credentials_by_id(token_doc["user_id"])
     if not user:
         raise HTTPException(404, "User not found")
 
     # forbid same‐as‐old
-    if verify_password(req.new_password, user.get('password')):
+    if await password_hasher.verify(req.new_password, user.get('password')):
         raise HTTPException(
             status_code=400,
             detail="New password must be different from your current password"
         )
 
     # hash & update
-    hashed = get_password_hash(req.new_password)
+    hashed = await password_hasher.hash(req.new_password)
     updated = UserUpdate(id=user["id"], password=hashed)
     await user_manager.update_user(updated)
 
@@ -141,13 +141,11 @@ async def reset_password(
 
 @router.post("/logout")
 async def logout(
-    current_user: schemas.User = Depends(get_current_active_user),
+    current_user: schemas.UserAuth = Depends(get_current_active_user),
     user_manager: User = Depends(get_user_manager),
     ):
-    await user_manager.update_online_status(current_user.id, False)
-    
     # Lấy user hiện tại để biết token_version
-    user = await user_manager.get_by_id(current_user.id)
+    user = await user_manager.get_auth_by_id(current_user.id)
     
     # Tạo đối tượng UserUpdate với token_version tăng lên
     updated_data = UserUpdateToken(
@@ -156,7 +154,7 @@ async def logout(
     )
     
     # Cập nhật user với token_version mới
-    print("[DEBUG] Logging out user:", current_user.id)
+    logger.debug('Logging out user %s', current_user.id)
     await user_manager.update_user(updated_data)
     
     return {"msg": "Logged out and revoked prior tokens"}
@@ -167,30 +165,30 @@ async def logout(
 async def change_password(
     request: Request,
     req: schemas.ChangePasswordRequest,
-    current_user: schemas.User = Depends(get_current_active_user),
+    current_user: schemas.UserAuth = Depends(get_current_active_user),
     user_manager: User = Depends(get_user_manager),
 ):
     # Get current user data
-    user = await user_manager.get_by_id(current_user.id)
+    user = await user_manager.get_credentials_by_id(current_user.id)
     if not user:
         raise HTTPException(404, "User not found")
     
     # Verify current password
-    if not verify_password(req.current_password, user.get('password')):
+    if not await password_hasher.verify(req.current_password, user.get('password')):
         raise HTTPException(
             status_code=400,
             detail="Current password is incorrect"
         )
     
     # Check if new password is different from current
-    if verify_password(req.new_password, user.get('password')):
+    if await password_hasher.verify(req.new_password, user.get('password')):
         raise HTTPException(
             status_code=400,
             detail="New password must be different from your current password"
         )
     
     # Hash and update password
-    hashed_password = get_password_hash(req.new_password)
+    hashed_password = await password_hasher.hash(req.new_password)
     updated = UserUpdate(id=current_user.id, password=hashed_password)
     await user_manager.update_user(updated)
     
@@ -1,24 +1,37 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Path
+import logging
+from typing import AsyncIterator
+from fastapi import APIRouter, Depends, HTTPException, status, Path, Query
 from api.deps import (
     get_current_active_user,
     get_private_chat_manager
 )
 from serializers.chat_serializers import message_serializer
 from schemas import shared
-from crud.chat import PrivateChatManager
+from crud.chat import ChatNotFoundException, PrivateChatManager
+from crud.inbox import decode_inbox_cursor
+from crud.message import decode_cursor
+from config import settings
+from core.codec import ORJSONResponse, StreamingJSONResponse
+from service.receipts import receipts
 import schemas
-from pydantic import constr
-from schemas.user import ObjectIdStr, User
+from schemas.user import ObjectIdStr
 from schemas.chat import ChatCreationResponse, PrivateChatResponse
-router = APIRouter(prefix='/chat', tags=["Chat"])
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(
+    prefix='/chat',
+    tags=["Chat"],
+    default_response_class=ORJSONResponse,
+)
 
 async def verify_chat_participant(
     chat_id: ObjectIdStr = Path(...),
     current_user=Depends(get_current_active_user),
     pvt_chat_manager: PrivateChatManager = Depends(get_private_chat_manager),
 ) -> shared.PrivateChatResponseWithRecipient:
-    # 1) load the chat
-    chat = await pvt_chat_manager.get_chat_by_id(chat_id)
+    # 1) load the chat's members (cached)
+    chat = await pvt_chat_manager.get_chat_membership(chat_id)
     # 2) membership check
     if current_user.id not in chat["member_ids"]:
         raise HTTPException(
@@ -34,10 +47,39 @@ async def verify_chat_participant(
     return shared.PrivateChatResponseWithRecipient(**chat)
 
 
+async def serialize_messages(messages: AsyncIterator[dict]) -> AsyncIterator[dict]:
+    async for message in messages:
+        yield message_serializer(message)
+
+
+async def serialize_chats(chats: AsyncIterator[dict]) -> AsyncIterator[dict]:
+    async for chat in chats:
+        chat['messages'] = [message_serializer(msg) for msg in chat['messages']]
+        yield chat
+
+
+async def message_page_params(
+    before: str | None = Query(None, description="Cursor: page of messages older than it"),
+    after: str | None = Query(None, description="Cursor: page of messages newer than it"),
+    limit: int = Query(settings.MESSAGE_PAGE_SIZE, ge=1, le=settings.MESSAGE_PAGE_SIZE_MAX),
+) -> tuple[schemas.MessageCursor | None, int]:
+    if before and after:
+        raise HTTPException(
+            status.HTTP_400_BAD_REQUEST,
+            detail="Use either 'before' or 'after', not both."
+        )
+    cursor = None
+    if before:
+        cursor = decode_cursor(before, 'before')
+    elif after:
+        cursor = decode_cursor(after, 'after')
+    return cursor, limit
+
+
 @router.get('/private/msg-recipients/', response_model=list[schemas.MessageRecipient])
 async def get_all_private_message_recipients(
     pvt_chat_manager: PrivateChatManager = Depends(get_private_chat_manager),
-    current_user: schemas.User = Depends(get_current_active_user)
+    current_user: schemas.UserAuth = Depends(get_current_active_user)
 ):
     return await pvt_chat_manager.get_all_msg_recipients(current_user.id)
 
@@ -49,14 +91,11 @@ async def get_private_chat(
     pvt_chat_manager: PrivateChatManager = Depends(get_private_chat_manager),
 
 ):
-    if chat.messages:
-        chat.messages = [message_serializer(msg) for msg in chat.messages]
-
-    recipient_profile = await pvt_chat_manager.get_recipient_profile(
-        chat.member_ids, chat.user_id
-    )
-    chat.recipient_profile = recipient_profile
-
+    # metadata plus the latest page only; older pages come from /private/messages
+    page = await pvt_chat_manager.get_chat_messages(chat.chat_id)
+    chat.messages = [message_serializer(msg) for msg in page['messages']]
+    chat.next_cursor = page['next_cursor']
+    # recipient_profile was already resolved by verify_chat_participant
     return chat
 
 
@@ -65,7 +104,7 @@ async def get_private_chat(
 async def get_recipient_chat_id(
     recipient_id: ObjectIdStr = Path(...),
     pvt_chat_manager: PrivateChatManager = Depends(get_private_chat_manager),
-    current_user: schemas.User = Depends(get_current_active_user)
+    current_user: schemas.UserAuth = Depends(get_current_active_user)
 ):
     try:
         return await pvt_chat_manager.get_recepient(current_user.id, recipient_id)
@@ -73,13 +112,70 @@ async def get_recipient_chat_id(
         raise e
     
 
+@router.get('/private/inbox', response_model=shared.InboxPage)
+async def get_private_inbox(
+    before: str | None = Query(None, description="Cursor: entries with older activity than it"),
+    limit: int = Query(settings.INBOX_PAGE_SIZE, ge=1, le=settings.INBOX_PAGE_SIZE_MAX),
+    pvt_chat_manager: PrivateChatManager = Depends(get_private_chat_manager),
+    current_user: schemas.UserAuth = Depends(get_current_active_user)
+):
+    # one call for the whole chat list: previews, unread counts and recipients
+    cursor = decode_inbox_cursor(before) if before else None
+    page = await pvt_chat_manager.get_inbox(current_user.id, cursor, limit)
+    for entry in page['entries']:
+        if entry.get('last_message'):
+            entry['last_message'] = message_serializer(entry['last_message'])
+    return page
+
+
+@router.post('/private/{chat_id}/mark-read', response_model=schemas.UnreadCount)
+async def mark_private_chat_read(
+    chat_id: str = Path(...),
+    pvt_chat_manager: PrivateChatManager = Depends(get_private_chat_manager),
+    current_user: schemas.UserAuth = Depends(get_current_active_user)
+):
+    # only members have an inbox entry, so the write doubles as the check
+    try:
+        await pvt_chat_manager.mark_read(current_user.id, chat_id)
+    except ChatNotFoundException:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, detail="Chat not found.")
+    return schemas.UnreadCount(chat_id=chat_id, unread_count=0)
+
+
+@router.get('/private/{chat_id}/unread-count', response_model=schemas.UnreadCount)
+async def get_private_chat_unread_count(
+    chat_id: str = Path(...),
+    pvt_chat_manager: PrivateChatManager = Depends(get_private_chat_manager),
+    current_user: schemas.UserAuth = Depends(get_current_active_user)
+):
+    try:
+        unread_count = await pvt_chat_manager.get_unread_count(current_user.id, chat_id)
+    except ChatNotFoundException:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, detail="Chat not found.")
+    return schemas.UnreadCount(chat_id=chat_id, unread_count=unread_count)
+
+
+@router.get('/private/{chat_id}/receipts', response_model=schemas.ReceiptPage)
+async def get_private_chat_receipts(
+    chat: shared.PrivateChatResponseWithRecipient = Depends(verify_chat_participant),
+):
+    """Both members' delivery and read watermarks."""
+    return await receipts.get_receipts(chat.chat_id)
+
+
 @router.get('/private/all/',
             response_model=list[schemas.PrivateChatResponse])
 async def get_all_private_chats(
     pvt_chat_manager: PrivateChatManager = Depends(get_private_chat_manager),
-    current_user: schemas.User = Depends(get_current_active_user)
+    current_user: schemas.UserAuth = Depends(get_current_active_user)
 ):
-    return await pvt_chat_manager.get_all_chats(current_user.id)
+    # streamed: the number of chats is unbounded. Anything that can fail
+    # (e.g. an unknown user) happens before the first byte is sent.
+    recipients = await pvt_chat_manager.get_all_msg_recipients(current_user.id)
+    chat_ids = [recipient['chat_id'] for recipient in recipients]
+    return StreamingJSONResponse(
+        serialize_chats(pvt_chat_manager.iter_chats_from_ids(chat_ids))
+    )
 
 
 @router.get(
@@ -90,7 +186,7 @@ async def get_all_private_chats(
 async def create_private_chat(
     recipient_id: str,
     mgr: PrivateChatManager = Depends(get_private_chat_manager),
-    current_user: User = Depends(get_current_active_user),
+    current_user: schemas.UserAuth = Depends(get_current_active_user),
 ):
     try:
         # 1) Try to find an existing chat
@@ -112,18 +208,34 @@ async def create_private_chat(
             chat=new_chat_schema
         )
     except Exception as e:
-        print(f"Error in create_private_chat: {e}")
+        logger.exception('Error in create_private_chat')
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to create or find chat: {str(e)}"
         )
 
 @router.get('/private/messages/{chat_id}',
-            response_model=list[schemas.Message])
+            response_model=schemas.MessagePage)
 async def get_private_messages(
     chat: shared.PrivateChatResponseWithRecipient = Depends(verify_chat_participant),
+    page_params: tuple = Depends(message_page_params),
     pvt_chat_manager: PrivateChatManager = Depends(get_private_chat_manager),
 ):
-    return await pvt_chat_manager.get_chat_messages(chat.chat_id)
+    cursor, limit = page_params
+    page = await pvt_chat_manager.get_chat_messages(chat.chat_id, cursor, limit)
+    page['messages'] = [message_serializer(msg) for msg in page['messages']]
+    return page
+
+
+@router.get('/private/messages/{chat_id}/export',
+            response_model=list[schemas.Message])
+async def export_private_messages(
+    chat: shared.PrivateChatResponseWithRecipient = Depends(verify_chat_participant),
+    pvt_chat_manager: PrivateChatManager = Depends(get_private_chat_manager),
+):
+    """The whole history, oldest first, streamed in cursor batches."""
+    return StreamingJSONResponse(
+        serialize_messages(pvt_chat_manager.message_manager.iter_messages(chat.chat_id))
+    )
 
 
@@ -0,0 +1,204 @@
+from fastapi import APIRouter, Body, Depends, HTTPException, Path, Query, Response, status
+from api.deps import get_current_active_user, get_group_chat_manager
+from api.routers.chat import message_page_params
+from serializers.chat_serializers import message_serializer
+from crud.chat import ChatNotFoundException
+from crud.group import (
+    GroupChatManager, GroupFullException, GroupInviteRequiredException,
+    GroupPermissionException, decode_group_cursor,
+)
+from config import settings
+from core.codec import ORJSONResponse
+from service.receipts import receipts
+import schemas
+
+router = APIRouter(
+    prefix='/chat/group',
+    tags=["Group Chat"],
+    default_response_class=ORJSONResponse,
+)
+
+
+async def verify_group_member(
+    chat_id: str = Path(...),
+    current_user: schemas.UserAuth = Depends(get_current_active_user),
+    group_chat_manager: GroupChatManager = Depends(get_group_chat_manager),
+) -> str:
+    # cached per (chat, user); the member list itself is never loaded
+    if not await group_chat_manager.is_member(chat_id, current_user.id):
+        raise HTTPException(
+            status.HTTP_403_FORBIDDEN,
+            detail="You are not a participant in this chat."
+        )
+    return chat_id
+
+
+@router.post('/', response_model=schemas.GroupChat, status_code=status.HTTP_201_CREATED)
+async def create_group_chat(
+    group: schemas.GroupCreate,
+    group_chat_manager: GroupChatManager = Depends(get_group_chat_manager),
+    current_user: schemas.UserAuth = Depends(get_current_active_user),
+):
+    return await group_chat_manager.create_chat(
+        current_user.id, group.chat_name, group.encrypted_key
+    )
+
+
+@router.get('/', response_model=schemas.GroupPage)
+async def get_my_groups(
+    before: str | None = Query(None, description="Cursor: groups joined before it"),
+    limit: int = Query(settings.GROUP_PAGE_SIZE, ge=1, le=settings.GROUP_PAGE_SIZE_MAX),
+    group_chat_manager: GroupChatManager = Depends(get_group_chat_manager),
+    current_user: schemas.UserAuth = Depends(get_current_active_user),
+):
+    cursor = decode_group_cursor(before) if before else None
+    page = await group_chat_manager.get_user_groups(current_user.id, cursor, limit)
+    for group in page['groups']:
+        if group.get('last_message'):
+            group['last_message'] = message_serializer(group['last_message'])
+    return page
+
+
+@router.get('/{chat_id}', response_model=schemas.GroupChat)
+async def get_group_chat(
+    chat_id: str = Depends(verify_group_member),
+    group_chat_manager: GroupChatManager = Depends(get_group_chat_manager),
+):
+    try:
+        return await group_chat_manager.get_group(chat_id)
+    except ChatNotFoundException:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, detail="Chat not found.")
+
+
+@router.post('/{chat_id}/join', response_model=schemas.GroupChat)
+async def join_group_chat(
+    chat_id: str = Path(...),
+    group_chat_manager: GroupChatManager = Depends(get_group_chat_manager),
+    current_user: schemas.UserAuth = Depends(get_current_active_user),
+):
+    try:
+        return await group_chat_manager.join(chat_id, current_user.id)
+    except ChatNotFoundException:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, detail="Chat not found.")
+    except GroupInviteRequiredException:
+        raise HTTPException(status.HTTP_403_FORBIDDEN, detail="You need an invite to join this chat.")
+    except GroupFullException:
+        raise HTTPException(
+            status.HTTP_409_CONFLICT,
+            detail=f"The group has reached {settings.GROUP_MAX_MEMBERS} members."
+        )
+
+
+@router.post('/{chat_id}/invites', response_model=schemas.GroupInvite, status_code=status.HTTP_201_CREATED)
+async def invite_to_group_chat(
+    invite: schemas.GroupInviteCreate,
+    chat_id: str = Depends(verify_group_member),
+    group_chat_manager: GroupChatManager = Depends(get_group_chat_manager),
+    current_user: schemas.UserAuth = Depends(get_current_active_user),
+):
+    try:
+        return await group_chat_manager.invite(chat_id, current_user.id, invite.user_id)
+    except GroupPermissionException:
+        raise HTTPException(status.HTTP_403_FORBIDDEN, detail="Only the group owner can invite.")
+
+
+@router.post('/{chat_id}/leave', status_code=status.HTTP_204_NO_CONTENT)
+async def leave_group_chat(
+    chat_id: str = Path(...),
+    group_chat_manager: GroupChatManager = Depends(get_group_chat_manager),
+    current_user: schemas.UserAuth = Depends(get_current_active_user),
+):
+    try:
+        await group_chat_manager.leave(chat_id, current_user.id)
+    except ChatNotFoundException:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, detail="Chat not found.")
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+
+@router.get('/{chat_id}/members', response_model=schemas.GroupMemberPage)
+async def get_group_members(
+    after: str | None = Query(None, description="Cursor: members after it"),
+    limit: int = Query(settings.GROUP_MEMBER_PAGE_SIZE, ge=1, le=settings.GROUP_MEMBER_PAGE_SIZE_MAX),
+    chat_id: str = Depends(verify_group_member),
+    group_chat_manager: GroupChatManager = Depends(get_group_chat_manager),
+):
+    return await group_chat_manager.get_members(chat_id, after, limit)
+
+
+@router.get('/{chat_id}/key', response_model=schemas.GroupKey)
+async def get_group_key(
+    chat_id: str = Path(...),
+    group_chat_manager: GroupChatManager = Depends(get_group_chat_manager),
+    current_user: schemas.UserAuth = Depends(get_current_active_user),
+):
+    try:
+        return await group_chat_manager.get_member_key(chat_id, current_user.id)
+    except ChatNotFoundException:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, detail="Chat not found.")
+
+
+@router.put('/{chat_id}/keys', response_model=schemas.GroupKeysUpdated)
+async def set_group_keys(
+    update: schemas.GroupKeysUpdate = Body(...),
+    chat_id: str = Depends(verify_group_member),
+    group_chat_manager: GroupChatManager = Depends(get_group_chat_manager),
+):
+    """Distribute the current group key, wrapped per member, in batches."""
+    if len(update.keys) > settings.GROUP_KEY_BATCH_MAX:
+        raise HTTPException(
+            status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {settings.GROUP_KEY_BATCH_MAX} keys per request."
+        )
+    try:
+        updated = await group_chat_manager.set_member_keys(chat_id, update.key_epoch, update.keys)
+    except ChatNotFoundException:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, detail="Chat not found.")
+    return schemas.GroupKeysUpdated(key_epoch=update.key_epoch, updated=updated)
+
+
+@router.get('/{chat_id}/messages', response_model=schemas.GroupMessagePage)
+async def get_group_messages(
+    chat_id: str = Depends(verify_group_member),
+    page_params: tuple = Depends(message_page_params),
+    group_chat_manager: GroupChatManager = Depends(get_group_chat_manager),
+):
+    cursor, limit = page_params
+    page = await group_chat_manager.get_chat_messages(chat_id, cursor, limit)
+    page['messages'] = [message_serializer(msg) for msg in page['messages']]
+    return page
+
+
+@router.post('/{chat_id}/mark-read', response_model=schemas.UnreadCount)
+async def mark_group_chat_read(
+    chat_id: str = Path(...),
+    group_chat_manager: GroupChatManager = Depends(get_group_chat_manager),
+    current_user: schemas.UserAuth = Depends(get_current_active_user),
+):
+    try:
+        await group_chat_manager.mark_read(current_user.id, chat_id)
+    except ChatNotFoundException:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, detail="Chat not found.")
+    return schemas.UnreadCount(chat_id=chat_id, unread_count=0)
+
+
+@router.get('/{chat_id}/unread-count', response_model=schemas.UnreadCount)
+async def get_group_chat_unread_count(
+    chat_id: str = Path(...),
+    group_chat_manager: GroupChatManager = Depends(get_group_chat_manager),
+    current_user: schemas.UserAuth = Depends(get_current_active_user),
+):
+    try:
+        unread_count = await group_chat_manager.get_unread_count(current_user.id, chat_id)
+    except ChatNotFoundException:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, detail="Chat not found.")
+    return schemas.UnreadCount(chat_id=chat_id, unread_count=unread_count)
+
+
+@router.get('/{chat_id}/receipts', response_model=schemas.ReceiptPage)
+async def get_group_chat_receipts(
+    after: str | None = Query(None, description="Cursor: receipts of members after it"),
+    limit: int = Query(settings.RECEIPT_PAGE_SIZE, ge=1, le=settings.RECEIPT_PAGE_SIZE_MAX),
+    chat_id: str = Depends(verify_group_member),
+):
+    """Members' delivery and read watermarks, for members who have acked."""
+    return await receipts.get_receipts(chat_id, after, limit)
@@ -1,7 +1,9 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Path, Body
+import logging
+
+from fastapi import APIRouter, Depends, HTTPException, status, Path, Body, Query
 from typing import Any
 from service.token import TokenManager
-from exceptions.user import UserCreationError
+from exceptions import HashingOverloadedError, UserCreationError
 import schemas
 from crud.user import User
 from schemas.user import UserProfileUpdate
@@ -13,8 +15,11 @@ from api.deps import (
     requires_role
 )
 from pydantic import constr, ValidationError
+from config import settings
 from schemas.user import ObjectIdStr, UsernameStr
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(prefix="/users", tags=["users"])
 
 @router.post(
@@ -52,8 +57,7 @@ async def register(
             }
         )
     except UserCreationError as e:
-        print(e)
-        print(e.field, e.message)
+        logger.info('Registration rejected on %s: %s', e.field, e.message)
         
         raise HTTPException(
             status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
@@ -67,8 +71,11 @@ async def register(
                 ]
             }
         )
+    except HashingOverloadedError:
+        # main.py turns this into 503 + Retry-After
+        raise
     except Exception as e:
-        print(f"Unexpected error during registration: {e}")
+        logger.exception('Unexpected error during registration')
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail={
@@ -85,9 +92,9 @@ async def register(
 )
 async def read_me(
     user_manager: User = Depends(get_user_manager),
-    current_user: schemas.User = Depends(get_current_active_user)
+    current_user: schemas.UserAuth = Depends(get_current_active_user)
 ):
-    user = await user_manager.get_by_id(current_user.id)
+    user = await user_manager.get_account_by_id(current_user.id)
     return user
 
 @router.put(
@@ -97,7 +104,7 @@ async def read_me(
 async def update_me(
     profile_data: UserProfileUpdate,
     user_manager: User = Depends(get_user_manager),
-    current_user: schemas.User = Depends(get_current_active_user)
+    current_user: schemas.UserAuth = Depends(get_current_active_user)
 ):
     """Update current user's profile information"""
     # print('----- updated_user', profile_data)
@@ -109,16 +116,33 @@ async def update_me(
     return updated_user
 
 @router.get(
-    '/all',
+    '',
+    status_code=status.HTTP_200_OK,
+    response_model=schemas.UserDirectoryPage
+)
+async def search_users(
+    q: str | None = Query(None, max_length=30, description="Username prefix, case-insensitive"),
+    after: str | None = Query(None, description="Cursor: users after it"),
+    limit: int = Query(settings.USER_DIRECTORY_PAGE_SIZE, ge=1, le=settings.USER_DIRECTORY_PAGE_SIZE_MAX),
+    user_manager: User = Depends(get_user_manager),
+    current_user: schemas.UserAuth = Depends(get_current_active_user),
+):
+    # any authenticated user can search all others (except themselves)
+    return await user_manager.search_directory(current_user.id, q, after, limit)
+
+
+@router.get(
+    '/keys/{user_id}',
     status_code=status.HTTP_200_OK,
-    response_model=list[schemas.UserOfAll]
+    response_model=schemas.UserKeyBundle
 )
-async def get_all_user(
+async def get_user_keys(
+    user_id: ObjectIdStr = Path(...),
     user_manager: User = Depends(get_user_manager),
-    current_user: schemas.User = Depends(get_current_active_user),
+    current_user: schemas.UserAuth = Depends(get_current_active_user),
 ):
-    # any authenticated user can now list all others (except themselves)
-    return await user_manager.get_all_except_me(current_user.id)
+    """Public key of any user, for encrypting messages to them."""
+    return await user_manager.get_key_bundle(user_id)
 
 """
 @router.get(
@@ -128,7 +152,7 @@ async def get_all_user(
 async def get_user_detail(
     user_id: ObjectIdStr = Path(...),
     user_manager: User = Depends(get_user_manager),
-    current_user: schemas.User = Depends(get_current_active_user)
+    current_user: schemas.UserAuth = Depends(get_current_active_user)
 ):
     if user_id != current_user.id:
         # enforce admin for any non‐self lookup
@@ -144,7 +168,7 @@ async def get_user_detail(
 async def get_user_by_username(
     username: UsernameStr = Path(...),
     user_manager: User = Depends(get_user_manager),
-    current_user: schemas.User = Depends(get_current_active_user),
+    current_user: schemas.UserAuth = Depends(get_current_active_user),
 ):
     return await user_manager.get_by_username(username)
 
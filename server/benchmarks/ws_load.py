@@ -0,0 +1,390 @@
+"""
+WebSocket load benchmark for /ws/chat/{chat_type}/{chat_id}.
+
+Seeds users and private chats into a throwaway database on a local mongod
+(through UserCreator and PrivateChatManager), starts the API in a uvicorn
+subprocess against it, then drives N WebSocket clients spread over M chats.
+Each client sends at a fixed rate; every frame a client receives from
+someone else is matched to its send time. The report is JSON:
+throughput, send-to-receive latency percentiles, errors and server RSS.
+
+    python -m benchmarks.ws_load --clients 200 --chats 50 --rate 1 --duration 30 \\
+        --output bench.json
+
+Needs a mongod without TLS (e.g. `docker run -p 27017:27017 mongo:7`) and
+the `websockets` package. The database is dropped afterwards unless
+--keep-db is given.
+"""
+import argparse
+import asyncio
+import base64
+import json
+import os
+import platform
+import secrets
+import socket
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+
+# Settings shared by the seeding code (this process) and the server. Rate
+# limits are lifted and bcrypt made cheap; the defaults only fill in what
+# a .env would otherwise have to provide.
+BENCH_ENV = {
+    'MONGODB_TLS': 'false',
+    'BCRYPT_ROUNDS': '4',
+    'WS_RATE_LIMIT_PER_USER': '1000000/second',
+    'WS_RATE_LIMIT_PER_CHAT': '1000000/second',
+    'AUTO_BUILD_INDEXES': 'true',
+}
+DEFAULT_ENV = {
+    'ENVIRONMENT': 'benchmark',
+    'ALLOWED_ORIGINS': '*',
+    'USERS_COLLECTION': 'users',
+    'SECRET_KEY': secrets.token_hex(32),
+    'ALGORITHM': 'HS256',
+    'ACCESS_TOKEN_EXPIRE_MINUTES': '120',
+    'PASSWORD_RESET_EXPIRE_MINUTES': '15',
+    'REFRESH_TOKEN_EXPIRE_DAYS': '1',
+    'SMTP_HOST': 'localhost',
+    'SMTP_PORT': '25',
+    'SMTP_USER': 'bench',
+    'SMTP_PASSWORD': 'bench',
+    'EMAIL_FROM': 'bench@example.com',
+    'FRONTEND_URL': 'http://localhost:5173',
+}
+
+BENCH_PASSWORD = 'Bench-pass1!'
+SEED_CONCURRENCY = 16
+
+
+def percentile(sorted_values: list[float], pct: float) -> float | None:
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def read_rss_bytes(pid: int) -> int | None:
+    """Resident set size from /proc (Linux only)."""
+    try:
+        with open(f'/proc/{pid}/status') as status:
+            for line in status:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        return None
+    return None
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def random_payload(size: int) -> str:
+    return base64.b64encode(os.urandom(size)).decode()
+
+
+# --- seeding ------------------------------------------------------------------
+
+async def seed(chat_count: int) -> list[dict]:
+    """Create two users per chat and the chats. Returns [{chat_id, members: [(id, token)]}]."""
+    from database import mongodb
+    from crud.chat import PrivateChatManager
+    from crud.user import User
+    from core.indexes import build_indexes
+    from core.security import password_hasher
+    from schemas import UserCreate
+    from service.token import TokenManager
+
+    await build_indexes(mongodb)
+    user_manager = User(mongodb)
+    chat_manager = PrivateChatManager(mongodb, user_manager)
+    token_manager = TokenManager(user_manager)
+    run = secrets.token_hex(3)
+    limit = asyncio.Semaphore(SEED_CONCURRENCY)
+
+    async def create_user(index: int) -> tuple[str, str]:
+        async with limit:
+            user = await user_manager.create_user(UserCreate(
+                username=f'bench_{run}_{index}',
+                email=f'bench_{run}_{index}@example.com',
+                public_key_pem='bench', private_key_pem='bench',
+                password=BENCH_PASSWORD,
+            ))
+            return user['id'], await token_manager.get_jwt_access_token(user['id'])
+
+    try:
+        users = await asyncio.gather(*(create_user(i) for i in range(chat_count * 2)))
+        chats = []
+        for i in range(chat_count):
+            members = [users[2 * i], users[2 * i + 1]]
+            chat = await chat_manager.create_chat(members[0][0], members[1][0])
+            chats.append({'chat_id': chat.chat_id, 'members': members})
+        return chats
+    finally:
+        password_hasher.close()
+
+
+# --- load ---------------------------------------------------------------------
+
+class Results:
+    def __init__(self):
+        self.sent: dict[str, float] = {}
+        self.expected_deliveries = 0
+        self.latencies: list[float] = []
+        self.connect_errors = 0
+        self.error_frames = 0
+        self.disconnects = 0
+        self.send_errors = 0
+
+
+async def run_client(
+    url: str,
+    user_id: str,
+    peers: int,
+    rate: float,
+    message_size: int,
+    start_at: float,
+    stop_at: float,
+    results: Results,
+):
+    import websockets
+
+    try:
+        websocket = await websockets.connect(url, max_size=None)
+    except Exception:
+        results.connect_errors += 1
+        return
+
+    async def receive():
+        try:
+            async for raw in websocket:
+                received_at = time.perf_counter()
+                frame = json.loads(raw)
+                if 'error' in frame:
+                    results.error_frames += 1
+                    continue
+                if frame.get('type') or frame.get('created_by') == user_id:
+                    continue
+                sent_at = results.sent.get(frame.get('message'))
+                if sent_at is not None:
+                    results.latencies.append(received_at - sent_at)
+        except websockets.ConnectionClosed:
+            if time.perf_counter() < stop_at:
+                results.disconnects += 1
+
+    receiver = asyncio.create_task(receive())
+    interval = 1 / rate if rate > 0 else None
+    # spread the first sends so clients do not fire in lockstep
+    next_send = start_at + (secrets.randbelow(1000) / 1000 * interval if interval else 0)
+    try:
+        while interval is not None:
+            await asyncio.sleep(max(0.0, next_send - time.perf_counter()))
+            if time.perf_counter() >= stop_at:
+                break
+            body = random_payload(message_size)
+            frame = {
+                'message': body,
+                'encrypted_key_sender': random_payload(256),
+                'encrypted_key_receiver': random_payload(256),
+                'iv': os.urandom(16).hex(),
+            }
+            results.sent[body] = time.perf_counter()
+            results.expected_deliveries += peers
+            try:
+                await websocket.send(json.dumps(frame))
+            except websockets.ConnectionClosed:
+                results.send_errors += 1
+                break
+            next_send += interval
+        # let in-flight frames land
+        await asyncio.sleep(max(0.0, stop_at - time.perf_counter()) + 2.0)
+    finally:
+        await websocket.close()
+        receiver.cancel()
+
+
+async def sample_rss(pid: int, samples: list[int], stop: asyncio.Event):
+    while not stop.is_set():
+        rss = read_rss_bytes(pid)
+        if rss is not None:
+            samples.append(rss)
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=0.5)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def drive(args, base_url: str, chats: list[dict], server_pid: int) -> dict:
+    # client i joins chat i % M as one of its two members
+    sockets_per_member: dict[tuple[int, int], int] = {}
+    plan = []
+    for i in range(args.clients):
+        chat_index = i % len(chats)
+        member_index = (i // len(chats)) % 2
+        sockets_per_member[(chat_index, member_index)] = sockets_per_member.get((chat_index, member_index), 0) + 1
+        plan.append((chat_index, member_index))
+
+    results = Results()
+    rss_samples: list[int] = []
+    stop_sampling = asyncio.Event()
+    sampler = asyncio.create_task(sample_rss(server_pid, rss_samples, stop_sampling))
+    rss_before = read_rss_bytes(server_pid)
+
+    start_at = time.perf_counter() + args.warmup
+    stop_at = start_at + args.duration
+    tasks = []
+    for chat_index, member_index in plan:
+        chat = chats[chat_index]
+        user_id, token = chat['members'][member_index]
+        # deliveries to the other member's sockets
+        peers = sockets_per_member.get((chat_index, 1 - member_index), 0)
+        url = f'{base_url}/ws/chat/private/{chat["chat_id"]}?token={token}'
+        tasks.append(run_client(
+            url, user_id, peers, args.rate, args.message_size, start_at, stop_at, results,
+        ))
+    await asyncio.gather(*tasks)
+    stop_sampling.set()
+    await sampler
+
+    latencies = sorted(results.latencies)
+    sent = len(results.sent)
+    delivered = len(latencies)
+    return {
+        'sent': sent,
+        'delivered': delivered,
+        'expected_deliveries': results.expected_deliveries,
+        'missing_deliveries': max(0, results.expected_deliveries - delivered),
+        'send_rate_per_second': sent / args.duration,
+        'delivery_rate_per_second': delivered / args.duration,
+        'latency_ms': {
+            name: (value * 1000 if value is not None else None)
+            for name, value in (
+                ('p50', percentile(latencies, 50)),
+                ('p95', percentile(latencies, 95)),
+                ('p99', percentile(latencies, 99)),
+                ('max', latencies[-1] if latencies else None),
+                ('mean', sum(latencies) / delivered if delivered else None),
+            )
+        },
+        'errors': {
+            'connect': results.connect_errors,
+            'error_frames': results.error_frames,
+            'disconnects': results.disconnects,
+            'send': results.send_errors,
+            'rate': (
+                (results.connect_errors + results.error_frames + results.disconnects + results.send_errors)
+                / max(1, sent + args.clients)
+            ),
+        },
+        'server_rss_bytes': {
+            'before': rss_before,
+            'peak': max(rss_samples, default=None),
+            'after': rss_samples[-1] if rss_samples else None,
+        },
+    }
+
+
+# --- orchestration ------------------------------------------------------------
+
+async def wait_until_up(port: int, process: subprocess.Popen, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'server exited with {process.returncode}')
+        try:
+            _, writer = await asyncio.open_connection('127.0.0.1', port)
+            writer.close()
+            return
+        except OSError:
+            await asyncio.sleep(0.2)
+    raise RuntimeError('server did not start in time')
+
+
+async def drop_database():
+    from database import mongodb
+
+    await mongodb.client.drop_database(mongodb.name)
+
+
+async def main_async(args) -> dict:
+    chats = await seed(args.chats)
+    port = free_port()
+    server = subprocess.Popen(
+        [
+            sys.executable, '-m', 'uvicorn', 'main:app',
+            '--host', '127.0.0.1', '--port', str(port),
+            '--log-level', 'warning', '--no-access-log',
+        ],
+        env=os.environ.copy(),
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    )
+    try:
+        await wait_until_up(port, server)
+        report = await drive(args, f'ws://127.0.0.1:{port}', chats, server.pid)
+    finally:
+        server.terminate()
+        try:
+            server.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            server.kill()
+        if not args.keep_db:
+            await drop_database()
+    return report
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clients', type=int, default=100, help='concurrent WebSocket clients (N)')
+    parser.add_argument('--chats', type=int, default=50, help='private chats to spread them over (M)')
+    parser.add_argument('--rate', type=float, default=1.0, help='messages per second per client')
+    parser.add_argument('--duration', type=float, default=30.0, help='seconds of sending')
+    parser.add_argument('--warmup', type=float, default=2.0, help='seconds between connecting and sending')
+    parser.add_argument('--message-size', type=int, default=96, help='ciphertext bytes per message')
+    parser.add_argument('--mongodb-url', default='mongodb://localhost:27017')
+    parser.add_argument('--db-name', default=None, help='default: a fresh bench_<timestamp> database')
+    parser.add_argument('--keep-db', action='store_true')
+    parser.add_argument('--output', help='write the JSON report here instead of stdout')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    os.environ.update(BENCH_ENV)
+    os.environ['MONGODB_URL'] = args.mongodb_url
+    os.environ['MONGODB_DB_NAME'] = args.db_name or f'bench_{int(time.time())}'
+    for key, value in DEFAULT_ENV.items():
+        os.environ.setdefault(key, value)
+
+    report = {
+        'benchmark': 'ws_load',
+        'started_at': datetime.now(timezone.utc).isoformat(),
+        'config': {
+            'clients': args.clients,
+            'chats': args.chats,
+            'rate_per_client': args.rate,
+            'duration': args.duration,
+            'message_size': args.message_size,
+        },
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+        },
+        'results': asyncio.run(main_async(args)),
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as file:
+            file.write(output + '\n')
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
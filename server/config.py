@@ -1,4 +1,4 @@
-from pydantic import Field
+from pydantic import Field, field_validator
 import logging
 import os
 from random import randint
@@ -11,8 +11,11 @@ class GlobalSettings(BaseSettings):
     ENVIRONMENT: str = Field(..., env="ENVIRONMENT")
     ALLOWED_ORIGINS: str = Field(..., env="ALLOWED_ORIGINS")
 
-    # Logging
-    LOG_LEVEL: int = logging.DEBUG
+    # Logging: a level number or name ("DEBUG", "INFO", ...); "json" or "text"
+    LOG_LEVEL: int = logging.INFO
+    LOG_FORMAT: str = "json"
+    # fraction of high-volume events (per-frame WebSocket logs) that are kept
+    LOG_SAMPLE_RATE: float = 0.01
 
     # Sentry
     SENTRY_DSN: str = ""
@@ -20,7 +23,93 @@ class GlobalSettings(BaseSettings):
     # MongoDB
     MONGODB_URL: str = Field(..., env="MONGODB_URL")
     MONGODB_DB_NAME: str = Field(..., env="MONGODB_DB_NAME")
+    # off for a plain local mongod (e.g. benchmarks)
+    MONGODB_TLS: bool = True
     USERS_COLLECTION: str = Field(..., env="USERS_COLLECTION")
+    # build missing indexes in the background at startup; in production
+    # prefer `python manage.py build-indexes` during a deploy
+    AUTO_BUILD_INDEXES: bool = True
+
+    # Chat member lists; private chats never change, group chats invalidate
+    CHAT_MEMBERSHIP_CACHE_SIZE: int = 50_000
+    CHAT_MEMBERSHIP_CACHE_TTL: float = 3600.0
+
+    # Write-behind batching of new messages into bulk writes
+    MESSAGE_WRITE_BATCHING: bool = False
+    MESSAGE_BATCH_SIZE: int = 100
+    MESSAGE_BATCH_LINGER: float = 0.005
+
+    # Message history pagination
+    MESSAGE_PAGE_SIZE: int = 50
+    MESSAGE_PAGE_SIZE_MAX: int = 200
+
+    # User directory search pagination
+    USER_DIRECTORY_PAGE_SIZE: int = 20
+    USER_DIRECTORY_PAGE_SIZE_MAX: int = 100
+
+    # Streamed JSON array responses: documents per cursor batch and chunk
+    STREAM_BATCH_SIZE: int = 200
+
+    # Chat list (inbox) pagination
+    INBOX_PAGE_SIZE: int = 30
+    INBOX_PAGE_SIZE_MAX: int = 100
+
+    # Group chats: membership cap, list pages, wrapped keys per PUT /keys,
+    # and how long an owner's invite stays usable (seconds)
+    GROUP_MAX_MEMBERS: int = 10_000
+    GROUP_PAGE_SIZE: int = 30
+    GROUP_PAGE_SIZE_MAX: int = 100
+    GROUP_MEMBER_PAGE_SIZE: int = 100
+    GROUP_MEMBER_PAGE_SIZE_MAX: int = 500
+    GROUP_KEY_BATCH_MAX: int = 1000
+    GROUP_INVITE_TTL: int = 7 * 24 * 3600
+
+    # WebSocket fan-out between workers: "memory" (single worker) or "redis"
+    BROADCAST_BACKEND: str = "memory"
+    REDIS_URL: str = "redis://localhost:6379/0"
+
+    # Rate limiting: "memory" (per worker) or "redis" (shared via REDIS_URL)
+    RATE_LIMIT_BACKEND: str = "memory"
+    RATE_LIMIT_MAX_KEYS: int = 100_000
+    WS_RATE_LIMIT_PER_USER: str = "5/second"
+    WS_RATE_LIMIT_PER_CHAT: str = "50/second"
+    WS_RATE_LIMIT_RECEIPTS: str = "20/second"
+
+    # Presence (seconds): grace before a disconnect counts as offline, socket
+    # idle timeout (0 disables; any frame, including {"type": "ping"}, counts)
+    PRESENCE_GRACE_PERIOD: float = 10.0
+    PRESENCE_HEARTBEAT_TIMEOUT: float = 90.0
+    PRESENCE_FLUSH_INTERVAL: float = 2.0
+    PRESENCE_REFRESH_INTERVAL: float = 60.0
+
+    # Read/delivery watermarks: acks are coalesced and flushed every interval
+    RECEIPT_FLUSH_INTERVAL: float = 1.0
+    RECEIPT_PAGE_SIZE: int = 100
+    RECEIPT_PAGE_SIZE_MAX: int = 500
+
+    # Per-connection outbound queue; a peer that overflows it is disconnected
+    WS_SEND_QUEUE_SIZE: int = 64
+    WS_SEND_TIMEOUT: float = 10.0
+
+    # permessage-deflate (with `manage.py serve`): small windows and memLevel
+    # keep per-socket compressor state low for many idle sockets
+    WS_PER_MESSAGE_DEFLATE: bool = True
+    WS_DEFLATE_WINDOW_BITS: int = 12
+    WS_DEFLATE_MEM_LEVEL: int = 5
+    WS_DEFLATE_NO_CONTEXT_TAKEOVER: bool = False
+
+    # gzip/brotli for HTTP responses of at least this many bytes
+    HTTP_COMPRESSION: bool = True
+    HTTP_COMPRESSION_MIN_SIZE: int = 1024
+    HTTP_GZIP_LEVEL: int = 6
+    HTTP_BROTLI_QUALITY: int = 4
+
+    # Prometheus metrics at /metrics (per worker process)
+    METRICS_ENABLED: bool = True
+
+    # On-demand sampling profiler (/admin/profile), seconds
+    PROFILER_INTERVAL: float = 0.005
+    PROFILER_MAX_DURATION: float = 60.0
 
     # Authentication
     SECRET_KEY: str = Field(..., env="SECRET_KEY")
@@ -29,6 +118,15 @@ class GlobalSettings(BaseSettings):
     PASSWORD_RESET_EXPIRE_MINUTES: int = Field(..., env="PASSWORD_RESET_EXPIRE_MINUTES")
     REFRESH_TOKEN_EXPIRE_DAYS: int = Field(..., env="REFRESH_TOKEN_EXPIRE_DAYS")
 
+    # Password hashing (bcrypt) runs in a process pool
+    BCRYPT_ROUNDS: int = 14
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_MAX_PENDING: int = 32
+
+    # Users resolved from JWTs; entries are dropped on every user write
+    USER_CACHE_SIZE: int = 10_000
+    USER_CACHE_TTL: float = 60.0
+
     # SMTP
     SMTP_HOST: str = Field(..., env="SMTP_HOST")
     SMTP_PORT: int = Field(..., env="SMTP_PORT")
@@ -44,6 +142,16 @@ class GlobalSettings(BaseSettings):
     ssl_certfile_path: Optional[str] = None
 
 
+    @field_validator("LOG_LEVEL", mode="before")
+    @classmethod
+    def parse_log_level(cls, value):
+        if isinstance(value, str) and not value.isdigit():
+            level = logging.getLevelName(value.upper())
+            if not isinstance(level, int):
+                raise ValueError(f"unknown log level: {value}")
+            return level
+        return value
+
     class Config:
         env_file = ".env"
         env_file_encoding = "utf-8"
@@ -0,0 +1,66 @@
+import orjson
+from typing import Any, AsyncIterable
+from fastapi.responses import JSONResponse, StreamingResponse
+from config import settings
+
+
+def dumps(content: Any) -> bytes:
+    """
+    Encode to UTF-8 JSON bytes. Datetimes are written as RFC 3339, which
+    matches datetime.isoformat() for the timezone-aware values we store.
+    """
+    return orjson.dumps(content)
+
+
+def loads(data: str | bytes) -> Any:
+    return orjson.loads(data)
+
+
+def encode_frame(content: Any) -> str:
+    """Encode a WebSocket text frame once, to be shared by every recipient."""
+    return orjson.dumps(content).decode()
+
+
+class ORJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+async def iter_json_array(
+    items: AsyncIterable[Any],
+    batch_size: int = settings.STREAM_BATCH_SIZE,
+) -> AsyncIterable[bytes]:
+    """
+    Encode items as one JSON array, yielding a chunk per `batch_size`
+    items so that only a batch is ever held in memory.
+    """
+    yield b'['
+    separator = b''
+    batch: list[bytes] = []
+    async for item in items:
+        batch.append(dumps(item))
+        if len(batch) >= batch_size:
+            yield separator + b','.join(batch)
+            separator = b','
+            batch = []
+    if batch:
+        yield separator + b','.join(batch)
+    yield b']'
+
+
+class StreamingJSONResponse(StreamingResponse):
+    """
+    A JSON array written incrementally from an async iterable, e.g. a Motor
+    cursor. Returning it bypasses response_model validation, so items must
+    already be in their response shape (no ObjectId, no private fields).
+    Routes opt in by returning it; keep response_model for the docs.
+    """
+
+    def __init__(
+        self,
+        items: AsyncIterable[Any],
+        batch_size: int = settings.STREAM_BATCH_SIZE,
+        **kwargs,
+    ):
+        kwargs.setdefault('media_type', 'application/json')
+        super().__init__(iter_json_array(items, batch_size), **kwargs)
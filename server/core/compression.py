@@ -0,0 +1,204 @@
+import time
+import zlib
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from config import settings
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+
+COMPRESSIBLE_TYPES = ('application/json', 'text/', 'application/javascript')
+
+
+class CompressionStats:
+    """
+    Per-route totals: bytes before and after compression and the CPU time
+    spent compressing. Routes are labelled by their path template.
+    """
+
+    def __init__(self):
+        self.routes: dict[str, dict] = {}
+
+    def record(self, route: str, encoding: str, raw: int, compressed: int, cpu: float):
+        stats = self.routes.get(route)
+        if stats is None:
+            stats = self.routes[route] = {
+                'responses': 0, 'bytes_in': 0, 'bytes_out': 0,
+                'cpu_seconds': 0.0, 'encodings': {},
+            }
+        stats['responses'] += 1
+        stats['bytes_in'] += raw
+        stats['bytes_out'] += compressed
+        stats['cpu_seconds'] += cpu
+        stats['encodings'][encoding] = stats['encodings'].get(encoding, 0) + 1
+
+    def stats(self) -> dict:
+        return {
+            route: {
+                **stats,
+                'bytes_saved': stats['bytes_in'] - stats['bytes_out'],
+                'ratio': stats['bytes_out'] / stats['bytes_in'] if stats['bytes_in'] else 1.0,
+            }
+            for route, stats in self.routes.items()
+        }
+
+
+compression_stats = CompressionStats()
+
+
+class GzipCompressor:
+    def __init__(self, level: int = settings.HTTP_GZIP_LEVEL):
+        self._zlib = zlib.compressobj(level, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+
+    def compress(self, data: bytes) -> bytes:
+        # sync flush: each streamed chunk is decodable as soon as it arrives
+        return self._zlib.compress(data) + self._zlib.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self, data: bytes = b'') -> bytes:
+        return self._zlib.compress(data) + self._zlib.flush(zlib.Z_FINISH)
+
+
+class BrotliCompressor:
+    def __init__(self, quality: int = settings.HTTP_BROTLI_QUALITY):
+        self._brotli = brotli.Compressor(quality=quality)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._brotli.process(data) + self._brotli.flush()
+
+    def finish(self, data: bytes = b'') -> bytes:
+        return self._brotli.process(data) + self._brotli.finish()
+
+
+COMPRESSORS = {'gzip': GzipCompressor}
+if brotli is not None:
+    COMPRESSORS['br'] = BrotliCompressor
+
+
+def negotiate_encoding(accept_encoding: str) -> str | None:
+    """Brotli when the client takes it (and it is installed), else gzip."""
+    offered = set()
+    for part in accept_encoding.lower().split(','):
+        coding, _, params = part.partition(';')
+        name, _, value = params.strip().partition('=')
+        try:
+            if name == 'q' and float(value) == 0:
+                continue
+        except ValueError:
+            continue
+        offered.add(coding.strip())
+    for encoding in ('br', 'gzip'):
+        if encoding in COMPRESSORS and encoding in offered:
+            return encoding
+    return None
+
+
+class CompressionMiddleware:
+    """
+    gzip/brotli for HTTP responses whose body is at least `minimum_size`
+    bytes and of a text-like type. Streamed bodies (e.g. StreamingJSONResponse)
+    are compressed chunk by chunk. Every compressed response is recorded in
+    compression_stats.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = settings.HTTP_COMPRESSION_MIN_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate_encoding(Headers(scope=scope).get('accept-encoding', ''))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        responder = _CompressionResponder(self.app, encoding, self.minimum_size)
+        await responder(scope, receive, send)
+
+
+class _CompressionResponder:
+    def __init__(self, app: ASGIApp, encoding: str, minimum_size: int):
+        self.app = app
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self.send: Send | None = None
+        self.start_message: Message | None = None
+        self.compressor = None
+        self.passthrough = False
+        self.raw_bytes = 0
+        self.compressed_bytes = 0
+        self.cpu_seconds = 0.0
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        self.send = send
+        await self.app(scope, receive, self.send_compressed)
+        if self.compressor is not None:
+            # the router stores the matched route in the shared scope
+            route = scope.get('route')
+            compression_stats.record(
+                getattr(route, 'path', 'unmatched'), self.encoding,
+                self.raw_bytes, self.compressed_bytes, self.cpu_seconds,
+            )
+
+    def _compress(self, body: bytes, more_body: bool) -> bytes:
+        started = time.thread_time()
+        if more_body:
+            compressed = self.compressor.compress(body)
+        else:
+            compressed = self.compressor.finish(body)
+        self.cpu_seconds += time.thread_time() - started
+        self.raw_bytes += len(body)
+        self.compressed_bytes += len(compressed)
+        return compressed
+
+    def _should_compress(self, headers: Headers, body: bytes, more_body: bool) -> bool:
+        if 'content-encoding' in headers:
+            return False
+        content_type = headers.get('content-type', '')
+        if not content_type.startswith(COMPRESSIBLE_TYPES):
+            return False
+        if more_body:
+            # streamed: the size is unknown, assume it is worth it
+            return True
+        return len(body) >= self.minimum_size
+
+    async def send_compressed(self, message: Message):
+        if message['type'] == 'http.response.start':
+            # held back until the first body chunk shows whether to compress
+            self.start_message = message
+            return
+        if message['type'] != 'http.response.body':
+            await self.send(message)
+            return
+
+        body = message.get('body', b'')
+        more_body = message.get('more_body', False)
+
+        if self.start_message is not None:
+            start, self.start_message = self.start_message, None
+            headers = MutableHeaders(raw=start['headers'])
+            if not self._should_compress(headers, body, more_body):
+                self.passthrough = True
+                await self.send(start)
+                await self.send(message)
+                return
+            self.compressor = COMPRESSORS[self.encoding]()
+            body = self._compress(body, more_body)
+            headers['Content-Encoding'] = self.encoding
+            headers.add_vary_header('Accept-Encoding')
+            if more_body:
+                del headers['Content-Length']
+            else:
+                headers['Content-Length'] = str(len(body))
+            await self.send(start)
+            await self.send({'type': 'http.response.body', 'body': body, 'more_body': more_body})
+        elif self.passthrough:
+            await self.send(message)
+        else:
+            body = self._compress(body, more_body)
+            await self.send({'type': 'http.response.body', 'body': body, 'more_body': more_body})
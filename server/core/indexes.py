@@ -0,0 +1,178 @@
+import logging
+from typing import Any
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
+
+logger = logging.getLogger(__name__)
+
+
+# Every index the app relies on, by collection. Build them with
+# `python manage.py build-indexes`. Startup verifies them and, with
+# AUTO_BUILD_INDEXES set, builds the missing ones in a background task.
+INDEXES: dict[str, list[IndexModel]] = {
+    'users': [
+        IndexModel([('username', ASCENDING)], name='username_unique', unique=True),
+        IndexModel([('email', ASCENDING)], name='email_unique', unique=True),
+        # directory: username prefix search, keyset on (username_lower, _id)
+        IndexModel([('username_lower', ASCENDING), ('_id', ASCENDING)], name='username_lower_id'),
+    ],
+    'privateChat': [
+        IndexModel([('chat_id', ASCENDING)], name='chat_id_unique', unique=True),
+        # find_private_chat: {'type': 'private', 'member_ids': {'$all': [...]}}
+        IndexModel([('type', ASCENDING), ('member_ids', ASCENDING)], name='type_member_ids'),
+    ],
+    'groupChat': [
+        IndexModel([('chat_id', ASCENDING)], name='chat_id_unique', unique=True),
+    ],
+    'groupMembers': [
+        # membership checks and member pages, keyset on user_id
+        IndexModel([('chat_id', ASCENDING), ('user_id', ASCENDING)], name='chat_id_user_id_unique', unique=True),
+        # a user's groups: most recently joined first, keyset on (joined_at, chat_id)
+        IndexModel(
+            [('user_id', ASCENDING), ('joined_at', DESCENDING), ('chat_id', DESCENDING)],
+            name='user_id_joined_at_chat_id',
+        ),
+    ],
+    'groupInvites': [
+        IndexModel([('chat_id', ASCENDING), ('user_id', ASCENDING)], name='chat_id_user_id_unique', unique=True),
+        IndexModel([('expires_at', ASCENDING)], name='expires_at_1', expireAfterSeconds=0),
+    ],
+    'messages': [
+        IndexModel(
+            [('chat_id', ASCENDING), ('created_at', ASCENDING), ('id', ASCENDING)],
+            name='chat_id_created_at_id',
+        ),
+        IndexModel([('id', ASCENDING)], name='id_unique', unique=True),
+    ],
+    'inbox': [
+        IndexModel([('user_id', ASCENDING), ('chat_id', ASCENDING)], name='user_id_chat_id_unique', unique=True),
+        # chat list: newest activity first, keyset on (last_message_at, chat_id)
+        IndexModel(
+            [('user_id', ASCENDING), ('last_message_at', DESCENDING), ('chat_id', DESCENDING)],
+            name='user_id_last_message_at_chat_id',
+        ),
+        # send path: every member's entry of one chat
+        IndexModel([('chat_id', ASCENDING)], name='chat_id_1'),
+    ],
+    'receipts': [
+        # one document per (chat, user); receipt pages keyset on user_id
+        IndexModel([('chat_id', ASCENDING), ('user_id', ASCENDING)], name='chat_id_user_id_unique', unique=True),
+    ],
+    'password_reset_tokens': [
+        IndexModel([('token', ASCENDING)], name='token_unique', unique=True),
+        IndexModel([('expires_at', ASCENDING)], name='expires_at_1', expireAfterSeconds=0),
+    ],
+}
+
+# Representative hot-path queries, explained at startup to catch any that
+# would fall back to a collection scan.
+HOT_QUERIES: list[dict[str, Any]] = [
+    {'find': 'users', 'filter': {'username': ''}},
+    {'find': 'users', 'filter': {'email': ''}},
+    {
+        'find': 'users',
+        'filter': {'username_lower': {'$gte': 'a', '$lt': 'b'}},
+        'sort': {'username_lower': ASCENDING, '_id': ASCENDING},
+    },
+    {'find': 'privateChat', 'filter': {'chat_id': ''}},
+    {'find': 'privateChat', 'filter': {'type': 'private', 'member_ids': {'$all': ['', '']}}},
+    {'find': 'groupChat', 'filter': {'chat_id': ''}},
+    {'find': 'groupMembers', 'filter': {'chat_id': '', 'user_id': ''}},
+    {'find': 'groupMembers', 'filter': {'chat_id': '', 'user_id': {'$gt': ''}}, 'sort': {'user_id': ASCENDING}},
+    {
+        'find': 'groupMembers',
+        'filter': {'user_id': ''},
+        'sort': {'joined_at': DESCENDING, 'chat_id': DESCENDING},
+    },
+    {'find': 'groupInvites', 'filter': {'chat_id': '', 'user_id': ''}},
+    {
+        'find': 'messages',
+        'filter': {'chat_id': ''},
+        'sort': {'created_at': DESCENDING, 'id': DESCENDING},
+    },
+    {
+        'find': 'inbox',
+        'filter': {'user_id': ''},
+        'sort': {'last_message_at': DESCENDING, 'chat_id': DESCENDING},
+    },
+    {'find': 'inbox', 'filter': {'chat_id': ''}},
+    {'find': 'receipts', 'filter': {'chat_id': '', 'user_id': {'$gt': ''}}, 'sort': {'user_id': ASCENDING}},
+    {'find': 'password_reset_tokens', 'filter': {'token': ''}},
+]
+
+
+def index_names(collection: str) -> list[str]:
+    return [index.document['name'] for index in INDEXES[collection]]
+
+
+async def build_indexes(
+    db: AsyncIOMotorDatabase,
+    collections: list[str] | None = None,
+) -> dict[str, list[str]]:
+    """
+    Create the registered indexes. Builds do not block reads or writes on
+    MongoDB 4.2+; `background` is still passed for older servers. A failing
+    build (e.g. duplicates under a unique index) is logged and skipped.
+    Returns {collection: [created index names]}.
+    """
+    created = {}
+    for collection in collections or INDEXES:
+        created[collection] = []
+        for index in INDEXES[collection]:
+            document = {**index.document, 'background': True}
+            keys = list(document.pop('key').items())
+            try:
+                name = await db[collection].create_index(keys, **document)
+                created[collection].append(name)
+            except OperationFailure as e:
+                logger.error(
+                    'Index %s.%s was not built: %s',
+                    collection, index.document['name'], e
+                )
+    return created
+
+
+async def find_missing_indexes(db: AsyncIOMotorDatabase) -> dict[str, list[str]]:
+    missing = {}
+    for collection in INDEXES:
+        existing = await db[collection].index_information()
+        absent = [name for name in index_names(collection) if name not in existing]
+        if absent:
+            missing[collection] = absent
+    return missing
+
+
+def _plan_stages(plan: dict):
+    yield plan.get('stage')
+    for key in ('inputStage', 'queryPlan'):
+        if key in plan:
+            yield from _plan_stages(plan[key])
+    for child in plan.get('inputStages', ()):
+        yield from _plan_stages(child)
+
+
+async def find_collection_scans(db: AsyncIOMotorDatabase) -> list[dict]:
+    """Hot queries whose winning plan is a collection scan."""
+    scans = []
+    for query in HOT_QUERIES:
+        explained = await db.command('explain', query, verbosity='queryPlanner')
+        winning_plan = explained['queryPlanner']['winningPlan']
+        if 'COLLSCAN' in _plan_stages(winning_plan):
+            scans.append(query)
+    return scans
+
+
+async def verify_indexes(db: AsyncIOMotorDatabase) -> dict[str, list[str]]:
+    """Report missing indexes and collection-scanning hot queries."""
+    missing = await find_missing_indexes(db)
+    for collection, names in missing.items():
+        logger.warning('Missing indexes on %s: %s', collection, ', '.join(names))
+    for query in await find_collection_scans(db):
+        logger.warning(
+            'Collection scan on %s for filter %s', query['find'], query['filter']
+        )
+    if missing:
+        logger.warning('Run `python manage.py build-indexes` to create missing indexes.')
+    return missing
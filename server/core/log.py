@@ -0,0 +1,111 @@
+"""
+Logging setup: records are level-gated where they are created, and only
+enqueued on the event loop; a listener thread formats and writes them.
+
+Use %-style arguments (logger.info('x %s', y)), never f-strings, so nothing
+is formatted for records below LOG_LEVEL. For high-volume events pass
+extra={'sample_rate': r} and only a fraction r of them is kept.
+"""
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+
+from config import settings
+from core import codec
+
+# attributes every LogRecord has; anything else came in through `extra`
+_RECORD_FIELDS = frozenset(vars(logging.makeLogRecord({})).keys()) | {'message', 'asctime'}
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message and extra fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': self.formatTime(record, '%Y-%m-%dT%H:%M:%S'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_FIELDS and key != 'sample_rate':
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+        return codec.dumps(_jsonable(entry)).decode()
+
+
+def _jsonable(entry: dict) -> dict:
+    # extra fields may hold anything; keep what orjson takes, repr the rest
+    for key, value in entry.items():
+        if not isinstance(value, (str, int, float, bool, type(None), list, dict)):
+            entry[key] = repr(value)
+    return entry
+
+
+class ThreadQueueHandler(logging.handlers.QueueHandler):
+    """
+    The stock prepare() formats the whole record (tracebacks included) on
+    the calling thread so it can be pickled; the queue here stays in process,
+    so only the message is fixed now and the listener formats the rest.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps a record carrying `sample_rate` with that probability."""
+
+    def __init__(self):
+        super().__init__()
+        self.dropped = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        rate = getattr(record, 'sample_rate', None)
+        if rate is None or rate >= 1 or random.random() < rate:
+            return True
+        self.dropped += 1
+        return False
+
+
+sampling_filter = SamplingFilter()
+_listener: logging.handlers.QueueListener | None = None
+
+
+def setup_logging(level: int = settings.LOG_LEVEL, format: str = settings.LOG_FORMAT):
+    """Route the root logger through a queue; idempotent."""
+    global _listener
+    if _listener is not None:
+        return
+
+    stream = logging.StreamHandler(sys.stdout)
+    if format == 'json':
+        stream.setFormatter(JSONFormatter())
+    else:
+        stream.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s: %(message)s'))
+
+    records: queue.SimpleQueue = queue.SimpleQueue()
+    handler = ThreadQueueHandler(records)
+    handler.addFilter(sampling_filter)
+
+    root = logging.getLogger()
+    root.handlers = [handler]
+    root.setLevel(level)
+
+    _listener = logging.handlers.QueueListener(records, stream, respect_handler_level=True)
+    _listener.start()
+
+
+def stop_logging():
+    """Flush queued records; call on shutdown."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
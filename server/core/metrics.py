@@ -0,0 +1,251 @@
+"""
+In-process metrics rendered in the Prometheus text format (0.0.4).
+
+Kept deliberately small: counters, callback gauges and fixed-bucket
+histograms keyed by label tuples. Recording is a dict lookup, a bisect and
+a few additions under an uncontended lock (Motor reports command events
+from its own threads), so it can stay on in production. Every worker
+process keeps and serves its own values.
+"""
+import bisect
+import threading
+from abc import ABC, abstractmethod
+import time
+from typing import Callable, Iterable
+
+from pymongo import monitoring
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names: tuple[str, ...], values: tuple, extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric(ABC):
+    type = ''
+
+    def __init__(self, name: str, documentation: str, labels: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+
+    def header(self) -> list[str]:
+        return [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.type}']
+
+    @abstractmethod
+    def render(self) -> list[str]:
+        ...
+
+
+class Counter(Metric):
+    type = 'counter'
+
+    def __init__(self, name: str, documentation: str, labels: Iterable[str] = ()):
+        super().__init__(name, documentation, labels)
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, *labels, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> list[str]:
+        lines = self.header()
+        for labels, value in list(self._values.items()):
+            lines.append(f'{self.name}{_format_labels(self.label_names, labels)} {_format_value(value)}')
+        return lines
+
+
+class CallbackMetric(Metric):
+    """A gauge or counter read from existing state at scrape time; costs nothing in between."""
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        callback: Callable[[], float | dict[tuple, float]],
+        labels: Iterable[str] = (),
+        type: str = 'gauge',
+    ):
+        super().__init__(name, documentation, labels)
+        self.callback = callback
+        self.type = type
+
+    def render(self) -> list[str]:
+        lines = self.header()
+        values = self.callback()
+        if not isinstance(values, dict):
+            values = {(): values}
+        for labels, value in values.items():
+            lines.append(f'{self.name}{_format_labels(self.label_names, labels)} {_format_value(value)}')
+        return lines
+
+
+class Histogram(Metric):
+    type = 'histogram'
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        buckets: Iterable[float],
+        labels: Iterable[str] = (),
+    ):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [per-bucket counts..., +Inf count, sum]
+        self._values: dict[tuple, list[float]] = {}
+
+    def observe(self, value: float, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(labels)
+            if series is None:
+                series = self._values[labels] = [0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    def render(self) -> list[str]:
+        lines = self.header()
+        for labels, series in list(self._values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), series[:-1]):
+                cumulative += count
+                label_text = _format_labels(self.label_names, labels, f'le="{_format_value(bound)}"')
+                lines.append(f'{self.name}_bucket{label_text} {cumulative}')
+            label_text = _format_labels(self.label_names, labels)
+            lines.append(f'{self.name}_sum{label_text} {_format_value(series[-1])}')
+            lines.append(f'{self.name}_count{label_text} {cumulative}')
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: list[Metric] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+MONGO_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+HASH_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0)
+FANOUT_BUCKETS = (0, 1, 2, 5, 10, 25, 50, 100, 250)
+
+http_request_duration = registry.register(Histogram(
+    'http_request_duration_seconds', 'HTTP request latency by route template.',
+    LATENCY_BUCKETS, ('method', 'route', 'status'),
+))
+ws_frames_received = registry.register(Counter(
+    'ws_frames_received_total', 'WebSocket frames received from clients.',
+))
+ws_broadcast_fanout = registry.register(Histogram(
+    'ws_broadcast_fanout', 'Local sockets a frame was queued on per broadcast.',
+    FANOUT_BUCKETS,
+))
+mongo_command_duration = registry.register(Histogram(
+    'mongodb_command_duration_seconds', 'MongoDB command latency by collection and command.',
+    MONGO_BUCKETS, ('collection', 'command', 'outcome'),
+))
+password_hash_duration = registry.register(Histogram(
+    'password_hash_duration_seconds', 'bcrypt time per operation, including pool queueing.',
+    HASH_BUCKETS, ('operation',),
+))
+
+
+class MetricsMiddleware:
+    """Times every HTTP request; labels use the matched route's path template."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        status_code = 500
+        started = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message['type'] == 'http.response.start':
+                status_code = message['status']
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = scope.get('route')
+            http_request_duration.observe(
+                time.perf_counter() - started,
+                scope['method'], getattr(route, 'path', 'unmatched'), status_code,
+            )
+
+
+# Commands whose first field is not a collection name
+_NON_COLLECTION_COMMANDS = frozenset({
+    'hello', 'ismaster', 'isMaster', 'ping', 'buildInfo', 'buildinfo', 'endSessions',
+    'saslStart', 'saslContinue', 'getMore', 'killCursors', 'listCollections',
+    'listDatabases', 'explain', 'serverStatus', 'abortTransaction', 'commitTransaction',
+})
+
+
+class MongoCommandListener(monitoring.CommandListener):
+    """
+    Command-monitoring listener for the Motor client. The collection is only
+    known from the started event, so it is kept per request id until the
+    matching succeeded/failed event; getMore is labelled with its own
+    'collection' field.
+    """
+
+    def __init__(self):
+        self._pending: dict[tuple, tuple[str, str]] = {}
+
+    def started(self, event: monitoring.CommandStartedEvent):
+        name = event.command_name
+        if name == 'getMore':
+            collection = event.command.get('collection', '')
+        elif name in _NON_COLLECTION_COMMANDS:
+            collection = ''
+        else:
+            collection = event.command.get(name, '')
+            if not isinstance(collection, str):
+                collection = ''
+        self._pending[(event.request_id, event.connection_id)] = (collection, name)
+
+    def _finished(self, event, outcome: str):
+        collection, name = self._pending.pop(
+            (event.request_id, event.connection_id), ('', event.command_name)
+        )
+        mongo_command_duration.observe(event.duration_micros / 1e6, collection, name, outcome)
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent):
+        self._finished(event, 'success')
+
+    def failed(self, event: monitoring.CommandFailedEvent):
+        self._finished(event, 'failure')
+
+
+mongo_command_listener = MongoCommandListener()
@@ -0,0 +1,153 @@
+"""
+On-demand statistical profiler for a live worker.
+
+A background thread samples the event-loop thread's Python stack at a fixed
+interval (sys._current_frames), so nothing is instrumented and the loop
+itself never pauses; the cost is one stack walk per sample. Each sample is
+attributed to the outermost coroutine on the stack, i.e. the task that held
+the loop, and a stack with no coroutine counts as the loop being idle.
+Output is in the collapsed-stack format read by flamegraph.pl and speedscope.
+"""
+import asyncio
+import inspect
+import sys
+import threading
+import time
+from collections import Counter
+from types import CodeType, FrameType
+
+from config import settings
+
+
+class ProfilerBusyError(Exception):
+    """A profile is already running on this worker."""
+
+
+class SamplingProfiler:
+    def __init__(self):
+        self._running = threading.Lock()
+        self._labels: dict[CodeType, str] = {}
+
+    def _label(self, frame: FrameType) -> str:
+        code = frame.f_code
+        label = self._labels.get(code)
+        if label is None:
+            module = frame.f_globals.get('__name__', '?')
+            name = getattr(code, 'co_qualname', code.co_name)
+            label = self._labels[code] = f'{module}:{name}'
+        return label
+
+    def _sample(self, thread_id: int):
+        """Stack (root first) and the outermost coroutine frame, if any."""
+        frame = sys._current_frames().get(thread_id)
+        frames = []
+        while frame is not None:
+            frames.append(frame)
+            frame = frame.f_back
+        frames.reverse()
+        task_frame = next(
+            (frame for frame in frames if frame.f_code.co_flags & inspect.CO_COROUTINE), None
+        )
+        return [self._label(frame) for frame in frames], task_frame
+
+    def _run(self, thread_id: int, duration: float, interval: float) -> dict:
+        stacks: Counter = Counter()
+        coroutines: Counter = Counter()
+        # longest stretch of consecutive samples inside one coroutine frame,
+        # roughly how long it held the loop without yielding
+        longest: dict[str, int] = {}
+        previous, streak = None, 0
+        samples = idle = 0
+
+        last = time.perf_counter()
+        deadline = last + duration
+        while True:
+            time.sleep(interval)
+            now = time.perf_counter()
+            if now > deadline:
+                break
+            # a busy loop holds the GIL and delays our wake-up; weighting by
+            # the time since the last sample keeps it from being under-counted
+            weight = max(1, round((now - last) / interval))
+            last = now
+            stack, task_frame = self._sample(thread_id)
+            samples += weight
+            stacks[';'.join(stack)] += weight
+            if task_frame is None:
+                idle += weight
+                previous, streak = None, 0
+            else:
+                name = self._label(task_frame)
+                coroutines[name] += weight
+                streak = streak + weight if task_frame is previous else weight
+                previous = task_frame
+                longest[name] = max(longest.get(name, 0), streak)
+            del stack, task_frame
+        previous = None
+
+        return {
+            'samples': samples,
+            'idle_samples': idle,
+            'stacks': stacks,
+            'coroutines': coroutines,
+            'longest': longest,
+        }
+
+    async def profile(
+        self,
+        duration: float,
+        interval: float = settings.PROFILER_INTERVAL,
+        top: int = 20,
+    ) -> dict:
+        """Sample the current event loop's thread for `duration` seconds."""
+        if not self._running.acquire(blocking=False):
+            raise ProfilerBusyError()
+        try:
+            thread_id = threading.get_ident()
+            started = time.perf_counter()
+            result = await asyncio.to_thread(self._run, thread_id, duration, interval)
+            elapsed = time.perf_counter() - started
+        finally:
+            self._running.release()
+
+        samples = result['samples']
+        coroutines = [
+            {
+                'name': name,
+                'samples': count,
+                'seconds': round(count * interval, 4),
+                'longest_run_seconds': round(result['longest'][name] * interval, 4),
+            }
+            for name, count in result['coroutines'].most_common(top)
+        ]
+        return {
+            'duration': round(elapsed, 3),
+            'interval': interval,
+            'samples': samples,
+            'loop_busy_ratio': round(1 - result['idle_samples'] / samples, 4) if samples else 0.0,
+            'coroutines': coroutines,
+            'tasks': task_summary(top),
+            'collapsed': collapsed(result['stacks']),
+        }
+
+
+def task_summary(top: int = 20) -> dict:
+    """Pending tasks on the running loop, grouped by coroutine."""
+    tasks = asyncio.all_tasks()
+    by_coroutine = Counter(
+        getattr(task.get_coro(), '__qualname__', repr(task.get_coro())) for task in tasks
+    )
+    return {
+        'total': len(tasks),
+        'by_coroutine': [
+            {'name': name, 'count': count} for name, count in by_coroutine.most_common(top)
+        ],
+    }
+
+
+def collapsed(stacks: Counter) -> str:
+    """One 'frame;frame;frame count' line per distinct stack."""
+    return ''.join(f'{stack} {count}\n' for stack, count in stacks.most_common())
+
+
+profiler = SamplingProfiler()
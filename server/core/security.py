@@ -1,14 +1,24 @@
+import asyncio
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
 from passlib.context import CryptContext
 from jose import jwt, JWTError
 from datetime import datetime, timedelta, timezone
 from config import settings
-from typing import Any, Dict, Optional
+from exceptions import HashingOverloadedError
+from core.metrics import password_hash_duration
+from typing import Any, Callable, Dict, Optional
 # SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES
 
+# min/max pinned to the configured cost so hashes made with any other cost
+# are reported by verify_and_update and rehashed on the next login
 pwd_context = CryptContext(
     schemes=["bcrypt"], 
     deprecated="auto", 
-    bcrypt__rounds=14
+    bcrypt__rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__min_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__max_rounds=settings.BCRYPT_ROUNDS,
 )
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
@@ -25,6 +35,107 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
+def verify_and_update_password(
+    plain_password: str,
+    hashed_password: str
+) -> tuple[bool, str | None]:
+    """
+    Verify, and return a fresh hash if the stored one uses another cost.
+    """
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt in a process pool so hashing never blocks the event loop.
+
+    At most `max_pending` operations may be queued or running; beyond that
+    calls fail fast with HashingOverloadedError instead of piling up.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = settings.PASSWORD_HASH_WORKERS,
+        max_pending: int = settings.PASSWORD_HASH_MAX_PENDING,
+    ):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.pending = 0
+        self.rejected = 0
+        self.timings: dict[str, dict[str, float]] = {}
+        self._executor: ProcessPoolExecutor | None = None
+
+    def start(self):
+        if self._executor is None:
+            # spawn: forking a process that already runs Motor's threads is unsafe
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context('spawn'),
+            )
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run('verify', verify_password, plain_password, hashed_password)
+
+    async def hash(self, password: str) -> str:
+        return await self._run('hash', get_password_hash, password)
+
+    async def verify_and_update(
+        self,
+        plain_password: str,
+        hashed_password: str
+    ) -> tuple[bool, str | None]:
+        return await self._run(
+            'verify', verify_and_update_password, plain_password, hashed_password
+        )
+
+    async def _run(self, operation: str, fn: Callable, *args):
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise HashingOverloadedError()
+        self.start()
+        self.pending += 1
+        started = time.perf_counter()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(
+                self._executor, fn, *args
+            )
+        finally:
+            self.pending -= 1
+            self._record(operation, time.perf_counter() - started)
+
+    def _record(self, operation: str, seconds: float):
+        password_hash_duration.observe(seconds, operation)
+        timing = self.timings.setdefault(
+            operation, {'count': 0, 'total_seconds': 0.0, 'max_seconds': 0.0}
+        )
+        timing['count'] += 1
+        timing['total_seconds'] += seconds
+        timing['max_seconds'] = max(timing['max_seconds'], seconds)
+
+    def stats(self) -> dict:
+        return {
+            'workers': self.max_workers,
+            'pending': self.pending,
+            'max_pending': self.max_pending,
+            'rejected': self.rejected,
+            'operations': {
+                operation: {
+                    **timing,
+                    'avg_seconds': timing['total_seconds'] / timing['count'],
+                }
+                for operation, timing in self.timings.items()
+            },
+        }
+
+
+password_hasher = PasswordHasher()
+
+
 def create_access_token(
     data: Dict[str, Any],
     expires_delta: Optional[timedelta] = None
@@ -0,0 +1,72 @@
+"""
+uvicorn WebSocket protocol with tuned permessage-deflate.
+
+uvicorn's own negotiation uses zlib defaults (15-bit windows, memLevel 8,
+context takeover), roughly 300 KiB of compressor state per socket that
+lives as long as the socket does. Chat sockets are many and mostly idle,
+so the window and memLevel are capped. Pass the class to uvicorn:
+`uvicorn.run(app, ws=DeflateWebSocketProtocol)` (see `manage.py serve`).
+"""
+import time
+
+from uvicorn.protocols.websockets.websockets_impl import WebSocketProtocol
+from websockets.frames import CTRL_OPCODES
+from websockets.extensions.permessage_deflate import (
+    PerMessageDeflate,
+    ServerPerMessageDeflateFactory,
+)
+
+from config import settings
+from core.compression import compression_stats
+
+WS_ROUTE = '/ws/chat/{chat_type}/{chat_id}'
+
+
+class MeteredPerMessageDeflate(PerMessageDeflate):
+    """Counts outbound data frame bytes and compression CPU time per frame."""
+
+    def encode(self, frame):
+        if frame.opcode in CTRL_OPCODES:
+            # pings, pongs and closes are never compressed
+            return super().encode(frame)
+        started = time.thread_time()
+        encoded = super().encode(frame)
+        compression_stats.record(
+            WS_ROUTE, 'permessage-deflate',
+            len(frame.data), len(encoded.data), time.thread_time() - started,
+        )
+        return encoded
+
+
+class MeteredServerPerMessageDeflateFactory(ServerPerMessageDeflateFactory):
+    def process_request_params(self, params, accepted_extensions):
+        response_params, extension = super().process_request_params(params, accepted_extensions)
+        # same negotiated parameters, metered encode
+        metered = MeteredPerMessageDeflate(
+            extension.remote_no_context_takeover,
+            extension.local_no_context_takeover,
+            extension.remote_max_window_bits,
+            extension.local_max_window_bits,
+            self.compress_settings,
+        )
+        return response_params, metered
+
+
+def deflate_factory() -> ServerPerMessageDeflateFactory:
+    window_bits = settings.WS_DEFLATE_WINDOW_BITS
+    return MeteredServerPerMessageDeflateFactory(
+        server_no_context_takeover=settings.WS_DEFLATE_NO_CONTEXT_TAKEOVER,
+        server_max_window_bits=window_bits,
+        # ask browsers for the same window; they may keep context takeover
+        client_max_window_bits=window_bits,
+        compress_settings={'memLevel': settings.WS_DEFLATE_MEM_LEVEL},
+    )
+
+
+class DeflateWebSocketProtocol(WebSocketProtocol):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # replaces the default factory uvicorn passed to websockets
+        self.available_extensions = (
+            [deflate_factory()] if settings.WS_PER_MESSAGE_DEFLATE else []
+        )
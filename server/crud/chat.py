@@ -1,8 +1,12 @@
+import logging
+from typing import AsyncIterator
 from fastapi import status, HTTPException
-from fastapi.responses import JSONResponse
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from config import settings
 from crud.user import User
+from crud.message import MessageManager
+from crud.inbox import InboxManager
+from service.membership_cache import get_cached_membership
 from models import (
     MessageModel,
     MessageRecipientModel,
@@ -10,34 +14,116 @@ from models import (
 import schemas
 from serializers import serializers
 
+logger = logging.getLogger(__name__)
+
 
 class ChatNotFoundException(Exception):
     pass
 
 
+# Chat documents may still carry the legacy embedded 'messages' array until
+# migrations/split_messages.py has run; never load it.
+CHAT_PROJECTION = {'messages': 0}
+
+# Streamed chats skip response_model validation, so shape them in the query.
+STREAM_CHAT_PROJECTION = {'_id': 0, 'messages': 0}
+
+MEMBERSHIP_PROJECTION = {'_id': 0, 'chat_id': 1, 'type': 1, 'member_ids': 1}
+
+
 class BaseChatManager:
     def __init__(self, db: AsyncIOMotorDatabase, chat_collection: str , user_manager: User):
         self.db = db
         self.chat_collection = self.db[chat_collection]
         self.user_manager = user_manager
+        self.message_manager = MessageManager(db)
+        self.inbox_manager = InboxManager(db)
 
     async def get_chat_by_id(self, chat_id: str) -> dict:
-        chat = await self.chat_collection.find_one({'chat_id': chat_id})
+        chat = await self.chat_collection.find_one({'chat_id': chat_id}, CHAT_PROJECTION)
         if not chat:
             raise ChatNotFoundException(f'Chat with id {chat_id} not found')
         return chat
 
-    async def get_chat_messages(self, chat_id: str) -> list[schemas.Message]:
-        chat = await self.get_chat_by_id(chat_id)
-        return chat['messages']
+    async def load_chat_membership(self, chat_id: str) -> dict:
+        chat = await self.chat_collection.find_one({'chat_id': chat_id}, MEMBERSHIP_PROJECTION)
+        if not chat:
+            raise ChatNotFoundException(f'Chat with id {chat_id} not found')
+        return chat
+
+    async def get_chat_membership(self, chat_id: str) -> dict:
+        """
+        {chat_id, type, member_ids} from the membership cache; only a miss
+        reads Mongo, and then only those fields.
+        """
+        return await get_cached_membership(chat_id, self.load_chat_membership)
+
+    async def is_member(self, chat_id: str, user_id: str) -> bool:
+        try:
+            chat = await self.get_chat_membership(chat_id)
+        except ChatNotFoundException:
+            return False
+        return user_id in chat['member_ids']
+
+    async def get_chat_messages(
+        self,
+        chat_id: str,
+        cursor: schemas.MessageCursor | None = None,
+        limit: int = settings.MESSAGE_PAGE_SIZE,
+    ) -> dict:
+        """
+        One page of a chat's history, see MessageManager.get_page.
+        Returns {'messages': [...], 'next_cursor': str | None}.
+        """
+        messages, next_cursor = await self.message_manager.get_page(chat_id, cursor, limit)
+        return {'messages': messages, 'next_cursor': next_cursor}
 
     async def get_chats_from_ids(self, chat_ids: list[str]) -> list:
         # Query the collection for matching chat_ids
         matched_chats = await self.chat_collection.find(
-            {'chat_id': {'$in': chat_ids}}
+            {'chat_id': {'$in': chat_ids}}, CHAT_PROJECTION
         ).to_list(None)
         return matched_chats
 
+    async def iter_chats_from_ids(
+        self,
+        chat_ids: list[str],
+        batch_size: int = settings.STREAM_BATCH_SIZE,
+    ) -> AsyncIterator[dict]:
+        """
+        Like get_chats_from_ids plus latest-message previews, read and
+        enriched one cursor batch at a time.
+        """
+        cursor = self.chat_collection.find(
+            {'chat_id': {'$in': chat_ids}}, STREAM_CHAT_PROJECTION
+        ).batch_size(batch_size)
+        batch = []
+        try:
+            async for chat in cursor:
+                batch.append(chat)
+                if len(batch) >= batch_size:
+                    for enriched in await self.attach_latest_messages(batch):
+                        yield enriched
+                    batch = []
+            if batch:
+                for enriched in await self.attach_latest_messages(batch):
+                    yield enriched
+        finally:
+            await cursor.close()
+
+    async def attach_latest_messages(self, chats: list[dict]) -> list[dict]:
+        """
+        Fill each chat's 'messages' with its latest message only, enough for
+        chat list previews.
+        """
+        latest = await self.message_manager.get_latest_messages(
+            [chat['chat_id'] for chat in chats]
+        )
+        for chat in chats:
+            message = latest.get(chat['chat_id'])
+            chat['messages'] = [message] if message else []
+        return chats
+
     async def insert_chat_to_db(self, new_chat) -> bool:
         result = await self.chat_collection.insert_one(new_chat.model_dump())
         if result.acknowledged:
@@ -52,37 +138,63 @@ class BaseChatManager:
         encrypted_key_sender: str,
         encrypted_key_receiver: str,
         iv: str
-    ) -> schemas.Message:
-
-        chat = await self.get_chat_by_id(chat_id)
-
-        if current_user_id not in chat.get('member_ids'):
+    ) -> dict:
+        """
+        Store a message and return it as a plain dict, dumped exactly once so
+        the caller can encode it straight into a frame.
+        """
+        # cached, so the send path costs the message insert and one inbox bulk_write
+        if not await self.is_member(chat_id, current_user_id):
             raise HTTPException(
                 status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
                 detail='Message was not sent!'
             )
 
         new_message = MessageModel(
+            chat_id=chat_id,
             created_by=current_user_id, message=message,
             encrypted_key_sender=encrypted_key_sender,
             encrypted_key_receiver=encrypted_key_receiver,
             iv=iv
+        ).model_dump()
+
+        # stored as binary; the caller keeps the wire (text) form
+        document = serializers.message_to_document(new_message)
+        if not await self.message_manager.insert_message(document):
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail='Message was not sent!'
+            )
+        await self.inbox_manager.record_message(chat_id, document)
+        return new_message
+
+    async def get_inbox(
+        self,
+        user_id: str,
+        before: tuple | None = None,
+        limit: int = settings.INBOX_PAGE_SIZE,
+    ) -> dict:
+        """
+        One page of the user's chat list with recipients' cards resolved in
+        a single $in lookup. Returns {'entries': [...], 'next_cursor': str | None}.
+        """
+        entries, next_cursor = await self.inbox_manager.get_page(user_id, before, limit)
+        profiles = await self.user_manager.get_user_cards(
+            [entry['recipient_id'] for entry in entries if entry.get('recipient_id')]
         )
-        print('\n - new_message full', new_message.model_dump())
-        print('\n - new_message message only', new_message.model_dump()['message'])
-        print('\n - new_message type', type(new_message.model_dump()['message']))
-        
-
-        result = await self.chat_collection.update_one(
-            {'chat_id': chat_id},
-            {'$push': {'messages': new_message.model_dump()}}
-            # as I pushed new message inside messages,
-            # it will not create any default '_id' for new message
-            # if i use insert_one(), it will automatically create a '_id' field
-        )
+        for entry in entries:
+            entry['recipient_profile'] = profiles.get(entry.get('recipient_id'))
+        return {'entries': entries, 'next_cursor': next_cursor}
 
-        if result.matched_count == 1 and result.modified_count == 1:
-            return new_message
+    async def mark_read(self, user_id: str, chat_id: str):
+        if not await self.inbox_manager.mark_read(user_id, chat_id):
+            raise ChatNotFoundException(f'Chat with id {chat_id} not found')
+
+    async def get_unread_count(self, user_id: str, chat_id: str) -> int:
+        unread_count = await self.inbox_manager.get_unread_count(user_id, chat_id)
+        if unread_count is None:
+            raise ChatNotFoundException(f'Chat with id {chat_id} not found')
+        return unread_count
 
 
 class PrivateChatManager(BaseChatManager):
@@ -106,11 +218,8 @@ class PrivateChatManager(BaseChatManager):
         current_user_id: str,
         recipient_id: str
     ) -> schemas.PrivateChat:
-        print("-" * 50)
-        
         ids = [current_user_id, recipient_id]
         new_chat = PrivateChatModel(member_ids=ids)
-        print('----- new_chat', new_chat)
 
         inserted = await self.insert_chat_to_db(new_chat)
         # print('inserted', inserted)
@@ -118,6 +227,7 @@ class PrivateChatManager(BaseChatManager):
         if not inserted:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND, detail='Chat not created.')
+        logger.info('Created private chat %s for %s and %s', new_chat.chat_id, *ids)
 
         # In member ids, one is user another is recipient
         # user1, recipient1  = recipient2, user2 = ids
@@ -128,44 +238,32 @@ class PrivateChatManager(BaseChatManager):
         for user_id, recipient_id in message_recipients:
             recipient_model = MessageRecipientModel(
                 recipient_id=recipient_id, chat_id=new_chat.chat_id)
-            print('[+] recipient_model', recipient_model)
 
             # add chat_id to member's private_message_recipients field
             inserted = await self.user_manager.insert_private_message_recipient(
                 user_id, recipient_model
             )
-            print('[+] inserted', inserted)
             if not inserted:
                 raise HTTPException(
                     status_code=status.HTTP_404_NOT_FOUND,
                     detail='Message recipient was not added to user.'
                 )
 
+        await self.inbox_manager.create_entries(new_chat.chat_id, ids)
         return new_chat
 
     async def get_all_msg_recipients(self, user_id: str) -> list[schemas.MessageRecipient]:
-        user = await self.user_manager.get_by_id(user_id)
-        if user:
-            return user["private_message_recipients"]
-        return []
-
-    async def get_all_chats(self, user_id: str):
-        user = await self.user_manager.get_by_id(user_id)
-        if user:
-            chat_ids = [recipient['chat_id']
-                        for recipient in user.get('private_message_recipients')]
-            return await self.get_chats_from_ids(chat_ids)
-        return []
-    
+        return await self.user_manager.get_message_recipients(user_id)
+
     async def get_recipiet_id_from_chat_members(self, member_ids: list[str], current_user_id: str):
 
         recipiet_id = member_ids[0] if member_ids[1] == current_user_id else member_ids[1]
         return recipiet_id
     
     
-    async def get_recipient_profile(self, member_ids: list[str], current_user_id:str) -> schemas.User:
+    async def get_recipient_profile(self, member_ids: list[str], current_user_id:str) -> schemas.RecipientProfile:
         recipient_id = await self.get_recipiet_id_from_chat_members(member_ids, current_user_id)
-        user = await self.user_manager.get_by_id(recipient_id)
+        user = await self.user_manager.get_recipient_profile_by_id(recipient_id)
         return user
     
     async def get_recepient(
@@ -180,9 +278,9 @@ class PrivateChatManager(BaseChatManager):
         # Retrieve the user with the matching query
         # user = await self.chat_collection.find_one(query)
 
-        user = await self.user_manager.get_by_id(current_user_id)
-        if user['private_message_recipients']:
-            for recipient in user['private_message_recipients']:
+        recipients = await self.user_manager.get_message_recipients(current_user_id)
+        if recipients:
+            for recipient in recipients:
                 if recipient['recipient_id'] == recipient_id:
                     # print('--> recipient: ', recipient)
                     return recipient
@@ -202,7 +300,7 @@ class PrivateChatManager(BaseChatManager):
         raw = await self.chat_collection.find_one({
             "type": "private",
             "member_ids": {"$all": [user1_id, user2_id]},
-        })
+        }, CHAT_PROJECTION)
         if not raw:
             return None
 
@@ -0,0 +1,380 @@
+from datetime import datetime, timedelta
+from fastapi import status, HTTPException
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ASCENDING, DESCENDING, ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError
+from config import settings
+from crud.chat import BaseChatManager, ChatNotFoundException
+from crud.inbox import message_preview
+from crud.user import User
+from models import GroupChatModel, GroupInviteModel, GroupMemberModel, GroupMessageModel
+from serializers import serializers
+from service.connections import evict_member
+from service.membership_cache import get_cached_membership, invalidate_membership
+from utils import datetime_now, decode_keyset_cursor, encode_keyset_cursor
+
+
+# Chat metadata only; last_message is shaped separately for list pages.
+GROUP_PROJECTION = {'_id': 0, 'last_message': 0, 'last_message_at': 0, 'message_count': 0}
+
+GROUP_MEMBER_PROJECTION = {'_id': 0, 'user_id': 1, 'role': 1, 'joined_at': 1, 'key_epoch': 1}
+
+
+class GroupFullException(Exception):
+    pass
+
+
+class GroupInviteRequiredException(Exception):
+    pass
+
+
+class GroupPermissionException(Exception):
+    pass
+
+
+def member_cache_key(chat_id: str, user_id: str) -> str:
+    return f'{chat_id}:{user_id}'
+
+
+def decode_group_cursor(cursor: str) -> tuple[datetime, str]:
+    try:
+        return decode_keyset_cursor(cursor)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail='Invalid cursor'
+        )
+
+
+class GroupChatManager(BaseChatManager):
+    """
+    Group chats sized for thousands of members.
+
+    Membership is one small document per (chat_id, user_id) in groupMembers,
+    so joining or leaving never rewrites a member list and a membership
+    check is one indexed lookup (cached per member). Groups are invite-only:
+    the owner invites a user, who can then join once. Messages are encrypted
+    once with a shared group key that each member holds wrapped with their
+    own public key; a send is one message insert plus two single-document
+    updates, whatever the group's size. Unread counts are the group's
+    message_count minus the member's read_count, so nothing is written per
+    member per message.
+    """
+
+    def __init__(self, db: AsyncIOMotorDatabase, user_manager: User):
+        super().__init__(db, 'groupChat', user_manager)
+        self.member_collection = self.db['groupMembers']
+        self.invite_collection = self.db['groupInvites']
+
+    async def get_group(self, chat_id: str) -> dict:
+        group = await self.chat_collection.find_one({'chat_id': chat_id}, GROUP_PROJECTION)
+        if not group:
+            raise ChatNotFoundException(f'Chat with id {chat_id} not found')
+        return group
+
+    async def load_member(self, key: str) -> dict:
+        chat_id, user_id = key.split(':', 1)
+        member = await self.member_collection.find_one(
+            {'chat_id': chat_id, 'user_id': user_id}, {'_id': 0, 'role': 1}
+        )
+        return {'role': member['role'] if member else None}
+
+    async def get_member_role(self, chat_id: str, user_id: str) -> str | None:
+        """The member's role, or None if not a member; cached either way."""
+        member = await get_cached_membership(member_cache_key(chat_id, user_id), self.load_member)
+        return member['role']
+
+    async def is_member(self, chat_id: str, user_id: str) -> bool:
+        return await self.get_member_role(chat_id, user_id) is not None
+
+    async def create_chat(self, current_user_id: str, chat_name: str, encrypted_key: str) -> dict:
+        group = GroupChatModel(chat_name=chat_name, created_by=current_user_id)
+        owner = GroupMemberModel(
+            chat_id=group.chat_id, user_id=current_user_id, role='owner',
+            encrypted_key=encrypted_key, key_epoch=group.key_epoch,
+        )
+        await self.chat_collection.insert_one(group.model_dump())
+        await self.member_collection.insert_one(owner.model_dump())
+        await invalidate_membership(member_cache_key(group.chat_id, current_user_id))
+        return group.model_dump(exclude={'last_message', 'last_message_at', 'message_count'})
+
+    async def invite(self, chat_id: str, inviter_id: str, user_id: str) -> dict:
+        """
+        Let user_id join the group once; only the owner can invite. Inviting
+        again renews the invite, which expires after GROUP_INVITE_TTL.
+        """
+        if await self.get_member_role(chat_id, inviter_id) != 'owner':
+            raise GroupPermissionException(f'Only the owner can invite to chat {chat_id}')
+        invite = GroupInviteModel(
+            chat_id=chat_id, user_id=user_id, invited_by=inviter_id,
+            expires_at=datetime_now() + timedelta(seconds=settings.GROUP_INVITE_TTL),
+        )
+        await self.invite_collection.update_one(
+            {'chat_id': chat_id, 'user_id': user_id},
+            {'$set': invite.model_dump()},
+            upsert=True,
+        )
+        return invite.model_dump()
+
+    async def join(self, chat_id: str, user_id: str) -> dict:
+        """
+        Add an invited member, reserving a slot first so member_count never
+        passes GROUP_MAX_MEMBERS; the invite is used up. Joining twice is a
+        no-op. The new member starts with everything so far read and no key
+        until a member wraps one.
+        """
+        if await self.is_member(chat_id, user_id):
+            return await self.get_group(chat_id)
+        invite = await self.invite_collection.find_one_and_delete(
+            {'chat_id': chat_id, 'user_id': user_id, 'expires_at': {'$gt': datetime_now()}},
+            projection={'_id': 0},
+        )
+        if invite is None:
+            await self.get_group(chat_id)
+            raise GroupInviteRequiredException(f'No invite to chat {chat_id}')
+        group = await self.chat_collection.find_one_and_update(
+            {'chat_id': chat_id, 'member_count': {'$lt': settings.GROUP_MAX_MEMBERS}},
+            {'$inc': {'member_count': 1}},
+            projection={'_id': 0, 'message_count': 1},
+        )
+        if group is None:
+            # keep the invite for when a slot frees up
+            await self._restore_invite(invite)
+            await self.get_group(chat_id)
+            raise GroupFullException(f'Chat with id {chat_id} is full')
+
+        member = GroupMemberModel(
+            chat_id=chat_id, user_id=user_id, read_count=group['message_count']
+        )
+        try:
+            await self.member_collection.insert_one(member.model_dump())
+        except DuplicateKeyError:
+            # already a member: give the slot and the invite back
+            await self.chat_collection.update_one({'chat_id': chat_id}, {'$inc': {'member_count': -1}})
+            await self._restore_invite(invite)
+        await invalidate_membership(member_cache_key(chat_id, user_id))
+        return await self.get_group(chat_id)
+
+    async def _restore_invite(self, invite: dict):
+        """Put back an invite taken by a join that did not add the member."""
+        try:
+            await self.invite_collection.insert_one(invite)
+        except DuplicateKeyError:
+            # the owner has invited again meanwhile
+            pass
+
+    async def leave(self, chat_id: str, user_id: str):
+        """
+        Remove a member, close their sockets for the chat on every worker and
+        rotate the key epoch, so remaining members must distribute a new group
+        key before the next message; the last member out deletes the group.
+        """
+        result = await self.member_collection.delete_one({'chat_id': chat_id, 'user_id': user_id})
+        if result.deleted_count != 1:
+            raise ChatNotFoundException(f'Chat with id {chat_id} not found')
+        await invalidate_membership(member_cache_key(chat_id, user_id))
+        await evict_member(chat_id, user_id)
+        group = await self.chat_collection.find_one_and_update(
+            {'chat_id': chat_id},
+            {'$inc': {'member_count': -1, 'key_epoch': 1}},
+            projection={'_id': 0, 'member_count': 1},
+            return_document=ReturnDocument.AFTER,
+        )
+        if group is not None and group['member_count'] <= 0:
+            await self.chat_collection.delete_one({'chat_id': chat_id, 'member_count': {'$lte': 0}})
+
+    async def get_user_groups(
+        self,
+        user_id: str,
+        before: tuple[datetime, str] | None = None,
+        limit: int = settings.GROUP_PAGE_SIZE,
+    ) -> dict:
+        """
+        A user's groups, most recently joined first, keyset paginated on
+        (joined_at, chat_id); groups are then read with one $in lookup.
+        Returns {'groups': [...], 'next_cursor': str | None}.
+        """
+        limit = max(1, min(limit, settings.GROUP_PAGE_SIZE_MAX))
+        query: dict = {'user_id': user_id}
+        if before is not None:
+            joined_at, chat_id = before
+            query['$or'] = [
+                {'joined_at': {'$lt': joined_at}},
+                {'joined_at': joined_at, 'chat_id': {'$lt': chat_id}},
+            ]
+        memberships = await self.member_collection.find(
+            query, {'_id': 0, 'chat_id': 1, 'role': 1, 'joined_at': 1, 'read_count': 1}
+        ).sort([('joined_at', DESCENDING), ('chat_id', DESCENDING)]).limit(limit + 1).to_list(None)
+
+        next_cursor = None
+        if len(memberships) > limit:
+            memberships = memberships[:limit]
+            last = memberships[-1]
+            next_cursor = encode_keyset_cursor(last['joined_at'], last['chat_id'])
+
+        groups = {
+            group['chat_id']: group
+            async for group in self.chat_collection.find(
+                {'chat_id': {'$in': [membership['chat_id'] for membership in memberships]}},
+                {'_id': 0},
+            )
+        }
+        page = []
+        for membership in memberships:
+            group = groups.get(membership['chat_id'])
+            if group is None:
+                continue
+            message_count = group.pop('message_count', 0)
+            group.pop('last_message_at', None)
+            group['role'] = membership['role']
+            group['unread_count'] = max(0, message_count - membership['read_count'])
+            page.append(group)
+        return {'groups': page, 'next_cursor': next_cursor}
+
+    async def get_members(
+        self,
+        chat_id: str,
+        after: str | None = None,
+        limit: int = settings.GROUP_MEMBER_PAGE_SIZE,
+    ) -> dict:
+        """
+        One page of members ordered by user_id, straight off the
+        (chat_id, user_id) index; next_cursor is the last user_id. Members
+        whose key_epoch is behind the group's still need the current key.
+        """
+        limit = max(1, min(limit, settings.GROUP_MEMBER_PAGE_SIZE_MAX))
+        query: dict = {'chat_id': chat_id}
+        if after is not None:
+            query['user_id'] = {'$gt': after}
+        members = await self.member_collection.find(query, GROUP_MEMBER_PROJECTION).sort(
+            'user_id', ASCENDING
+        ).limit(limit + 1).to_list(None)
+        next_cursor = None
+        if len(members) > limit:
+            members = members[:limit]
+            next_cursor = members[-1]['user_id']
+        return {'members': members, 'next_cursor': next_cursor}
+
+    async def get_member_key(self, chat_id: str, user_id: str) -> dict:
+        member = await self.member_collection.find_one(
+            {'chat_id': chat_id, 'user_id': user_id},
+            {'_id': 0, 'encrypted_key': 1, 'key_epoch': 1},
+        )
+        if member is None:
+            raise ChatNotFoundException(f'Chat with id {chat_id} not found')
+        group = await self.get_group(chat_id)
+        return {
+            'chat_id': chat_id,
+            'encrypted_key': member.get('encrypted_key'),
+            'key_epoch': member.get('key_epoch'),
+            'current_key_epoch': group['key_epoch'],
+        }
+
+    async def set_member_keys(self, chat_id: str, key_epoch: int, keys: dict[str, str]) -> int:
+        """
+        Store wrapped copies of the group key for the current epoch; sent in
+        batches of at most GROUP_KEY_BATCH_MAX by a member after creating or
+        rotating the key. Users who are not members are skipped.
+        """
+        group = await self.get_group(chat_id)
+        if group['key_epoch'] != key_epoch:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"Key epoch {key_epoch} is not current ({group['key_epoch']})."
+            )
+        if not keys:
+            return 0
+        result = await self.member_collection.bulk_write([
+            UpdateOne(
+                {'chat_id': chat_id, 'user_id': user_id},
+                {'$set': {'encrypted_key': encrypted_key, 'key_epoch': key_epoch}},
+            )
+            for user_id, encrypted_key in keys.items()
+        ], ordered=False)
+        return result.modified_count
+
+    async def create_message(
+        self,
+        current_user_id: str,
+        chat_id: str,
+        message: str,
+        iv: str,
+        key_epoch: int,
+    ) -> dict:
+        """
+        Store a group message: one ciphertext, no per-member keys. The
+        message is inserted first; the group document then takes the new
+        count and preview only if key_epoch is still current, and otherwise
+        the message is deleted again, which keeps a rotated-out key from
+        being used. Counts therefore never include a message that was not
+        stored.
+        """
+        if not await self.is_member(chat_id, current_user_id):
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail='Message was not sent!'
+            )
+
+        new_message = GroupMessageModel(
+            chat_id=chat_id, created_by=current_user_id,
+            message=message, iv=iv, key_epoch=key_epoch,
+        ).model_dump()
+        document = serializers.message_to_document(new_message)
+
+        if not await self.message_manager.insert_message(document):
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail='Message was not sent!'
+            )
+
+        created_at = document['created_at']
+        is_newer = {'$gt': [created_at, '$last_message_at']}
+        result = await self.chat_collection.update_one(
+            {'chat_id': chat_id, 'key_epoch': key_epoch},
+            [{'$set': {
+                'message_count': {'$add': ['$message_count', 1]},
+                'last_message': {
+                    '$cond': [is_newer, {'$literal': message_preview(document)}, '$last_message']
+                },
+                'last_message_at': {'$cond': [is_newer, created_at, '$last_message_at']},
+            }}],
+        )
+        if result.matched_count != 1:
+            await self.message_manager.delete_message(document['id'])
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail='The group key was rotated; fetch the current key and resend.'
+            )
+
+        # the sender has read their own message
+        await self.member_collection.update_one(
+            {'chat_id': chat_id, 'user_id': current_user_id},
+            {'$inc': {'read_count': 1}},
+        )
+        return new_message
+
+    async def mark_read(self, user_id: str, chat_id: str):
+        group = await self.chat_collection.find_one(
+            {'chat_id': chat_id}, {'_id': 0, 'message_count': 1}
+        )
+        if group is None:
+            raise ChatNotFoundException(f'Chat with id {chat_id} not found')
+        result = await self.member_collection.update_one(
+            {'chat_id': chat_id, 'user_id': user_id},
+            {'$max': {'read_count': group['message_count']}},
+        )
+        if result.matched_count != 1:
+            raise ChatNotFoundException(f'Chat with id {chat_id} not found')
+
+    async def get_unread_count(self, user_id: str, chat_id: str) -> int:
+        member = await self.member_collection.find_one(
+            {'chat_id': chat_id, 'user_id': user_id}, {'_id': 0, 'read_count': 1}
+        )
+        if member is None:
+            raise ChatNotFoundException(f'Chat with id {chat_id} not found')
+        group = await self.chat_collection.find_one(
+            {'chat_id': chat_id}, {'_id': 0, 'message_count': 1}
+        )
+        if group is None:
+            raise ChatNotFoundException(f'Chat with id {chat_id} not found')
+        return max(0, group['message_count'] - member['read_count'])
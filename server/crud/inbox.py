@@ -0,0 +1,129 @@
+from datetime import datetime
+from fastapi import status, HTTPException
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import DESCENDING, UpdateMany, UpdateOne
+from config import settings
+from utils import datetime_now, decode_keyset_cursor, encode_keyset_cursor
+
+
+INBOX_PROJECTION = {'_id': 0, 'user_id': 0}
+
+
+def decode_inbox_cursor(cursor: str) -> tuple[datetime, str]:
+    try:
+        return decode_keyset_cursor(cursor)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail='Invalid cursor'
+        )
+
+
+def message_preview(message: dict) -> dict:
+    """Everything the client needs to decrypt and show the last message."""
+    return {key: value for key, value in message.items() if key not in ('_id', 'chat_id')}
+
+
+class InboxManager:
+    """
+    Per-user chat list summaries, one document per (user_id, chat_id):
+    recipient_id, last_message, last_message_at, unread_count, last_read_at.
+
+    Entries are created with the chat and kept current by the send path, so
+    listing a user's chats never touches the messages collection.
+    """
+
+    def __init__(self, db: AsyncIOMotorDatabase, inbox_collection: str = 'inbox'):
+        self.db = db
+        self.inbox_collection = self.db[inbox_collection]
+
+    async def create_entries(self, chat_id: str, member_ids: list[str]):
+        """One entry per member; for private chats recipient_id is the other member."""
+        now = datetime_now()
+        operations = []
+        for user_id in member_ids:
+            others = [member_id for member_id in member_ids if member_id != user_id]
+            operations.append(UpdateOne(
+                {'user_id': user_id, 'chat_id': chat_id},
+                {'$setOnInsert': {
+                    'recipient_id': others[0] if len(others) == 1 else None,
+                    'last_message': None,
+                    'last_message_at': now,
+                    'unread_count': 0,
+                    'last_read_at': now,
+                }},
+                upsert=True,
+            ))
+        await self.inbox_collection.bulk_write(operations, ordered=False)
+
+    async def record_message(self, chat_id: str, message: dict):
+        """
+        Fold a new message into every member's entry with one bulk write:
+        the preview only moves forward in time (writes may land out of
+        order), and everyone but the sender gets one more unread message.
+        """
+        created_at = message['created_at']
+        is_newer = {'$gt': [created_at, '$last_message_at']}
+        latest = {
+            'last_message': {
+                '$cond': [is_newer, {'$literal': message_preview(message)}, '$last_message']
+            },
+            'last_message_at': {'$cond': [is_newer, created_at, '$last_message_at']},
+        }
+        sender_id = message['created_by']
+        await self.inbox_collection.bulk_write([
+            UpdateOne(
+                {'chat_id': chat_id, 'user_id': sender_id},
+                [{'$set': {**latest, 'last_read_at': {'$max': [created_at, '$last_read_at']}}}],
+            ),
+            UpdateMany(
+                {'chat_id': chat_id, 'user_id': {'$ne': sender_id}},
+                [{'$set': {**latest, 'unread_count': {'$add': [{'$ifNull': ['$unread_count', 0]}, 1]}}}],
+            ),
+        ], ordered=False)
+
+    async def mark_read(self, user_id: str, chat_id: str) -> bool:
+        result = await self.inbox_collection.update_one(
+            {'user_id': user_id, 'chat_id': chat_id},
+            {'$set': {'unread_count': 0, 'last_read_at': datetime_now()}}
+        )
+        return result.matched_count == 1
+
+    async def get_unread_count(self, user_id: str, chat_id: str) -> int | None:
+        entry = await self.inbox_collection.find_one(
+            {'user_id': user_id, 'chat_id': chat_id},
+            {'_id': 0, 'unread_count': 1}
+        )
+        if entry is None:
+            return None
+        return entry.get('unread_count', 0)
+
+    async def get_page(
+        self,
+        user_id: str,
+        before: tuple[datetime, str] | None = None,
+        limit: int = settings.INBOX_PAGE_SIZE,
+    ) -> tuple[list[dict], str | None]:
+        """
+        A user's entries, most recent activity first, keyset paginated on
+        (last_message_at, chat_id). next_cursor is None on the last page.
+        """
+        limit = max(1, min(limit, settings.INBOX_PAGE_SIZE_MAX))
+        query: dict = {'user_id': user_id}
+        if before is not None:
+            last_message_at, chat_id = before
+            query['$or'] = [
+                {'last_message_at': {'$lt': last_message_at}},
+                {'last_message_at': last_message_at, 'chat_id': {'$lt': chat_id}},
+            ]
+        # one extra row tells whether another page exists
+        entries = await self.inbox_collection.find(query, INBOX_PROJECTION).sort(
+            [('last_message_at', DESCENDING), ('chat_id', DESCENDING)]
+        ).limit(limit + 1).to_list(None)
+
+        next_cursor = None
+        if len(entries) > limit:
+            entries = entries[:limit]
+            last = entries[-1]
+            next_cursor = encode_keyset_cursor(last['last_message_at'], last['chat_id'])
+        return entries, next_cursor
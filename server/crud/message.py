@@ -0,0 +1,123 @@
+from typing import AsyncIterator
+from fastapi import status, HTTPException
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ASCENDING, DESCENDING
+from config import settings
+from service.message_writer import message_writer
+from utils import decode_keyset_cursor, encode_keyset_cursor
+import schemas
+
+
+# Never ship Mongo's _id, and chat_id is already known by the caller.
+MESSAGE_PROJECTION = {'_id': 0, 'chat_id': 0}
+
+def encode_cursor(message: dict) -> str:
+    """Keyset cursor for a message: its (created_at, id)."""
+    return encode_keyset_cursor(message['created_at'], message['id'])
+
+
+def decode_cursor(cursor: str, direction: str) -> schemas.MessageCursor:
+    try:
+        created_at, message_id = decode_keyset_cursor(cursor)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail='Invalid cursor'
+        )
+    return schemas.MessageCursor(
+        created_at=created_at, id=message_id, direction=direction
+    )
+
+
+class MessageManager:
+    """
+    Message store backed by its own collection, one document per message.
+    Chat documents only keep metadata (members, type, name).
+    """
+
+    def __init__(self, db: AsyncIOMotorDatabase, message_collection: str = 'messages'):
+        self.db = db
+        self.message_collection = self.db[message_collection]
+
+    async def insert_message(self, message: dict) -> bool:
+        if message_writer.running:
+            # batched; returns once the batch holding it is durable
+            return await message_writer.write(message)
+        result = await self.message_collection.insert_one(message)
+        # insert_one adds Mongo's _id to the document in place
+        message.pop('_id', None)
+        return result.acknowledged
+
+    async def delete_message(self, message_id: str):
+        """Undo an insert whose chat-side update did not go through."""
+        await self.message_collection.delete_one({'id': message_id})
+
+    async def get_page(
+        self,
+        chat_id: str,
+        cursor: schemas.MessageCursor | None = None,
+        limit: int = settings.MESSAGE_PAGE_SIZE,
+    ) -> tuple[list[dict], str | None]:
+        """
+        Keyset pagination over (created_at, id); 'id' breaks ties between
+        messages created in the same millisecond.
+
+        Without a cursor the newest page is returned. A 'before' cursor walks
+        towards older messages, an 'after' cursor towards newer ones. Pages
+        are always in chronological order; the returned next cursor continues
+        in the same direction and is None once the end is reached.
+        """
+        limit = max(1, min(limit, settings.MESSAGE_PAGE_SIZE_MAX))
+        query = {'chat_id': chat_id}
+        newest_first = cursor is None or cursor.direction == 'before'
+        if cursor is not None:
+            op = '$lt' if newest_first else '$gt'
+            query['$or'] = [
+                {'created_at': {op: cursor.created_at}},
+                {'created_at': cursor.created_at, 'id': {op: cursor.id}},
+            ]
+        order = DESCENDING if newest_first else ASCENDING
+
+        messages = await self.message_collection.find(
+            query, MESSAGE_PROJECTION
+        ).sort([('created_at', order), ('id', order)]).limit(limit + 1).to_list(None)
+
+        has_more = len(messages) > limit
+        messages = messages[:limit]
+        next_cursor = encode_cursor(messages[-1]) if has_more else None
+        if newest_first:
+            messages.reverse()
+        return messages, next_cursor
+
+    async def iter_messages(
+        self,
+        chat_id: str,
+        batch_size: int = settings.STREAM_BATCH_SIZE,
+    ) -> AsyncIterator[dict]:
+        """A chat's whole history, oldest first, read one cursor batch at a time."""
+        cursor = self.message_collection.find(
+            {'chat_id': chat_id}, MESSAGE_PROJECTION
+        ).sort([('created_at', ASCENDING), ('id', ASCENDING)]).batch_size(batch_size)
+        try:
+            async for message in cursor:
+                yield message
+        finally:
+            await cursor.close()
+
+    async def get_latest_messages(self, chat_ids: list[str]) -> dict[str, dict]:
+        """
+        Return {chat_id: latest message} for the given chats in one query.
+        Chats without messages are left out.
+        """
+        pipeline = [
+            {'$match': {'chat_id': {'$in': chat_ids}}},
+            {'$sort': {'chat_id': ASCENDING, 'created_at': DESCENDING, 'id': DESCENDING}},
+            {'$group': {'_id': '$chat_id', 'message': {'$first': '$$ROOT'}}},
+        ]
+        latest = {}
+        async for row in self.message_collection.aggregate(pipeline):
+            message = row['message']
+            message.pop('_id', None)
+            message.pop('chat_id', None)
+            latest[row['_id']] = message
+        return latest
@@ -1,5 +1,6 @@
-import schemas
-from core.security import get_password_hash, verify_password
+import logging
+
+from core.security import password_hasher
 from serializers import serializers
 from models.user import UserModel
 from fastapi import status, HTTPException
@@ -9,17 +10,70 @@ from schemas import (
 )
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from exceptions import UserCreationError
+from service.user_cache import invalidate_user
+from crud.user_loader import UserLoader
 from config import settings
 from bson import ObjectId 
 from bson.errors import InvalidId
+import base64
+import binascii
+from pymongo import ASCENDING
+
+logger = logging.getLogger(__name__)
+
+
+# Projections paired with the read models in schemas/user.py. Inclusion
+# projections always return _id, which is normalized into 'id'.
+AUTH_PROJECTION = {
+    'username': 1, 'email': 1, 'roles': 1,
+    'is_active': 1, 'is_disabled': 1, 'token_version': 1,
+}
+CARD_PROJECTION = {
+    'username': 1, 'first_name': 1, 'last_name': 1, 'is_online': 1, 'last_seen': 1,
+}
+DIRECTORY_PROJECTION = {**CARD_PROJECTION, 'email': 1}
+KEY_BUNDLE_PROJECTION = {'public_key_pem': 1}
+RECIPIENT_PROJECTION = {**CARD_PROJECTION, 'public_key_pem': 1}
+PASSWORD_PROJECTION = {'password': 1}
+MESSAGE_RECIPIENTS_PROJECTION = {'private_message_recipients': 1}
+# The account owner's own view: everything except the hash and the
+# ever-growing chat lists.
+ACCOUNT_PROJECTION = {'password': 0, 'private_message_recipients': 0, 'group_chat_ids': 0}
+
+
+def encode_directory_cursor(user: dict) -> str:
+    """Keyset cursor for the directory: '<username_lower>:<id>', base64url."""
+    raw = f'{user["username_lower"]}:{user["_id"]}'.encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_directory_cursor(cursor: str) -> tuple[str, ObjectId]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        username_lower, id = raw.rsplit(':', 1)
+        return username_lower, ObjectId(id)
+    except (binascii.Error, UnicodeDecodeError, ValueError, InvalidId):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail='Invalid cursor'
+        )
+
+
+def prefix_range(prefix: str) -> dict:
+    """Index-friendly range matching every string that starts with prefix."""
+    upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+    return {'$gte': prefix, '$lt': upper}
 
 
 class BaseUserManager:
     def __init__(self, db: AsyncIOMotorDatabase):
         self.db = db
         self.user_collection = self.db['users']
+        # request-scoped: managers are built per request by api.deps
+        self.profile_loader = UserLoader(self.user_collection, RECIPIENT_PROJECTION)
+        self.card_loader = UserLoader(self.user_collection, CARD_PROJECTION)
 
-    async def get_by_id(self, id: str) -> UserInDb:
+    async def get_by_id(self, id: str, projection: dict | None = None) -> UserInDb:
         # 1) ensure it’s a valid 24-hex string and convert
         try:
             oid = ObjectId(id)
@@ -29,7 +83,7 @@ class BaseUserManager:
                 detail="Invalid user ID format"
             )
         # 2) lookup by the real _id
-        user = await self.user_collection.find_one({'_id': oid})
+        user = await self.user_collection.find_one({'_id': oid}, projection)
         if not user:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
                                 detail=f'User not found')
@@ -37,8 +91,8 @@ class BaseUserManager:
         user.pop("_id", None)
         return user
 
-    async def get_by_email(self, email: str) -> UserInDb:
-        doc = await self.user_collection.find_one({"email": email})
+    async def get_by_email(self, email: str, projection: dict | None = None) -> UserInDb:
+        doc = await self.user_collection.find_one({"email": email}, projection)
         if not doc:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
                                 detail=f'User not found')
@@ -47,15 +101,79 @@ class BaseUserManager:
         return doc
 
 
-    async def get_by_username(self, username: str) -> UserInDb:
-        user = await self.user_collection.find_one({'username': username})
+    async def get_by_username(self, username: str, projection: dict | None = None) -> UserInDb:
+        user = await self.user_collection.find_one({'username': username}, projection)
         return user
-    
 
-    async def get_all(self) -> list[User]:
-        users = await self.user_collection.find({}).to_list(length=None)
-        return [serializers.user_serializer(user) for user in users]
-    
+    async def get_auth_by_id(self, id: str) -> dict:
+        """Fields of schemas.UserAuth only."""
+        return await self.get_by_id(id, AUTH_PROJECTION)
+
+    async def get_account_by_id(self, id: str) -> dict:
+        """The owner's own profile: no password hash or chat lists."""
+        return await self.get_by_id(id, ACCOUNT_PROJECTION)
+
+    async def get_credentials_by_id(self, id: str) -> dict:
+        """Just the password hash, for password checks."""
+        return await self.get_by_id(id, PASSWORD_PROJECTION)
+
+    async def get_recipient_profile_by_id(self, id: str) -> dict:
+        """
+        Fields of schemas.RecipientProfile only. Batched and deduplicated
+        through the profile loader, so concurrent lookups share one query.
+        """
+        return await self.profile_loader.load(id)
+
+    async def get_user_cards(self, ids: list[str]) -> dict[str, dict]:
+        """{id: schemas.UserCard fields} with one $in query; unknown ids are left out."""
+        return await self.card_loader.load_many(ids)
+
+    async def get_key_bundle(self, id: str) -> dict:
+        """Fields of schemas.UserKeyBundle only."""
+        return await self.get_by_id(id, KEY_BUNDLE_PROJECTION)
+
+    async def get_message_recipients(self, id: str) -> list[dict]:
+        user = await self.get_by_id(id, MESSAGE_RECIPIENTS_PROJECTION)
+        return user.get('private_message_recipients') or []
+
+    async def search_directory(
+        self,
+        current_user_id: str,
+        prefix: str | None = None,
+        after: str | None = None,
+        limit: int = settings.USER_DIRECTORY_PAGE_SIZE,
+    ) -> dict:
+        """
+        One page of other users ordered by username, optionally limited to a
+        case-insensitive username prefix. Served by the
+        (username_lower, _id) index; the caller is excluded in the query.
+        Returns {'users': [...], 'next_cursor': str | None}.
+        """
+        limit = max(1, min(limit, settings.USER_DIRECTORY_PAGE_SIZE_MAX))
+        query: dict = {'_id': {'$ne': ObjectId(current_user_id)}}
+        if prefix:
+            query['username_lower'] = prefix_range(prefix.lower())
+        if after:
+            username_lower, oid = decode_directory_cursor(after)
+            query['$or'] = [
+                {'username_lower': {'$gt': username_lower}},
+                {'username_lower': username_lower, '_id': {'$gt': oid}},
+            ]
+        users = await self.user_collection.find(
+            query, {**DIRECTORY_PROJECTION, 'username_lower': 1}
+        ).sort(
+            [('username_lower', ASCENDING), ('_id', ASCENDING)]
+        ).limit(limit + 1).to_list(None)
+
+        next_cursor = None
+        if len(users) > limit:
+            users = users[:limit]
+            next_cursor = encode_directory_cursor(users[-1])
+        return {
+            'users': [serializers.user_directory_serializer(user) for user in users],
+            'next_cursor': next_cursor,
+        }
+
     async def update_online_status(self, user_id: str, is_online: bool) -> bool:
         """Update user online status."""
         try:
@@ -64,52 +182,63 @@ class BaseUserManager:
                 {'_id': oid},
                 {'$set': {'is_online': is_online}}
             )
+            await invalidate_user(user_id)
             return result.matched_count == 1 and result.modified_count == 1
         except InvalidId:
             return False
 
-    async def get_all_except_me(self, current_user_id: str) -> list[schemas.User]:
-        all_users = await self.get_all()
-        # print(all_users)
-        return [user for user in all_users if user.id != current_user_id]
-
     async def insert_private_message_recipient(
             self,
             user_id: str,
             recipient_model: MessageRecipient
     ):
-        print('[-] Inserting user id:', user_id)
-        print('[-] Inserting recipient:', recipient_model.model_dump())
         result = await self.user_collection.update_one(
             {'_id': ObjectId(user_id)},
             {'$push': {'private_message_recipients': recipient_model.model_dump()}}
         )
-        print('[-] Result:', result)
-        print('[-] Matched count:', result.matched_count)
-        print('[-] Modified count:', result.modified_count)
+        await invalidate_user(user_id)
         if result.matched_count == 1 and result.modified_count == 1:
             return True
+        logger.warning(
+            'Recipient for chat %s not added to user %s (matched %d, modified %d)',
+            recipient_model.chat_id, user_id, result.matched_count, result.modified_count,
+        )
         
 
 class UserDBManager(BaseUserManager):
     async def authenticate(self, user_data: Login) -> UserInDb:
-        user = await self.get_by_username(user_data.username)
+        user = await self.get_by_username(user_data.username, PASSWORD_PROJECTION)
         # print('user', user)
-        if not user or not verify_password(user_data.password, user.get('password')):
+        if not user:
             return None
+        verified, new_hash = await password_hasher.verify_and_update(
+            user_data.password, user.get('password')
+        )
+        if not verified:
+            return None
+        if new_hash:
+            # stored with a different bcrypt cost than configured
+            await self.user_collection.update_one(
+                {'_id': user['_id']},
+                {'$set': {'password': new_hash}}
+            )
+            await invalidate_user(str(user['_id']))
         return user
 
 
 class UserCreator(BaseUserManager):
     async def create_user(self, user_data: UserCreate) -> UserInDb:
         """Create a new user with hashed password."""
-        existing = await self.user_collection.find_one({'username': user_data.username})
+        existing = await self.user_collection.find_one(
+            {'username': user_data.username}, {'_id': 1}
+        )
         if existing:
             raise UserCreationError('username', 'Username already in use!')
-        password_hash = get_password_hash(user_data.password)
+        password_hash = await password_hasher.hash(user_data.password)
         updated_user_data = {
             **user_data.model_dump(),
             'password': password_hash,
+            'username_lower': user_data.username.lower(),
             "roles": ["user"],
             "token_version": 0, 
         }
@@ -118,7 +247,7 @@ class UserCreator(BaseUserManager):
         result   = await self.user_collection.insert_one(payload)
         if result.acknowledged:
             oid_str = str(result.inserted_id)
-            return await self.get_by_id(oid_str)
+            return await self.get_by_id(oid_str, ACCOUNT_PROJECTION)
 
         raise UserCreationError('User creation failed', 'Write not acknowledged')
 
@@ -135,9 +264,10 @@ class UserUpdater(BaseUserManager):
             {'_id': oid},
             {'$set': updated_data.model_dump()}
         )
+        await invalidate_user(updated_data.id)
 
         if result.matched_count == 1 and result.modified_count == 1:
-            return await self.get_by_id(updated_data.id)
+            return await self.get_by_id(updated_data.id, ACCOUNT_PROJECTION)
         return None
 
     async def update_profile(self, user_id: str, profile_data: dict) -> UserInDb:
@@ -151,15 +281,16 @@ class UserUpdater(BaseUserManager):
         update_data = {k: v for k, v in profile_data.items() if v is not None}
         
         if not update_data:
-            return await self.get_by_id(user_id)
+            return await self.get_by_id(user_id, ACCOUNT_PROJECTION)
         
         result = await self.user_collection.update_one(
             {'_id': oid},
             {'$set': update_data}
         )
+        await invalidate_user(user_id)
 
         if result.matched_count == 1:
-            return await self.get_by_id(user_id)
+            return await self.get_by_id(user_id, ACCOUNT_PROJECTION)
         else:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -172,6 +303,7 @@ class UserDeleter(BaseUserManager):
         """Delete a user by ID."""
         user = await self.get_by_id(id)
         deleted = await self.user_collection.delete_one({'id': ObjectId(id)})
+        await invalidate_user(id)
 
         if deleted.deleted_count == 0:
             raise HTTPException(
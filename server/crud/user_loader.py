@@ -0,0 +1,98 @@
+import asyncio
+from bson import ObjectId
+from bson.errors import InvalidId
+from fastapi import status, HTTPException
+from motor.motor_asyncio import AsyncIOMotorCollection
+
+
+class UserLoader:
+    """
+    DataLoader-style batching for user lookups by id.
+
+    Every id requested during one event-loop tick is resolved with a single
+    $in query, and each id is fetched at most once for the loader's
+    lifetime. Managers are created per request, so that is the scope of the
+    memo; a loader should not outlive its request.
+    """
+
+    def __init__(self, collection: AsyncIOMotorCollection, projection: dict | None = None):
+        self.collection = collection
+        self.projection = projection
+        self._futures: dict[str, asyncio.Future] = {}
+        self._queue: list[str] = []
+        self._batches: set[asyncio.Task] = set()
+
+    def load(self, id: str) -> asyncio.Future:
+        """
+        Future of the user dict ('id' normalized from _id). Fails like
+        get_by_id: 400 for a malformed id, 404 for an unknown one.
+        """
+        future = self._futures.get(id)
+        if future is not None:
+            return future
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._futures[id] = future
+        self._queue.append(id)
+        if len(self._queue) == 1:
+            # runs after every coroutine already scheduled for this tick
+            loop.call_soon(self._dispatch)
+        return future
+
+    async def load_many(self, ids: list[str]) -> dict[str, dict]:
+        """{id: user} for the ids that exist; unknown or malformed ids are left out."""
+        ids = list(dict.fromkeys(ids))
+        results = await asyncio.gather(*(self.load(id) for id in ids), return_exceptions=True)
+        return {
+            id: user for id, user in zip(ids, results)
+            if not isinstance(user, BaseException)
+        }
+
+    def _dispatch(self):
+        ids, self._queue = self._queue, []
+        task = asyncio.create_task(self._batch(ids))
+        self._batches.add(task)
+        task.add_done_callback(self._batches.discard)
+
+    async def _batch(self, ids: list[str]):
+        oids = {}
+        for id in ids:
+            try:
+                oids[id] = ObjectId(id)
+            except (InvalidId, TypeError):
+                self._reject(id, HTTPException(
+                    status.HTTP_400_BAD_REQUEST,
+                    detail="Invalid user ID format"
+                ))
+        if not oids:
+            return
+        try:
+            users = await self.collection.find(
+                {'_id': {'$in': list(oids.values())}}, self.projection
+            ).to_list(None)
+        except Exception as e:
+            for id in oids:
+                self._reject(id, e)
+            return
+
+        found = {}
+        for user in users:
+            user['id'] = str(user.pop('_id'))
+            found[user['id']] = user
+        for id in oids:
+            future = self._futures.get(id)
+            if future is None or future.done():
+                continue
+            if id in found:
+                future.set_result(found[id])
+            else:
+                self._reject(id, HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail='User not found'
+                ))
+
+    def _reject(self, id: str, error: Exception):
+        # failures are not memoized, a later load retries
+        future = self._futures.pop(id, None)
+        if future is not None and not future.done():
+            future.set_exception(error)
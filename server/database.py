@@ -3,12 +3,14 @@ from motor.motor_asyncio import AsyncIOMotorClient
 import logging
 
 from config import settings
+from core.metrics import mongo_command_listener
 import os
 logger = logging.getLogger(__name__)
 
 _client = AsyncIOMotorClient(
     settings.MONGODB_URL,
-    tls=True,
+    tls=settings.MONGODB_TLS,
+    event_listeners=[mongo_command_listener] if settings.METRICS_ENABLED else [],
 )
 mongodb = _client[settings.MONGODB_DB_NAME]
 
@@ -19,9 +21,9 @@ async def get_db():
 async def ping_mongodb():
     try:
         await _client.admin.command('ping')
-        print("Connection status: You have successfully connected to MongoDB!")
-    except Exception as e:
-        print(e)
+        logger.info('Connected to MongoDB')
+    except Exception:
+        logger.exception('MongoDB ping failed')
         
         
 async def db_connection_status():
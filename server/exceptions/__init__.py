@@ -1,2 +1,2 @@
 from .user import UserCreationError
-from .auth import credentials_exception
\ No newline at end of file
+from .auth import credentials_exception, HashingOverloadedError
\ No newline at end of file
@@ -3,6 +3,15 @@
 from fastapi import HTTPException, status
 
 
+class HashingOverloadedError(Exception):
+    """Raised when the password hashing pool has no room for more work."""
+
+    def __init__(self, message: str = 'Password hashing is overloaded, try again shortly'):
+        self.message = message
+        super().__init__(self.message)
+
+
+
 credentials_exception = HTTPException(
     status_code=status.HTTP_401_UNAUTHORIZED,
     detail="Could not validate credentials",
@@ -1,38 +1,97 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, status
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.routing import APIWebSocketRoute
 
-from api.routers import users, auth, chat
+from api.routers import users, auth, chat, group, admin, metrics
 from wsocket import chat_websocket_endpoint
 from database import db_connection_status, startup_db_client, shutdown_db_client
+from core.indexes import build_indexes, verify_indexes
+from core.compression import CompressionMiddleware
+from core.metrics import MetricsMiddleware
+from core.log import setup_logging, stop_logging
+from service.backplane import backplane
+from service.user_cache import start_user_cache
+from service.membership_cache import start_membership_cache
+from service.connections import start_evictions
+from service.message_writer import message_writer
+from service.presence import presence
+from service.receipts import receipts
+from core.security import password_hasher
+from exceptions import HashingOverloadedError
 from motor.motor_asyncio import AsyncIOMotorDatabase
 
+from config import settings
+import asyncio
 import socketio
 import logging
 
+setup_logging()
 logger = logging.getLogger(__name__)
 
 app = FastAPI()
 
+# the background index build started at startup, if any
+index_build: asyncio.Task | None = None
+
+
+def on_index_build_done(task: asyncio.Task):
+    if not task.cancelled() and task.exception() is not None:
+        logger.error('Background index build failed', exc_info=task.exception())
+
 # Register the startup event handler
 @app.on_event('startup')
 async def startup_event():
     await startup_db_client(app)
+    global index_build
     db: AsyncIOMotorDatabase = app.mongodb
-    await db["password_reset_tokens"].create_index(
-        "expires_at",
-        expireAfterSeconds=0
-    )
+    missing = await verify_indexes(db)
+    if missing and settings.AUTO_BUILD_INDEXES:
+        # don't hold up startup; builds run online on the server
+        index_build = asyncio.create_task(build_indexes(db, list(missing)))
+        index_build.add_done_callback(on_index_build_done)
+    await backplane.start()
+    await start_user_cache()
+    await start_membership_cache()
+    await start_evictions()
+    password_hasher.start()
+    if settings.MESSAGE_WRITE_BATCHING:
+        message_writer.start(db['messages'])
+    presence.start(db['users'])
+    receipts.start(db['receipts'], db['messages'])
     await db_connection_status()
 
 
 # Register the shutdown event handler
 @app.on_event('shutdown')
 async def shutdown_event():
+    await presence.close()
+    await receipts.close()
+    await message_writer.close()
+    password_hasher.close()
+    await backplane.close()
     await shutdown_db_client(app)
+    stop_logging()
     
 
 
+@app.exception_handler(HashingOverloadedError)
+async def hashing_overloaded_handler(request: Request, exc: HashingOverloadedError):
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": exc.message},
+        headers={"Retry-After": "1"},
+    )
+
+
+#   COMPRESSION
+if settings.HTTP_COMPRESSION:
+    app.add_middleware(CompressionMiddleware)
+
+#   METRICS (wraps compression, so request timings include it)
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
 #   CORS
 app.add_middleware(
     CORSMiddleware,
@@ -46,6 +105,10 @@ app.add_middleware(
 app.include_router(auth.router)
 app.include_router(users.router)
 app.include_router(chat.router)
+app.include_router(group.router)
+app.include_router(admin.router)
+if settings.METRICS_ENABLED:
+    app.include_router(metrics.router)
 
 
 
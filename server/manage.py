@@ -0,0 +1,70 @@
+"""
+Management commands.
+
+    python manage.py build-indexes [collection ...]
+    python manage.py check-indexes
+    python manage.py serve [--host HOST] [--port PORT] [--reload]
+"""
+import argparse
+import asyncio
+
+from core.indexes import INDEXES, build_indexes, find_collection_scans, find_missing_indexes
+
+
+async def build(collections: list[str]):
+    from database import mongodb
+
+    created = await build_indexes(mongodb, collections or None)
+    for collection, names in created.items():
+        print(f'[+] {collection}: {", ".join(names) or "nothing built"}')
+
+
+async def check() -> int:
+    from database import mongodb
+
+    missing = await find_missing_indexes(mongodb)
+    for collection, names in missing.items():
+        print(f'[-] {collection}: missing {", ".join(names)}')
+    scans = await find_collection_scans(mongodb)
+    for query in scans:
+        print(f'[-] {query["find"]}: collection scan for {query["filter"]}')
+    if not missing and not scans:
+        print('[+] All indexes present')
+    return 1 if missing or scans else 0
+
+
+def serve(host: str, port: int, reload: bool):
+    import uvicorn
+    from core.ws_protocol import DeflateWebSocketProtocol
+
+    uvicorn.run(
+        'main:app', host=host, port=port, reload=reload,
+        ws=DeflateWebSocketProtocol,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest='command', required=True)
+    build_parser = commands.add_parser('build-indexes', help='create registered indexes')
+    build_parser.add_argument('collections', nargs='*', help='default: all registered')
+    commands.add_parser('check-indexes', help='report missing indexes and collection scans')
+    serve_parser = commands.add_parser('serve', help='run the API with tuned WebSocket compression')
+    serve_parser.add_argument('--host', default='0.0.0.0')
+    serve_parser.add_argument('--port', type=int, default=8000)
+    serve_parser.add_argument('--reload', action='store_true')
+    args = parser.parse_args()
+
+    if args.command == 'build-indexes':
+        unknown = set(args.collections) - set(INDEXES)
+        if unknown:
+            parser.error(f'unknown collections: {", ".join(sorted(unknown))}')
+        asyncio.run(build(args.collections))
+    elif args.command == 'check-indexes':
+        raise SystemExit(asyncio.run(check()))
+    elif args.command == 'serve':
+        serve(args.host, args.port, args.reload)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,31 @@
+"""
+Set 'username_lower' (the directory search key) on users created before it
+existed. Runs as a single server-side update; safe to re-run.
+
+    python -m migrations.add_username_lower
+"""
+import asyncio
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from core.indexes import build_indexes
+
+
+async def add_username_lower(db: AsyncIOMotorDatabase) -> int:
+    result = await db['users'].update_many(
+        {'username_lower': {'$exists': False}},
+        [{'$set': {'username_lower': {'$toLower': '$username'}}}],
+    )
+    return result.modified_count
+
+
+async def main():
+    from database import mongodb
+
+    updated = await add_username_lower(mongodb)
+    print(f'[+] users: set username_lower on {updated} users')
+    await build_indexes(mongodb, ['users'])
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,95 @@
+"""
+Rewrite stored messages' ciphertext, wrapped keys and IV from base64/hex
+strings to BSON binary (see serializers.chat_serializers).
+
+Runs online: messages are visited in _id order in small batches with a
+pause between them, and progress is checkpointed in the 'migrations'
+collection, so an interrupted run resumes where it stopped. Strings that
+are not canonical base64/hex (e.g. plaintext fallback messages) are left
+as they are. Inbox previews are not rewritten; they are replaced by the
+next message in each chat and serialize fine either way.
+
+    python -m migrations.binary_message_fields [--batch-size N] [--pause SECONDS] [--restart]
+"""
+import argparse
+import asyncio
+
+from pymongo import ASCENDING, UpdateOne
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from serializers.chat_serializers import BINARY_MESSAGE_FIELDS, message_to_document
+
+
+MIGRATION_ID = 'binary_message_fields'
+FIELDS_PROJECTION = {field: 1 for field in BINARY_MESSAGE_FIELDS}
+
+
+async def rewrite_batch(db: AsyncIOMotorDatabase, messages: list[dict]) -> int:
+    operations = []
+    for message in messages:
+        document = message_to_document(message)
+        changed = {
+            field: document[field]
+            for field in BINARY_MESSAGE_FIELDS
+            if field in document and document[field] is not message[field]
+        }
+        if changed:
+            # only if untouched since it was read
+            operations.append(UpdateOne(
+                {'_id': message['_id'], **{field: message[field] for field in changed}},
+                {'$set': changed},
+            ))
+    if not operations:
+        return 0
+    result = await db['messages'].bulk_write(operations, ordered=False)
+    return result.modified_count
+
+
+async def migrate(
+    db: AsyncIOMotorDatabase,
+    batch_size: int = 500,
+    pause: float = 0.1,
+    restart: bool = False,
+) -> int:
+    checkpoints = db['migrations']
+    if restart:
+        await checkpoints.delete_one({'_id': MIGRATION_ID})
+    checkpoint = await checkpoints.find_one({'_id': MIGRATION_ID}) or {}
+    last_id = checkpoint.get('last_id')
+    rewritten = checkpoint.get('rewritten', 0)
+
+    while True:
+        query = {'_id': {'$gt': last_id}} if last_id is not None else {}
+        messages = await db['messages'].find(query, FIELDS_PROJECTION).sort(
+            '_id', ASCENDING
+        ).limit(batch_size).to_list(None)
+        if not messages:
+            break
+        rewritten += await rewrite_batch(db, messages)
+        last_id = messages[-1]['_id']
+        await checkpoints.update_one(
+            {'_id': MIGRATION_ID},
+            {'$set': {'last_id': last_id, 'rewritten': rewritten}},
+            upsert=True,
+        )
+        print(f'[+] messages: {rewritten} rewritten, up to {last_id}')
+        # leave room for live traffic
+        await asyncio.sleep(pause)
+    return rewritten
+
+
+async def main():
+    from database import mongodb
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--batch-size', type=int, default=500)
+    parser.add_argument('--pause', type=float, default=0.1, help='seconds between batches')
+    parser.add_argument('--restart', action='store_true', help='ignore the saved checkpoint')
+    args = parser.parse_args()
+
+    rewritten = await migrate(mongodb, args.batch_size, args.pause, args.restart)
+    print(f'[+] messages: done, {rewritten} rewritten')
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,81 @@
+"""
+Create inbox entries for chats that existed before the 'inbox' collection,
+with each chat's latest message as the preview. Unread counts start at 0.
+
+Safe to re-run: entries are only inserted where missing, so counts already
+maintained by the send path are left alone.
+
+    python -m migrations.build_inbox
+"""
+import asyncio
+
+from pymongo import UpdateOne
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from core.indexes import build_indexes
+from crud.inbox import InboxManager, message_preview
+from crud.message import MessageManager
+from utils import datetime_now
+
+
+CHAT_COLLECTIONS = ('privateChat',)
+BATCH_SIZE = 500
+
+
+async def backfill_batch(
+    inbox_manager: InboxManager,
+    message_manager: MessageManager,
+    chats: list[dict],
+) -> int:
+    latest = await message_manager.get_latest_messages([chat['chat_id'] for chat in chats])
+    now = datetime_now()
+    operations = []
+    for chat in chats:
+        message = latest.get(chat['chat_id'])
+        member_ids = chat['member_ids']
+        for user_id in member_ids:
+            others = [member_id for member_id in member_ids if member_id != user_id]
+            operations.append(UpdateOne(
+                {'user_id': user_id, 'chat_id': chat['chat_id']},
+                {'$setOnInsert': {
+                    'recipient_id': others[0] if len(others) == 1 else None,
+                    'last_message': message_preview(message) if message else None,
+                    'last_message_at': message['created_at'] if message else now,
+                    'unread_count': 0,
+                    'last_read_at': now,
+                }},
+                upsert=True,
+            ))
+    if not operations:
+        return 0
+    result = await inbox_manager.inbox_collection.bulk_write(operations, ordered=False)
+    return result.upserted_count
+
+
+async def build_inbox(db: AsyncIOMotorDatabase, chat_collection: str) -> int:
+    inbox_manager = InboxManager(db)
+    message_manager = MessageManager(db)
+    created = 0
+    batch = []
+    cursor = db[chat_collection].find({}, {'_id': 0, 'chat_id': 1, 'member_ids': 1})
+    async for chat in cursor:
+        batch.append(chat)
+        if len(batch) >= BATCH_SIZE:
+            created += await backfill_batch(inbox_manager, message_manager, batch)
+            batch = []
+    if batch:
+        created += await backfill_batch(inbox_manager, message_manager, batch)
+    return created
+
+
+async def main():
+    from database import mongodb
+
+    await build_indexes(mongodb, ['inbox'])
+    for chat_collection in CHAT_COLLECTIONS:
+        created = await build_inbox(mongodb, chat_collection)
+        print(f'[+] {chat_collection}: created {created} inbox entries')
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
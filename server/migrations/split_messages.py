@@ -0,0 +1,58 @@
+"""
+Move messages embedded in chat documents ('messages' array) into the
+'messages' collection.
+
+Safe to re-run: messages are upserted by id, and a chat's array is only
+removed after all of its messages were written.
+
+    python -m migrations.split_messages
+"""
+import asyncio
+
+from pymongo import UpdateOne
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from core.indexes import build_indexes
+from crud.message import MessageManager
+
+
+CHAT_COLLECTIONS = ('privateChat',)
+
+
+async def split_chat_messages(db: AsyncIOMotorDatabase, chat_collection: str) -> int:
+    message_manager = MessageManager(db)
+    moved = 0
+    cursor = db[chat_collection].find(
+        {'messages': {'$exists': True}},
+        {'chat_id': 1, 'messages': 1},
+    )
+    async for chat in cursor:
+        operations = [
+            UpdateOne(
+                {'id': message['id']},
+                {'$setOnInsert': {**message, 'chat_id': chat['chat_id']}},
+                upsert=True,
+            )
+            for message in chat['messages'] if message
+        ]
+        if operations:
+            await message_manager.message_collection.bulk_write(operations, ordered=False)
+        await db[chat_collection].update_one(
+            {'_id': chat['_id']},
+            {'$unset': {'messages': ''}}
+        )
+        moved += len(operations)
+    return moved
+
+
+async def main():
+    from database import mongodb
+
+    await build_indexes(mongodb, ['messages'])
+    for chat_collection in CHAT_COLLECTIONS:
+        moved = await split_chat_messages(mongodb, chat_collection)
+        print(f'[+] {chat_collection}: moved {moved} messages')
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -4,4 +4,7 @@ from .chat import (
     MessageRecipientModel,
     PrivateChatModel, 
     GroupChatModel,
+    GroupMemberModel,
+    GroupInviteModel,
+    GroupMessageModel,
 )
\ No newline at end of file
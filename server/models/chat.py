@@ -1,5 +1,4 @@
 from datetime import datetime
-from schemas.chat import Message
 from pydantic import BaseModel, Field
 from utils import(
     datetime_now, 
@@ -13,6 +12,7 @@ class MessageRecipientModel(BaseModel):
 
 class MessageModel(BaseModel):
     id: str = Field(default_factory=get_uuid4)
+    chat_id: str = Field(...)
     message: str = Field(...)
     encrypted_key_sender: str = Field(...)
     encrypted_key_receiver: str = Field(...)
@@ -23,12 +23,53 @@ class MessageModel(BaseModel):
 class ChatBaseModel(BaseModel):
     chat_id: str = Field(default_factory=get_uuid4)
     member_ids: list[str] = Field(...)
-    messages: list[Message | None] = Field([])
 
 class PrivateChatModel(ChatBaseModel):
     type: str = Field(default='private')
 
-class GroupChatModel(ChatBaseModel):
+class GroupChatModel(BaseModel):
+    # members live in the groupMembers collection, one document each
+    chat_id: str = Field(default_factory=get_uuid4)
     type: str = Field(default='group')
     chat_name: str | None = Field(None)
+    created_by: str = Field(...)
+    created_at: datetime = Field(default_factory=datetime_now)
+    member_count: int = Field(1)
+    # bumped when a member leaves; messages must use the current group key
+    key_epoch: int = Field(0)
+    message_count: int = Field(0)
+    last_message: dict | None = Field(None)
+    last_message_at: datetime = Field(default_factory=datetime_now)
+
+
+class GroupMemberModel(BaseModel):
+    chat_id: str = Field(...)
+    user_id: str = Field(...)
+    role: str = Field(default='member')
+    joined_at: datetime = Field(default_factory=datetime_now)
+    # group messages this member has seen, against the group's message_count
+    read_count: int = Field(0)
+    # the group key wrapped with this member's public key, and its epoch
+    encrypted_key: str | None = Field(None)
+    key_epoch: int | None = Field(None)
+
+
+class GroupInviteModel(BaseModel):
+    """Lets user_id join once; removed by that join or by the TTL index."""
+    chat_id: str = Field(...)
+    user_id: str = Field(...)
+    invited_by: str = Field(...)
+    created_at: datetime = Field(default_factory=datetime_now)
+    expires_at: datetime = Field(...)
+
+
+class GroupMessageModel(BaseModel):
+    """One ciphertext for all members; key_epoch names the group key used."""
+    id: str = Field(default_factory=get_uuid4)
+    chat_id: str = Field(...)
+    message: str = Field(...)
+    iv: str = Field(...)
+    key_epoch: int = Field(...)
+    created_by: str = Field(...)
+    created_at: datetime = Field(default_factory=datetime_now)
 
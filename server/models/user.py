@@ -11,11 +11,14 @@ class UserModel(BaseModel):
     first_name: str | None = Field(None, max_length=100)
     last_name: str | None = Field(None, max_length=100)
     username: str = Field(..., max_length=20)
+    # directory search key, see core/indexes.py
+    username_lower: str | None = None
     email: EmailStr = Field(..., max_length=50)
     password: str = Field(...)
     
     is_active: bool = True
     is_online: bool = False
+    last_seen: datetime | None = None
     is_disabled: bool = False     
     is_superuser: bool = False               
     private_message_recipients: list[MessageRecipient | None] = Field([])
@@ -1,13 +1,33 @@
-from .user import User, UserCreate, UserUpdate, UserInDb, UserOfAll, UserUpdateToken, ChangePasswordRequest
+from .user import (
+    User, UserCreate, UserUpdate, UserInDb, UserOfAll, UserUpdateToken, ChangePasswordRequest,
+    UserAuth, UserCard, UserDirectoryEntry, UserDirectoryPage, UserKeyBundle, RecipientProfile,
+)
 from .token import Token, Login, TokenPayload
 from .chat import (
     MessageCreate,
     Message,
     MessageResponse,
+    MessageCursor,
+    MessagePage,
+    UnreadCount,
+    Watermark,
+    Receipt,
+    ReceiptPage,
     ChatId,
     MessageRecipient,
     PrivateChat,
     PrivateChatResponse,
+    GroupMessage,
+    GroupMessagePage,
+    GroupCreate,
     GroupChat,
     GroupChatResponse,
+    GroupPage,
+    GroupMember,
+    GroupMemberPage,
+    GroupInviteCreate,
+    GroupInvite,
+    GroupKey,
+    GroupKeysUpdate,
+    GroupKeysUpdated,
 )
\ No newline at end of file
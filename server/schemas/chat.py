@@ -1,5 +1,6 @@
 from datetime import datetime
-from pydantic import BaseModel
+from typing import Literal
+from pydantic import BaseModel, Field
 
 
 class MessageBase(BaseModel):
@@ -19,6 +20,17 @@ class Message(MessageBase):
 
 class MessageResponse(Message):
     created_at: str
+
+
+class MessageCursor(BaseModel):
+    created_at: datetime
+    id: str
+    direction: Literal['before', 'after']
+
+
+class MessagePage(BaseModel):
+    messages: list[Message]
+    next_cursor: str | None = None
     
     
 class ChatId(BaseModel):
@@ -31,7 +43,7 @@ class MessageRecipient(ChatId):
 
 class ChatBase(ChatId):
     member_ids: list[str]
-    messages: list[Message | None]
+    messages: list[Message | None] = []
     type: str
 
 
@@ -44,12 +56,105 @@ class PrivateChatResponse(ChatBase):
 
 
 
-class GroupChat(ChatBase):
+class GroupMessage(MessageBase):
+    id: str
+    created_by: str
+    created_at: datetime
+    iv: str
+    key_epoch: int
+
+
+class GroupMessagePage(BaseModel):
+    messages: list[GroupMessage]
+    next_cursor: str | None = None
+
+
+class GroupCreate(BaseModel):
+    chat_name: str = Field(..., min_length=1, max_length=100)
+    # the new group key wrapped with the creator's public key
+    encrypted_key: str
+
+
+class GroupChat(ChatId):
+    type: str = 'group'
     chat_name: str | None
+    created_by: str
+    created_at: datetime
+    member_count: int
+    key_epoch: int
 
 
 class GroupChatResponse(GroupChat):
-    pass
+    role: str
+    unread_count: int
+    last_message: GroupMessage | None = None
+
+
+class GroupPage(BaseModel):
+    groups: list[GroupChatResponse]
+    next_cursor: str | None = None
+
+
+class GroupMember(BaseModel):
+    user_id: str
+    role: str
+    joined_at: datetime
+    key_epoch: int | None = None
+
+
+class GroupMemberPage(BaseModel):
+    members: list[GroupMember]
+    next_cursor: str | None = None
+
+
+class GroupInviteCreate(BaseModel):
+    user_id: str
+
+
+class GroupInvite(ChatId):
+    user_id: str
+    invited_by: str
+    created_at: datetime
+    expires_at: datetime
+
+
+class GroupKey(ChatId):
+    # this member's wrapped key; behind current_key_epoch until a member
+    # distributes the rotated key
+    encrypted_key: str | None
+    key_epoch: int | None
+    current_key_epoch: int
+
+
+class GroupKeysUpdate(BaseModel):
+    key_epoch: int
+    # user_id -> group key wrapped with that user's public key
+    keys: dict[str, str]
+
+
+class GroupKeysUpdated(BaseModel):
+    key_epoch: int
+    updated: int
+
+
+class Watermark(BaseModel):
+    created_at: datetime
+    message_id: str
+
+
+class Receipt(BaseModel):
+    user_id: str
+    delivered: Watermark | None = None
+    read: Watermark | None = None
+
+
+class ReceiptPage(BaseModel):
+    receipts: list[Receipt]
+    next_cursor: str | None = None
+
+
+class UnreadCount(ChatId):
+    unread_count: int
 
 
 class ChatCreationResponse(BaseModel):
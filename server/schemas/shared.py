@@ -1,8 +1,25 @@
 
-from .user import User
-from .chat import PrivateChatResponse
+from datetime import datetime
+from pydantic import BaseModel
+from .user import RecipientProfile, UserCard
+from .chat import ChatId, Message, PrivateChatResponse
 
 
 class PrivateChatResponseWithRecipient(PrivateChatResponse):
     user_id: str
-    recipient_profile: User
\ No newline at end of file
+    recipient_profile: RecipientProfile
+    next_cursor: str | None = None
+
+
+class InboxEntry(ChatId):
+    recipient_id: str | None = None
+    recipient_profile: UserCard | None = None
+    last_message: Message | None = None
+    last_message_at: datetime
+    unread_count: int = 0
+    last_read_at: datetime | None = None
+
+
+class InboxPage(BaseModel):
+    entries: list[InboxEntry]
+    next_cursor: str | None = None
@@ -1,4 +1,5 @@
 import re
+from datetime import datetime
 from pydantic import BaseModel, field_validator, constr, Field
 from typing import Optional, Annotated
 
@@ -86,6 +87,49 @@ class UserInDb(UserRead):
 class UserOfAll(User):
     id: str
 
+
+# Slim read models: each is paired with a projection in crud/user.py so a
+# call site only pulls the fields it needs.
+
+class UserAuth(BaseModel):
+    """What authentication and authorization checks need."""
+    id: str
+    username: str
+    email: str | None = None
+    roles: list[str] = []
+    is_active: bool = True
+    is_disabled: bool = False
+    token_version: int = 0
+
+
+class UserCard(BaseModel):
+    """Enough to render a user next to a chat."""
+    id: str
+    username: str
+    first_name: str | None = None
+    last_name: str | None = None
+    is_online: bool = False
+    last_seen: datetime | None = None
+
+
+class UserDirectoryEntry(UserCard):
+    email: str | None = None
+
+
+class UserDirectoryPage(BaseModel):
+    users: list[UserDirectoryEntry]
+    next_cursor: str | None = None
+
+
+class UserKeyBundle(BaseModel):
+    id: str
+    public_key_pem: str
+
+
+class RecipientProfile(UserCard):
+    """Chat recipient: card plus the public key messages are encrypted to."""
+    public_key_pem: str
+
 class ChangePasswordRequest(BaseModel):
     current_password: str
     new_password: str
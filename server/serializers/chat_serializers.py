@@ -1,6 +1,55 @@
+import base64
+import binascii
+from bson import Binary
 import schemas
 
 
+# Message fields stored as BSON binary, with the text encoding the client
+# uses for each on the wire.
+BINARY_MESSAGE_FIELDS = {
+    'message': 'base64',
+    'encrypted_key_sender': 'base64',
+    'encrypted_key_receiver': 'base64',
+    'iv': 'hex',
+}
+
+
+def decode_wire_value(value: str, encoding: str) -> bytes | None:
+    """
+    Raw bytes behind a wire string, or None when the string would not
+    re-encode to exactly itself (plaintext fallback messages, empty keys,
+    non-canonical encodings); those are stored unchanged.
+    """
+    try:
+        if encoding == 'hex':
+            raw = bytes.fromhex(value)
+            canonical = raw.hex()
+        else:
+            raw = base64.b64decode(value, validate=True)
+            canonical = base64.b64encode(raw).decode()
+    except (ValueError, binascii.Error):
+        return None
+    return raw if raw and canonical == value else None
+
+
+def encode_wire_value(value: bytes, encoding: str) -> str:
+    if encoding == 'hex':
+        return value.hex()
+    return base64.b64encode(value).decode()
+
+
+def message_to_document(message: dict) -> dict:
+    """Copy of a message with its encrypted fields as BSON binary, for storage."""
+    document = dict(message)
+    for field, encoding in BINARY_MESSAGE_FIELDS.items():
+        value = document.get(field)
+        if isinstance(value, str):
+            raw = decode_wire_value(value, encoding)
+            if raw is not None:
+                document[field] = Binary(raw)
+    return document
+
+
 def new_chat_serializer(member_ids):
     serialized_chat = schemas.PrivateChatModel(member_ids=member_ids)
 
@@ -19,6 +68,11 @@ def message_serializer(message: dict) -> schemas.MessageResponse:
         # Fallback: convert to dict
         message_dict = dict(message)
     
+    # Binary fields back to the client's text encodings
+    for field, encoding in BINARY_MESSAGE_FIELDS.items():
+        if isinstance(message_dict.get(field), bytes):
+            message_dict[field] = encode_wire_value(message_dict[field], encoding)
+
     # Convert datetime to ISO string format
     if 'created_at' in message_dict:
         if hasattr(message_dict['created_at'], 'isoformat'):
@@ -1,5 +1,6 @@
-from .user_serializers import user_serializer
+from .user_serializers import user_serializer, user_directory_serializer
 from .chat_serializers import (
     new_chat_serializer,
     message_serializer,
+    message_to_document,
 )
\ No newline at end of file
@@ -22,4 +22,13 @@ def user_serializer(raw: dict) -> schemas.User:
     clean_data["id"] = id_str
 
     # 4) Build your Pydantic model
-    return schemas.User(**clean_data)
\ No newline at end of file
+    return schemas.User(**clean_data)
+
+
+def user_directory_serializer(raw: dict) -> schemas.UserDirectoryEntry:
+    """
+    Build a directory entry from a document read with DIRECTORY_PROJECTION.
+    """
+    return schemas.UserDirectoryEntry(id=str(raw["_id"]), **{
+        k: v for k, v in raw.items() if k != "_id"
+    })
\ No newline at end of file
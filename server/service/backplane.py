@@ -0,0 +1,172 @@
+import asyncio
+import logging
+from abc import ABC, abstractmethod
+from typing import Awaitable, Callable
+
+from config import settings
+from utils import get_uuid4
+
+logger = logging.getLogger(__name__)
+
+# handler(channel, data) for a message published by another worker
+MessageHandler = Callable[[str, bytes], Awaitable[None]]
+
+
+class Backplane(ABC):
+    """
+    Pub/sub channel shared by every worker serving the app.
+
+    A worker publishes a frame once and delivers it to its own sockets
+    itself; subscribed handlers only see frames published by other workers.
+    """
+
+    def __init__(self):
+        self.worker_id = get_uuid4()
+        self.handlers: dict[str, MessageHandler] = {}
+
+    async def start(self):
+        pass
+
+    async def close(self):
+        self.handlers.clear()
+
+    @abstractmethod
+    async def subscribe(self, channel: str, handler: MessageHandler):
+        ...
+
+    @abstractmethod
+    async def unsubscribe(self, channel: str):
+        ...
+
+    @abstractmethod
+    async def publish(self, channel: str, data: bytes):
+        ...
+
+
+class InMemoryBackplane(Backplane):
+    """
+    Backplane for a single process. Instances sharing the same `bus`
+    behave like separate workers, which is handy for tests.
+    """
+
+    def __init__(self, bus: dict[str, set['InMemoryBackplane']] | None = None):
+        super().__init__()
+        self.bus = {} if bus is None else bus
+
+    async def close(self):
+        for channel in list(self.handlers):
+            await self.unsubscribe(channel)
+        await super().close()
+
+    async def subscribe(self, channel: str, handler: MessageHandler):
+        self.handlers[channel] = handler
+        self.bus.setdefault(channel, set()).add(self)
+
+    async def unsubscribe(self, channel: str):
+        self.handlers.pop(channel, None)
+        subscribers = self.bus.get(channel)
+        if subscribers is not None:
+            subscribers.discard(self)
+            if not subscribers:
+                del self.bus[channel]
+
+    async def publish(self, channel: str, data: bytes):
+        for subscriber in list(self.bus.get(channel, ())):
+            if subscriber is self:
+                continue
+            handler = subscriber.handlers.get(channel)
+            if handler is not None:
+                await handler(channel, data)
+
+
+class RedisBackplane(Backplane):
+    """
+    Backplane over Redis PUBLISH/SUBSCRIBE (or any server speaking the
+    Redis protocol). Each frame is prefixed with the publishing worker's
+    id so a worker can skip its own frames. `client` replaces the connection
+    made from `url`, e.g. with a fake in tests.
+    """
+
+    def __init__(self, url: str, client=None):
+        super().__init__()
+        if client is None:
+            from redis import asyncio as aioredis
+
+            client = aioredis.from_url(url)
+        self.redis = client
+        self.pubsub = self.redis.pubsub()
+        self.origin = self.worker_id.encode()
+        # keeps SUBSCRIBE/UNSUBSCRIBE in call order when a chat's last
+        # socket leaves while a new one arrives
+        self._lock = asyncio.Lock()
+        self._has_subscriptions = asyncio.Event()
+        self._reader: asyncio.Task | None = None
+
+    async def start(self):
+        self._reader = asyncio.create_task(self._read_loop())
+
+    async def close(self):
+        if self._reader is not None:
+            self._reader.cancel()
+            self._reader = None
+        await self.pubsub.aclose()
+        await self.redis.aclose()
+        await super().close()
+
+    async def subscribe(self, channel: str, handler: MessageHandler):
+        async with self._lock:
+            self.handlers[channel] = handler
+            await self.pubsub.subscribe(channel)
+            self._has_subscriptions.set()
+
+    async def unsubscribe(self, channel: str):
+        async with self._lock:
+            self.handlers.pop(channel, None)
+            await self.pubsub.unsubscribe(channel)
+
+    async def publish(self, channel: str, data: bytes):
+        await self.redis.publish(channel, self.origin + data)
+
+    async def _read_loop(self):
+        while True:
+            await self._has_subscriptions.wait()
+            try:
+                message = await self.pubsub.get_message(
+                    ignore_subscribe_messages=True, timeout=1.0
+                )
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception('Backplane read failed, retrying')
+                await asyncio.sleep(1)
+                continue
+
+            if message is None:
+                if not self.pubsub.subscribed:
+                    self._has_subscriptions.clear()
+                continue
+
+            data: bytes = message['data']
+            if data.startswith(self.origin):
+                continue
+            channel = message['channel'].decode()
+            handler = self.handlers.get(channel)
+            if handler is None:
+                continue
+            try:
+                await handler(channel, data[len(self.origin):])
+            except Exception:
+                logger.exception('Backplane handler failed for %s', channel)
+
+
+def chat_channel(chat_id: str) -> str:
+    return f'chat:{chat_id}'
+
+
+def get_backplane() -> Backplane:
+    if settings.BROADCAST_BACKEND == 'redis':
+        return RedisBackplane(settings.REDIS_URL)
+    return InMemoryBackplane()
+
+
+backplane = get_backplane()
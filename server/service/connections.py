@@ -0,0 +1,212 @@
+import asyncio
+import logging
+
+from fastapi import WebSocket, status
+
+from config import settings
+from core.metrics import CallbackMetric, registry, ws_broadcast_fanout
+from service.backplane import backplane
+
+logger = logging.getLogger(__name__)
+
+# 'chat_id:user_id' whose sockets in that chat must be closed on every worker
+EVICTION_CHANNEL = 'chats:members:evict'
+
+# close handshakes started by abort(); referenced until they finish
+_closing: set[asyncio.Task] = set()
+
+
+class ClientConnection:
+    """
+    One accepted WebSocket with a bounded outbound queue.
+
+    Frames are only ever enqueued by broadcasters; a dedicated writer task
+    drains the queue, so a slow peer never blocks anyone else. A peer that
+    lets its queue overflow (or stalls a single send past the timeout) is
+    disconnected.
+    """
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        user_id: str,
+        registry: 'ConnectionRegistry',
+        max_queue: int = settings.WS_SEND_QUEUE_SIZE,
+    ):
+        self.websocket = websocket
+        self.user_id = user_id
+        self.registry = registry
+        self.queue: asyncio.Queue[str] = asyncio.Queue(maxsize=max_queue)
+        self.frames_sent = 0
+        self.frames_dropped = 0
+        self.closed = False
+        self._writer: asyncio.Task | None = None
+
+    def start(self):
+        self._writer = asyncio.create_task(self._write_loop())
+
+    def send(self, frame: str) -> bool:
+        """Queue a frame without waiting. Returns False if it was dropped."""
+        if self.closed:
+            return False
+        try:
+            self.queue.put_nowait(frame)
+            return True
+        except asyncio.QueueFull:
+            self.frames_dropped += 1
+            self.registry.frames_dropped += 1
+            self.registry.slow_consumer_disconnects += 1
+            logger.warning('Send queue full for user %s, disconnecting', self.user_id)
+            self.abort(status.WS_1013_TRY_AGAIN_LATER, 'Send queue overflow')
+            return False
+
+    async def _write_loop(self):
+        try:
+            while True:
+                frame = await self.queue.get()
+                await asyncio.wait_for(
+                    self.websocket.send_text(frame),
+                    timeout=settings.WS_SEND_TIMEOUT,
+                )
+                self.frames_sent += 1
+                self.registry.frames_sent += 1
+        except asyncio.CancelledError:
+            raise
+        except asyncio.TimeoutError:
+            self.registry.slow_consumer_disconnects += 1
+            logger.warning('Send timed out for user %s, disconnecting', self.user_id)
+            self.abort(status.WS_1013_TRY_AGAIN_LATER, 'Send timed out')
+        except Exception:
+            # the peer is gone; the receive loop sees the disconnect and unregisters
+            logger.debug('Send failed for user %s', self.user_id, exc_info=True)
+            self.abort(status.WS_1011_INTERNAL_ERROR, 'Send failed')
+
+    def abort(self, code: int, reason: str):
+        """Stop writing and close the socket from the server side."""
+        if self.closed:
+            return
+        self.closed = True
+        self.frames_dropped += self.queue.qsize()
+        self.registry.frames_dropped += self.queue.qsize()
+        if self._writer is not None and self._writer is not asyncio.current_task():
+            self._writer.cancel()
+        task = asyncio.create_task(self._close_socket(code, reason))
+        _closing.add(task)
+        task.add_done_callback(_closing.discard)
+
+    async def _close_socket(self, code: int, reason: str):
+        try:
+            await self.websocket.close(code=code, reason=reason)
+        except Exception:
+            logger.debug('Closing socket for user %s failed', self.user_id, exc_info=True)
+
+    def stop(self):
+        """Called once the receive loop has ended."""
+        self.closed = True
+        if self._writer is not None:
+            self._writer.cancel()
+
+
+class ConnectionRegistry:
+    """Connections held by this worker, grouped by chat id."""
+
+    def __init__(self):
+        self.by_chat: dict[str, set[ClientConnection]] = {}
+        self.frames_sent = 0
+        self.frames_dropped = 0
+        self.slow_consumer_disconnects = 0
+
+    def add(self, chat_id: str, connection: ClientConnection) -> bool:
+        """Register a connection. Returns True if it is the chat's first one."""
+        connections = self.by_chat.get(chat_id)
+        if connections is None:
+            self.by_chat[chat_id] = {connection}
+            return True
+        connections.add(connection)
+        return False
+
+    def remove(self, chat_id: str, connection: ClientConnection) -> bool:
+        """Unregister a connection. Returns True if the chat has none left."""
+        connections = self.by_chat.get(chat_id)
+        if connections is None:
+            return False
+        connections.discard(connection)
+        if connections:
+            return False
+        del self.by_chat[chat_id]
+        return True
+
+    def broadcast(self, chat_id: str, frame: str) -> int:
+        """Queue a frame on every local connection of a chat; never blocks."""
+        delivered = 0
+        for connection in list(self.by_chat.get(chat_id, ())):
+            if connection.send(frame):
+                delivered += 1
+        ws_broadcast_fanout.observe(delivered)
+        return delivered
+
+    def close_user(self, chat_id: str, user_id: str, code: int, reason: str) -> int:
+        """Close a user's local sockets in one chat. Returns how many."""
+        closed = 0
+        for connection in list(self.by_chat.get(chat_id, ())):
+            if connection.user_id == user_id:
+                connection.abort(code, reason)
+                closed += 1
+        return closed
+
+    def stats(self) -> dict:
+        depths = [
+            connection.queue.qsize()
+            for connections in self.by_chat.values()
+            for connection in connections
+        ]
+        return {
+            'chats': len(self.by_chat),
+            'connections': len(depths),
+            'queue_depth_total': sum(depths),
+            'queue_depth_max': max(depths, default=0),
+            'queue_capacity': settings.WS_SEND_QUEUE_SIZE,
+            'frames_sent': self.frames_sent,
+            'frames_dropped': self.frames_dropped,
+            'slow_consumer_disconnects': self.slow_consumer_disconnects,
+        }
+
+
+connections = ConnectionRegistry()
+
+
+async def evict_member(chat_id: str, user_id: str):
+    """Call after removing a member, so their open sockets stop receiving the chat."""
+    connections.close_user(chat_id, user_id, status.WS_1008_POLICY_VIOLATION, 'No longer a member')
+    await backplane.publish(EVICTION_CHANNEL, f'{chat_id}:{user_id}'.encode())
+
+
+async def on_member_evicted(channel: str, data: bytes):
+    chat_id, user_id = data.decode().split(':', 1)
+    connections.close_user(chat_id, user_id, status.WS_1008_POLICY_VIOLATION, 'No longer a member')
+
+
+async def start_evictions():
+    await backplane.subscribe(EVICTION_CHANNEL, on_member_evicted)
+
+
+registry.register(CallbackMetric(
+    'ws_connections', 'Open WebSocket connections on this worker.',
+    lambda: sum(len(chat) for chat in connections.by_chat.values()),
+))
+registry.register(CallbackMetric(
+    'ws_chats', 'Chats with at least one open WebSocket on this worker.',
+    lambda: len(connections.by_chat),
+))
+registry.register(CallbackMetric(
+    'ws_frames_sent_total', 'WebSocket frames written to clients.',
+    lambda: connections.frames_sent, type='counter',
+))
+registry.register(CallbackMetric(
+    'ws_frames_dropped_total', 'WebSocket frames dropped on overflow or disconnect.',
+    lambda: connections.frames_dropped, type='counter',
+))
+registry.register(CallbackMetric(
+    'ws_slow_consumer_disconnects_total', 'Sockets closed for not keeping up.',
+    lambda: connections.slow_consumer_disconnects, type='counter',
+))
@@ -0,0 +1,42 @@
+from typing import Awaitable, Callable
+
+from config import settings
+from core.cache import TTLCache
+from service.backplane import backplane
+
+# chat ids whose cached member list must be dropped on every worker
+MEMBERSHIP_INVALIDATION_CHANNEL = 'chats:members:invalidate'
+
+membership_cache = TTLCache(
+    settings.CHAT_MEMBERSHIP_CACHE_SIZE, settings.CHAT_MEMBERSHIP_CACHE_TTL
+)
+
+
+async def get_cached_membership(
+    chat_id: str,
+    loader: Callable[[str], Awaitable[dict]],
+) -> dict:
+    """
+    Return a copy of the cached entry, loading it on a miss: {chat_id, type,
+    member_ids} for a private chat, {role} per 'chat_id:user_id' for a group.
+    """
+    chat = membership_cache.get(chat_id)
+    if chat is None:
+        generation = membership_cache.generation
+        chat = await loader(chat_id)
+        membership_cache.set(chat_id, chat, generation)
+    return dict(chat)
+
+
+async def invalidate_membership(chat_id: str):
+    """Call after any write to a chat's member_ids or a group membership."""
+    membership_cache.invalidate(chat_id)
+    await backplane.publish(MEMBERSHIP_INVALIDATION_CHANNEL, chat_id.encode())
+
+
+async def on_membership_invalidated(channel: str, data: bytes):
+    membership_cache.invalidate(data.decode())
+
+
+async def start_membership_cache():
+    await backplane.subscribe(MEMBERSHIP_INVALIDATION_CHANNEL, on_membership_invalidated)
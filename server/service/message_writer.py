@@ -0,0 +1,107 @@
+import asyncio
+import logging
+
+from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo import InsertOne
+from pymongo.errors import BulkWriteError
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class MessageBatchWriter:
+    """
+    Write-behind pipeline for new messages.
+
+    Messages are collected into micro-batches and flushed with one
+    unordered bulk_write once `batch_size` messages are pending or `linger`
+    seconds after the first one arrived, whichever comes first. `write`
+    only returns once the message's batch has been acknowledged by Mongo,
+    so callers can still ack the sender on durability.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = settings.MESSAGE_BATCH_SIZE,
+        linger: float = settings.MESSAGE_BATCH_LINGER,
+    ):
+        self.batch_size = batch_size
+        self.linger = linger
+        self.collection: AsyncIOMotorCollection | None = None
+        self._pending: list[tuple[dict, asyncio.Future]] = []
+        self._timer: asyncio.TimerHandle | None = None
+        self._flushes: set[asyncio.Task] = set()
+        self.batches_flushed = 0
+        self.messages_flushed = 0
+
+    @property
+    def running(self) -> bool:
+        return self.collection is not None
+
+    def start(self, collection: AsyncIOMotorCollection):
+        self.collection = collection
+
+    async def close(self):
+        """Flush whatever is pending and wait for in-flight batches."""
+        self._schedule_flush()
+        if self._flushes:
+            await asyncio.gather(*self._flushes, return_exceptions=True)
+        self.collection = None
+
+    async def write(self, message: dict) -> bool:
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((message, future))
+        if len(self._pending) >= self.batch_size:
+            self._schedule_flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(
+                self.linger, self._schedule_flush
+            )
+        try:
+            return await future
+        finally:
+            # InsertOne adds Mongo's _id to the document in place
+            message.pop('_id', None)
+
+    def _schedule_flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, []
+        task = asyncio.create_task(self._flush(batch))
+        self._flushes.add(task)
+        task.add_done_callback(self._flushes.discard)
+
+    async def _flush(self, batch: list[tuple[dict, asyncio.Future]]):
+        failed: dict[int, Exception] = {}
+        try:
+            await self.collection.bulk_write(
+                [InsertOne(message) for message, _ in batch], ordered=False
+            )
+        except BulkWriteError as e:
+            if e.details.get('writeConcernErrors'):
+                # none of the inserts is known to be durable
+                logger.error('Message batch of %d missed its write concern', len(batch))
+                failed = {i: e for i in range(len(batch))}
+            else:
+                for error in e.details.get('writeErrors', ()):
+                    failed[error['index']] = BulkWriteError(error)
+        except Exception as e:
+            logger.exception('Message batch of %d failed', len(batch))
+            failed = {i: e for i in range(len(batch))}
+
+        self.batches_flushed += 1
+        self.messages_flushed += len(batch) - len(failed)
+        for i, (_, future) in enumerate(batch):
+            if future.done():
+                continue
+            if i in failed:
+                future.set_exception(failed[i])
+            else:
+                future.set_result(True)
+
+
+message_writer = MessageBatchWriter()
@@ -0,0 +1,197 @@
+import asyncio
+import logging
+import time
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from fastapi import status
+from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo import UpdateOne
+
+from config import settings
+from core import codec
+from service.backplane import backplane
+from service.connections import ClientConnection, connections
+from utils import datetime_now
+
+logger = logging.getLogger(__name__)
+
+
+def presence_channel(user_id: str) -> str:
+    return f'presence:{user_id}'
+
+
+class PresenceTracker:
+    """
+    Online state driven by WebSocket connects and disconnects.
+
+    A user is online on this worker while they hold at least one socket.
+    The last disconnect only takes effect after a grace period, so the
+    client's reconnect when switching chats does not flap. Any inbound
+    frame counts as a heartbeat; sockets silent for longer than the
+    timeout are closed.
+
+    State changes are coalesced and written with one bulk_write per tick;
+    users still online are re-written every refresh interval so that
+    workers converge if another worker wrote them offline. Changes are
+    pushed as {"type": "presence"} frames to local chats that include the
+    user and, via the backplane, to every other worker watching them.
+    """
+
+    def __init__(self):
+        self.collection: AsyncIOMotorCollection | None = None
+        # user id -> {connection: last frame (monotonic)}
+        self.sessions: dict[str, dict[ClientConnection, float]] = {}
+        # user id -> monotonic deadline for going offline
+        self.grace: dict[str, float] = {}
+        # user id -> is_online, waiting for the next flush
+        self.dirty: dict[str, bool] = {}
+        # user id -> local chat ids whose members want that user's presence
+        self.watchers: dict[str, set[str]] = {}
+        # chat id -> member ids it was watched with
+        self.watched_chats: dict[str, list[str]] = {}
+        self._publishes: set[asyncio.Task] = set()
+        self._task: asyncio.Task | None = None
+        self._last_refresh = 0.0
+
+    def start(self, collection: AsyncIOMotorCollection):
+        self.collection = collection
+        self._last_refresh = time.monotonic()
+        self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        # this worker is going away: its users are offline as far as it knows
+        for user_id in list(self.sessions) + list(self.grace):
+            self.dirty[user_id] = False
+        self.sessions.clear()
+        self.grace.clear()
+        await self.flush()
+        self.collection = None
+
+    def is_online(self, user_id: str) -> bool:
+        return user_id in self.sessions or user_id in self.grace
+
+    # --- connection lifecycle ----------------------------------------------
+
+    def connect(self, user_id: str, connection: ClientConnection):
+        was_online = self.is_online(user_id)
+        self.grace.pop(user_id, None)
+        self.sessions.setdefault(user_id, {})[connection] = time.monotonic()
+        if not was_online:
+            self._changed(user_id, True)
+
+    def heartbeat(self, user_id: str, connection: ClientConnection):
+        sessions = self.sessions.get(user_id)
+        if sessions is not None and connection in sessions:
+            sessions[connection] = time.monotonic()
+
+    def disconnect(self, user_id: str, connection: ClientConnection):
+        sessions = self.sessions.get(user_id)
+        if sessions is None:
+            return
+        sessions.pop(connection, None)
+        if not sessions:
+            del self.sessions[user_id]
+            self.grace[user_id] = time.monotonic() + settings.PRESENCE_GRACE_PERIOD
+
+    # --- who gets told ------------------------------------------------------
+
+    async def watch(self, chat_id: str, member_ids: list[str]):
+        """A chat got its first local socket: follow its members' presence."""
+        self.watched_chats[chat_id] = member_ids
+        for member_id in member_ids:
+            chats = self.watchers.get(member_id)
+            if chats is None:
+                self.watchers[member_id] = {chat_id}
+                await backplane.subscribe(presence_channel(member_id), self._on_remote_frame)
+            else:
+                chats.add(chat_id)
+
+    async def unwatch(self, chat_id: str):
+        """A chat's last local socket left."""
+        for member_id in self.watched_chats.pop(chat_id, ()):
+            chats = self.watchers.get(member_id)
+            if chats is None:
+                continue
+            chats.discard(chat_id)
+            if not chats:
+                del self.watchers[member_id]
+                await backplane.unsubscribe(presence_channel(member_id))
+
+    def _deliver_local(self, user_id: str, frame: str):
+        for chat_id in self.watchers.get(user_id, ()):
+            connections.broadcast(chat_id, frame)
+
+    async def _on_remote_frame(self, channel: str, data: bytes):
+        self._deliver_local(channel.split(':', 1)[1], data.decode())
+
+    def _changed(self, user_id: str, online: bool):
+        self.dirty[user_id] = online
+        frame = codec.encode_frame({
+            'type': 'presence',
+            'user_id': user_id,
+            'is_online': online,
+            'last_seen': datetime_now(),
+        })
+        self._deliver_local(user_id, frame)
+        task = asyncio.create_task(backplane.publish(presence_channel(user_id), frame.encode()))
+        self._publishes.add(task)
+        task.add_done_callback(self._publishes.discard)
+
+    # --- periodic work ------------------------------------------------------
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(settings.PRESENCE_FLUSH_INTERVAL)
+            try:
+                self.tick()
+                await self.flush()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception('Presence flush failed')
+
+    def tick(self):
+        now = time.monotonic()
+        for user_id, deadline in list(self.grace.items()):
+            if deadline <= now:
+                del self.grace[user_id]
+                self._changed(user_id, False)
+
+        if settings.PRESENCE_HEARTBEAT_TIMEOUT > 0:
+            stale_before = now - settings.PRESENCE_HEARTBEAT_TIMEOUT
+            for sessions in self.sessions.values():
+                for connection, last_frame in sessions.items():
+                    if last_frame < stale_before:
+                        # the receive loop ends and disconnect() follows
+                        connection.abort(status.WS_1001_GOING_AWAY, 'Heartbeat timeout')
+
+        if now - self._last_refresh >= settings.PRESENCE_REFRESH_INTERVAL:
+            self._last_refresh = now
+            for user_id in self.sessions:
+                self.dirty.setdefault(user_id, True)
+
+    async def flush(self):
+        if not self.dirty or self.collection is None:
+            return
+        dirty, self.dirty = self.dirty, {}
+        now = datetime_now()
+        operations = []
+        for user_id, online in dirty.items():
+            try:
+                oid = ObjectId(user_id)
+            except InvalidId:
+                continue
+            operations.append(UpdateOne(
+                {'_id': oid},
+                {'$set': {'is_online': online, 'last_seen': now}}
+            ))
+        # the cached auth view has no presence fields, so no invalidation
+        if operations:
+            await self.collection.bulk_write(operations, ordered=False)
+
+
+presence = PresenceTracker()
@@ -0,0 +1,159 @@
+import functools
+import math
+import re
+import time
+from collections import OrderedDict
+from typing import Callable
+
+from fastapi import HTTPException, Request, status
+
+from config import settings
+
+_LIMIT_RE = re.compile(r'^\s*(\d+)\s*/\s*(\d*)\s*(second|minute|hour|day)s?\s*$')
+_PERIODS = {'second': 1, 'minute': 60, 'hour': 3600, 'day': 86400}
+
+
+@functools.lru_cache(maxsize=None)
+def parse_limit(limit: str) -> tuple[int, float]:
+    """
+    "5/minute" or "2/10minute" -> (capacity, tokens refilled per second).
+    """
+    match = _LIMIT_RE.match(limit)
+    if not match:
+        raise ValueError(f'Invalid rate limit: {limit!r}')
+    amount, multiplier, period = match.groups()
+    seconds = int(multiplier or 1) * _PERIODS[period]
+    return int(amount), int(amount) / seconds
+
+
+class InMemoryRateLimitBackend:
+    """
+    Token buckets for this process only. Buckets live in an LRU capped at
+    `max_keys`; an evicted bucket simply starts full again, which is what
+    an idle bucket would have refilled to anyway.
+    """
+
+    def __init__(
+        self,
+        max_keys: int = settings.RATE_LIMIT_MAX_KEYS,
+        timer: Callable[[], float] = time.monotonic,
+    ):
+        self.max_keys = max_keys
+        self.timer = timer
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+
+    async def take(self, key: str, capacity: int, rate: float, cost: int = 1) -> tuple[bool, float]:
+        now = self.timer()
+        bucket = self._buckets.pop(key, None)
+        if bucket is None:
+            tokens = float(capacity)
+        else:
+            tokens, updated_at = bucket
+            tokens = min(capacity, tokens + (now - updated_at) * rate)
+
+        allowed = tokens >= cost
+        if allowed:
+            tokens -= cost
+        self._buckets[key] = (tokens, now)
+        if len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return allowed, 0.0 if allowed else (cost - tokens) / rate
+
+
+# KEYS[1] bucket; ARGV capacity, rate (tokens/s), cost. Uses the server
+# clock so every worker agrees on time; idle buckets expire once full.
+TOKEN_BUCKET_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(bucket[1])
+if tokens == nil then
+    tokens = capacity
+else
+    tokens = math.min(capacity, tokens + (now - tonumber(bucket[2])) * rate)
+end
+local allowed = 0
+local retry_after = 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+else
+    retry_after = (cost - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate * 1000))
+return {allowed, tostring(retry_after)}
+"""
+
+
+class RedisRateLimitBackend:
+    """Token buckets shared by every worker, kept in Redis."""
+
+    def __init__(self, url: str, client=None):
+        if client is None:
+            from redis import asyncio as aioredis
+
+            client = aioredis.from_url(url)
+        self.redis = client
+        self.script = self.redis.register_script(TOKEN_BUCKET_SCRIPT)
+
+    async def take(self, key: str, capacity: int, rate: float, cost: int = 1) -> tuple[bool, float]:
+        allowed, retry_after = await self.script(
+            keys=[f'ratelimit:{key}'], args=[capacity, rate, cost]
+        )
+        return bool(allowed), float(retry_after)
+
+
+def client_ip(request: Request) -> str:
+    return request.client.host if request.client else 'unknown'
+
+
+class RateLimiter:
+    """
+    One rate-limiting engine for REST routes and WebSocket frames. Limits
+    use slowapi-style strings ("5/minute", "2/10minute") and apply per key,
+    e.g. per user, per IP or per chat.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    async def hit(self, limit: str, scope: str, identity: str) -> tuple[bool, float]:
+        """Take a token for `identity`. Returns (allowed, retry_after seconds)."""
+        capacity, rate = parse_limit(limit)
+        return await self.backend.take(f'{scope}:{identity}', capacity, rate)
+
+    def limit(self, limit: str, key: Callable[[Request], str] = client_ip):
+        """
+        Route decorator; like slowapi, the endpoint must take `request: Request`.
+        """
+        parse_limit(limit)
+
+        def decorator(endpoint):
+            scope = f'{endpoint.__module__}.{endpoint.__name__}'
+
+            @functools.wraps(endpoint)
+            async def wrapper(*args, **kwargs):
+                request: Request = kwargs['request']
+                allowed, retry_after = await self.hit(limit, scope, key(request))
+                if not allowed:
+                    raise HTTPException(
+                        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                        detail='Too many requests. Please wait.',
+                        headers={'Retry-After': str(max(1, math.ceil(retry_after)))},
+                    )
+                return await endpoint(*args, **kwargs)
+            return wrapper
+        return decorator
+
+
+def get_rate_limiter() -> RateLimiter:
+    if settings.RATE_LIMIT_BACKEND == 'redis':
+        return RateLimiter(RedisRateLimitBackend(settings.REDIS_URL))
+    return RateLimiter(InMemoryRateLimitBackend())
+
+
+limiter = get_rate_limiter()
@@ -0,0 +1,200 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+
+from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo import ASCENDING, UpdateOne
+
+from config import settings
+from core import codec
+from service.backplane import backplane, chat_channel
+from service.connections import connections
+from utils import datetime_now
+
+logger = logging.getLogger(__name__)
+
+RECEIPT_KINDS = ('delivered', 'read')
+
+RECEIPT_PROJECTION = {'_id': 0, 'chat_id': 0}
+
+# client clocks run a little ahead; anything further out is made up
+MAX_CLOCK_SKEW = timedelta(seconds=30)
+
+
+def _newer(a: tuple[datetime, str], b: tuple[datetime, str] | None) -> bool:
+    return b is None or a > b
+
+
+def _utc(timestamp: datetime) -> datetime:
+    # Mongo hands back naive UTC datetimes
+    return timestamp if timestamp.tzinfo else timestamp.replace(tzinfo=timezone.utc)
+
+
+def parse_watermark_time(value: str) -> datetime:
+    """
+    A message's created_at as the client echoes it, in UTC and truncated
+    to Mongo's millisecond precision so it compares equal to the stored
+    message. Raises ValueError, also for times in the future.
+    """
+    timestamp = _utc(datetime.fromisoformat(value)).astimezone(timezone.utc)
+    if timestamp > datetime_now() + MAX_CLOCK_SKEW:
+        raise ValueError('created_at is in the future')
+    return timestamp.replace(microsecond=timestamp.microsecond // 1000 * 1000)
+
+
+class ReceiptTracker:
+    """
+    Per-user, per-chat delivery and read watermarks: the (created_at, id)
+    of the newest message the user has received / read in that chat.
+
+    Clients advance them with {"type": "receipt"} frames on the chat's
+    socket. An ack only moves an in-memory watermark forward, so any number
+    of acks between two ticks cost one document write per (chat, user).
+    Each tick looks the acked message ids up in one query, drops any that
+    are not in that chat and takes created_at from the stored message, so
+    a client cannot pin a watermark with a made-up time. It then writes
+    them with one bulk_write, forward-only on the server too since several
+    workers may hold acks for the same user, and sends one
+    {"type": "receipts"} frame per chat with every watermark that moved.
+    """
+
+    def __init__(self):
+        self.collection: AsyncIOMotorCollection | None = None
+        self.message_collection: AsyncIOMotorCollection | None = None
+        # (chat id, user id) -> {kind: (created_at, message id)}, waiting for the next flush
+        self.pending: dict[tuple[str, str], dict[str, tuple[datetime, str]]] = {}
+        self._task: asyncio.Task | None = None
+
+    def start(self, collection: AsyncIOMotorCollection, message_collection: AsyncIOMotorCollection):
+        self.collection = collection
+        self.message_collection = message_collection
+        self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        await self.flush()
+        self.collection = None
+        self.message_collection = None
+
+    def advance(self, chat_id: str, user_id: str, kind: str, created_at: datetime, message_id: str):
+        """Record an ack; reading a message also means it was delivered."""
+        watermarks = self.pending.setdefault((chat_id, user_id), {})
+        mark = (created_at, message_id)
+        kinds = ('delivered', 'read') if kind == 'read' else (kind,)
+        for kind in kinds:
+            if _newer(mark, watermarks.get(kind)):
+                watermarks[kind] = mark
+
+    async def get_receipts(
+        self,
+        chat_id: str,
+        after: str | None = None,
+        limit: int = settings.RECEIPT_PAGE_SIZE,
+    ) -> dict:
+        """
+        One page of a chat's watermarks ordered by user_id, with acks not yet
+        flushed by this worker folded in. next_cursor is the last user_id.
+        """
+        limit = max(1, min(limit, settings.RECEIPT_PAGE_SIZE_MAX))
+        query: dict = {'chat_id': chat_id}
+        if after is not None:
+            query['user_id'] = {'$gt': after}
+        receipts = await self.collection.find(query, RECEIPT_PROJECTION).sort(
+            'user_id', ASCENDING
+        ).limit(limit + 1).to_list(None)
+        next_cursor = None
+        if len(receipts) > limit:
+            receipts = receipts[:limit]
+            next_cursor = receipts[-1]['user_id']
+
+        for receipt in receipts:
+            for kind in RECEIPT_KINDS:
+                if kind in receipt:
+                    receipt[kind]['created_at'] = _utc(receipt[kind]['created_at'])
+            for kind, (created_at, message_id) in self.pending.get((chat_id, receipt['user_id']), {}).items():
+                stored = receipt.get(kind)
+                if stored is None or (created_at, message_id) > (stored['created_at'], stored['message_id']):
+                    receipt[kind] = {'created_at': created_at, 'message_id': message_id}
+        return {'receipts': receipts, 'next_cursor': next_cursor}
+
+    # --- periodic work ------------------------------------------------------
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(settings.RECEIPT_FLUSH_INTERVAL)
+            try:
+                await self.flush()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception('Receipt flush failed')
+
+    async def flush(self):
+        if not self.pending or self.collection is None:
+            return
+        pending, self.pending = self.pending, {}
+        try:
+            by_chat = await self._write(pending)
+        except Exception:
+            # keep the acks for the next tick, behind any that arrived since
+            for key, watermarks in pending.items():
+                for kind, mark in watermarks.items():
+                    self.advance(key[0], key[1], kind, *mark)
+            raise
+
+        for chat_id, receipts in by_chat.items():
+            frame = codec.encode_frame({'type': 'receipts', 'chat_id': chat_id, 'receipts': receipts})
+            connections.broadcast(chat_id, frame)
+            await backplane.publish(chat_channel(chat_id), frame.encode())
+
+    async def _write(self, pending: dict) -> dict[str, list[dict]]:
+        message_ids = list({
+            message_id for watermarks in pending.values() for _, message_id in watermarks.values()
+        })
+        stored = {
+            message['id']: message
+            async for message in self.message_collection.find(
+                {'id': {'$in': message_ids}}, {'_id': 0, 'id': 1, 'chat_id': 1, 'created_at': 1}
+            )
+        }
+
+        operations = []
+        by_chat: dict[str, list[dict]] = {}
+        for (chat_id, user_id), watermarks in pending.items():
+            update = {}
+            receipt = {'user_id': user_id}
+            for kind, (_, message_id) in watermarks.items():
+                message = stored.get(message_id)
+                if message is None or message['chat_id'] != chat_id:
+                    logger.debug('Dropped %s receipt for unknown message %s in chat %s', kind, message_id, chat_id)
+                    continue
+                created_at = _utc(message['created_at'])
+                mark = {'created_at': created_at, 'message_id': message_id}
+                # only forward: compare (created_at, message_id) with what is stored
+                is_newer = {'$or': [
+                    {'$eq': [{'$type': f'${kind}'}, 'missing']},
+                    {'$gt': [created_at, f'${kind}.created_at']},
+                    {'$and': [
+                        {'$eq': [created_at, f'${kind}.created_at']},
+                        {'$gt': [message_id, f'${kind}.message_id']},
+                    ]},
+                ]}
+                update[kind] = {'$cond': [is_newer, {'$literal': mark}, f'${kind}']}
+                receipt[kind] = mark
+            if not update:
+                continue
+            operations.append(UpdateOne(
+                {'chat_id': chat_id, 'user_id': user_id},
+                [{'$set': update}],
+                upsert=True,
+            ))
+            by_chat.setdefault(chat_id, []).append(receipt)
+
+        if operations:
+            await self.collection.bulk_write(operations, ordered=False)
+        return by_chat
+
+
+receipts = ReceiptTracker()
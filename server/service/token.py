@@ -4,6 +4,7 @@ from datetime import datetime, timedelta
 from config import settings
 from exceptions import credentials_exception
 from crud.user import User
+from service.user_cache import get_cached_user
 from itsdangerous import URLSafeTimedSerializer
 from jose import JWTError, jwt
 from datetime import datetime, timedelta, timezone
@@ -19,7 +20,7 @@ class TokenManager:
         # longer-lived refresh tokens
         self.refresh_expires = timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
     async def get_jwt_access_token(self, subject: str) -> str:
-        user = await self.user_manager.get_by_id(subject)
+        user = await self.user_manager.get_auth_by_id(subject)
         now = datetime.now(timezone.utc)
         expire = now + self.access_expires
         payload = {
@@ -32,7 +33,7 @@ class TokenManager:
         return jwt.encode(payload, self.jwt_secret_key, algorithm=self.jwt_algorithm)
 
     async def get_jwt_refresh_token(self, subject: str) -> str:
-        user = await self.user_manager.get_by_id(subject)
+        user = await self.user_manager.get_auth_by_id(subject)
         now = datetime.now(timezone.utc)
         expire = now + self.refresh_expires
         payload = {
@@ -61,16 +62,16 @@ class TokenManager:
         except JWTError:
             raise credentials_exception
 
-    async def get_user_form_jwt_token(self, token: str, subject_key: str) -> schemas.User:
+    async def get_user_form_jwt_token(self, token: str, subject_key: str) -> schemas.UserAuth:
         token_data = await self.get_data_form_jwt_token(token)
-        user = await self.user_manager.get_by_id(token_data["sub"])
-        if token_data.get("ver") != user["token_version"]:
-            raise credentials_exception 
         subject = token_data.get("sub")
 
-        if subject_key == "id":
-            user = await self.user_manager.get_by_id(subject)
-        elif subject_key == "email":
+        # one cached lookup serves both the token_version check and the result
+        user = await get_cached_user(subject, self.user_manager.get_auth_by_id)
+        if token_data.get("ver") != user["token_version"]:
+            raise credentials_exception
+
+        if subject_key == "email":
             user = await self.user_manager.get_by_email(subject)
 
         if not user:
@@ -0,0 +1,37 @@
+from typing import Awaitable, Callable
+
+from config import settings
+from core.cache import TTLCache
+from service.backplane import backplane
+
+# user ids whose cached document must be dropped on every worker
+USER_INVALIDATION_CHANNEL = 'users:invalidate'
+
+user_cache = TTLCache(settings.USER_CACHE_SIZE, settings.USER_CACHE_TTL)
+
+
+async def get_cached_user(
+    user_id: str,
+    loader: Callable[[str], Awaitable[dict]],
+) -> dict:
+    """Return a copy of the user document, loading it on a miss."""
+    user = user_cache.get(user_id)
+    if user is None:
+        generation = user_cache.generation
+        user = await loader(user_id)
+        user_cache.set(user_id, user, generation)
+    return dict(user)
+
+
+async def invalidate_user(user_id: str):
+    """Drop a user from this worker's cache and tell the other workers."""
+    user_cache.invalidate(user_id)
+    await backplane.publish(USER_INVALIDATION_CHANNEL, user_id.encode())
+
+
+async def on_user_invalidated(channel: str, data: bytes):
+    user_cache.invalidate(data.decode())
+
+
+async def start_user_cache():
+    await backplane.subscribe(USER_INVALIDATION_CHANNEL, on_user_invalidated)
@@ -0,0 +1,23 @@
+import os
+
+# Settings are read when config is first imported; these stand in for the
+# required values a real deployment takes from server/.env.
+for name, value in {
+    'ENVIRONMENT': 'test',
+    'ALLOWED_ORIGINS': 'http://localhost:3000',
+    'MONGODB_URL': 'mongodb://localhost:27017',
+    'MONGODB_DB_NAME': 'test',
+    'USERS_COLLECTION': 'users',
+    'SECRET_KEY': 'test-secret',
+    'ALGORITHM': 'HS256',
+    'ACCESS_TOKEN_EXPIRE_MINUTES': '15',
+    'PASSWORD_RESET_EXPIRE_MINUTES': '15',
+    'REFRESH_TOKEN_EXPIRE_DAYS': '7',
+    'SMTP_HOST': 'localhost',
+    'SMTP_PORT': '25',
+    'SMTP_USER': 'test',
+    'SMTP_PASSWORD': 'test',
+    'EMAIL_FROM': 'test@example.com',
+    'FRONTEND_URL': 'http://localhost:3000',
+}.items():
+    os.environ.setdefault(name, value)
@@ -0,0 +1,207 @@
+import asyncio
+
+import pytest
+
+from service.backplane import Backplane, InMemoryBackplane, RedisBackplane
+
+
+class FakeRedisServer:
+    """Just enough of Redis PUBLISH/SUBSCRIBE for RedisBackplane."""
+
+    def __init__(self):
+        self.subscribers: dict[bytes, set['FakePubSub']] = {}
+
+    def client(self) -> 'FakeRedis':
+        return FakeRedis(self)
+
+
+class FakeRedis:
+    def __init__(self, server: FakeRedisServer):
+        self.server = server
+        self.closed = False
+
+    def pubsub(self) -> 'FakePubSub':
+        return FakePubSub(self.server)
+
+    async def publish(self, channel: str, data: bytes) -> int:
+        subscribers = self.server.subscribers.get(channel.encode(), set())
+        for pubsub in subscribers:
+            pubsub.messages.put_nowait({'type': 'message', 'channel': channel.encode(), 'data': data})
+        return len(subscribers)
+
+    async def aclose(self):
+        self.closed = True
+
+
+class FakePubSub:
+    def __init__(self, server: FakeRedisServer):
+        self.server = server
+        self.channels: set[bytes] = set()
+        self.messages: asyncio.Queue = asyncio.Queue()
+
+    @property
+    def subscribed(self) -> bool:
+        return bool(self.channels)
+
+    async def subscribe(self, channel: str):
+        self.channels.add(channel.encode())
+        self.server.subscribers.setdefault(channel.encode(), set()).add(self)
+
+    async def unsubscribe(self, channel: str):
+        self.channels.discard(channel.encode())
+        self.server.subscribers.get(channel.encode(), set()).discard(self)
+
+    async def get_message(self, ignore_subscribe_messages: bool = False, timeout: float = 0.0):
+        try:
+            return await asyncio.wait_for(self.messages.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    async def aclose(self):
+        for channel in list(self.channels):
+            await self.unsubscribe(channel.decode())
+
+
+class Inbox:
+    """A backplane handler that records what it is given."""
+
+    def __init__(self):
+        self.frames: list[tuple[str, bytes]] = []
+        self.received = asyncio.Event()
+
+    async def __call__(self, channel: str, data: bytes):
+        self.frames.append((channel, data))
+        self.received.set()
+
+
+async def settle():
+    # lets the Redis reader tasks drain whatever was published
+    for _ in range(5):
+        await asyncio.sleep(0.01)
+
+
+def in_memory_pair():
+    bus = {}
+    return InMemoryBackplane(bus), InMemoryBackplane(bus)
+
+
+def redis_pair():
+    server = FakeRedisServer()
+    return RedisBackplane('redis://fake', server.client()), RedisBackplane('redis://fake', server.client())
+
+
+PAIRS = [pytest.param(in_memory_pair, id='memory'), pytest.param(redis_pair, id='redis')]
+
+
+def test_backplane_is_abstract():
+    with pytest.raises(TypeError):
+        Backplane()
+
+
+@pytest.mark.parametrize('make_pair', PAIRS)
+def test_publish_reaches_other_workers_only(make_pair):
+    async def scenario():
+        first, second = make_pair()
+        await first.start()
+        await second.start()
+        first_inbox, second_inbox = Inbox(), Inbox()
+        await first.subscribe('chat:1', first_inbox)
+        await second.subscribe('chat:1', second_inbox)
+
+        await first.publish('chat:1', b'hello')
+        await asyncio.wait_for(second_inbox.received.wait(), 1)
+        await settle()
+
+        assert second_inbox.frames == [('chat:1', b'hello')]
+        # a worker delivers to its own sockets itself
+        assert first_inbox.frames == []
+        await first.close()
+        await second.close()
+
+    asyncio.run(scenario())
+
+
+@pytest.mark.parametrize('make_pair', PAIRS)
+def test_publish_skips_other_channels(make_pair):
+    async def scenario():
+        first, second = make_pair()
+        await first.start()
+        await second.start()
+        inbox = Inbox()
+        await second.subscribe('chat:1', inbox)
+
+        await first.publish('chat:2', b'elsewhere')
+        await settle()
+
+        assert inbox.frames == []
+        await first.close()
+        await second.close()
+
+    asyncio.run(scenario())
+
+
+@pytest.mark.parametrize('make_pair', PAIRS)
+def test_unsubscribe_stops_delivery(make_pair):
+    async def scenario():
+        first, second = make_pair()
+        await first.start()
+        await second.start()
+        inbox = Inbox()
+        await second.subscribe('chat:1', inbox)
+        await second.unsubscribe('chat:1')
+
+        await first.publish('chat:1', b'late')
+        await settle()
+
+        assert inbox.frames == []
+        assert 'chat:1' not in second.handlers
+        await first.close()
+        await second.close()
+
+    asyncio.run(scenario())
+
+
+@pytest.mark.parametrize('make_pair', PAIRS)
+def test_close_stops_delivery(make_pair):
+    async def scenario():
+        first, second = make_pair()
+        await first.start()
+        await second.start()
+        inbox = Inbox()
+        await second.subscribe('chat:1', inbox)
+        await second.close()
+
+        await first.publish('chat:1', b'late')
+        await settle()
+
+        assert inbox.frames == []
+        assert second.handlers == {}
+        await first.close()
+
+    asyncio.run(scenario())
+
+
+def test_in_memory_close_leaves_the_bus_empty():
+    async def scenario():
+        first, second = in_memory_pair()
+        await first.subscribe('chat:1', Inbox())
+        await second.subscribe('chat:1', Inbox())
+        await first.close()
+        assert first.bus == {'chat:1': {second}}
+        await second.close()
+        assert second.bus == {}
+
+    asyncio.run(scenario())
+
+
+def test_redis_close_closes_the_connection():
+    async def scenario():
+        server = FakeRedisServer()
+        client = server.client()
+        backplane = RedisBackplane('redis://fake', client)
+        await backplane.start()
+        await backplane.close()
+        assert client.closed
+        assert backplane._reader is None
+
+    asyncio.run(scenario())
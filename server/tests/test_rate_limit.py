@@ -0,0 +1,156 @@
+import asyncio
+
+import pytest
+
+from service.rate_limit import (
+    InMemoryRateLimitBackend,
+    RateLimiter,
+    RedisRateLimitBackend,
+    parse_limit,
+)
+
+
+class FakeClock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float):
+        self.now += seconds
+
+
+def take_all(backend, key: str, capacity: int, rate: float, times: int) -> list[bool]:
+    async def scenario():
+        return [(await backend.take(key, capacity, rate))[0] for _ in range(times)]
+
+    return asyncio.run(scenario())
+
+
+def test_parse_limit():
+    assert parse_limit('5/minute') == (5, 5 / 60)
+    assert parse_limit('2/10minute') == (2, 2 / 600)
+    assert parse_limit('50/second') == (50, 50.0)
+    with pytest.raises(ValueError):
+        parse_limit('5 per minute')
+
+
+# --- in-memory token buckets ---------------------------------------------------
+
+def test_burst_up_to_capacity_then_denied():
+    backend = InMemoryRateLimitBackend(timer=FakeClock())
+    assert take_all(backend, 'k', 3, 1.0, 4) == [True, True, True, False]
+
+
+def test_denial_reports_time_until_next_token():
+    backend = InMemoryRateLimitBackend(timer=FakeClock())
+    take_all(backend, 'k', 2, 0.5, 2)
+    allowed, retry_after = asyncio.run(backend.take('k', 2, 0.5))
+    assert not allowed
+    assert retry_after == pytest.approx(2.0)
+
+
+def test_refill_is_proportional_to_elapsed_time():
+    clock = FakeClock()
+    backend = InMemoryRateLimitBackend(timer=clock)
+    take_all(backend, 'k', 4, 2.0, 4)
+
+    clock.advance(0.4)
+    # 0.8 of a token: still denied
+    assert take_all(backend, 'k', 4, 2.0, 1) == [False]
+    clock.advance(0.6)
+    # another 1.2 tokens, 2.0 in all
+    assert take_all(backend, 'k', 4, 2.0, 3) == [True, True, False]
+
+
+def test_refill_never_exceeds_capacity():
+    clock = FakeClock()
+    backend = InMemoryRateLimitBackend(timer=clock)
+    take_all(backend, 'k', 2, 1.0, 2)
+    clock.advance(3600)
+    assert take_all(backend, 'k', 2, 1.0, 3) == [True, True, False]
+
+
+def test_keys_have_separate_buckets():
+    backend = InMemoryRateLimitBackend(timer=FakeClock())
+    assert take_all(backend, 'a', 1, 1.0, 2) == [True, False]
+    assert take_all(backend, 'b', 1, 1.0, 1) == [True]
+
+
+def test_least_recently_used_bucket_is_evicted():
+    backend = InMemoryRateLimitBackend(max_keys=2, timer=FakeClock())
+    take_all(backend, 'a', 1, 0.001, 1)
+    take_all(backend, 'b', 1, 0.001, 1)
+    # touching 'a' makes 'b' the oldest
+    take_all(backend, 'a', 1, 0.001, 1)
+    take_all(backend, 'c', 1, 0.001, 1)
+
+    assert list(backend._buckets) == ['a', 'c']
+    # an evicted bucket starts full again
+    assert take_all(backend, 'b', 1, 0.001, 1) == [True]
+    assert len(backend._buckets) == 2
+
+
+def test_limiter_scopes_keys():
+    backend = InMemoryRateLimitBackend(timer=FakeClock())
+    limiter = RateLimiter(backend)
+
+    async def scenario():
+        return [
+            (await limiter.hit('1/minute', 'ws:user', 'u1'))[0],
+            (await limiter.hit('1/minute', 'ws:user', 'u1'))[0],
+            (await limiter.hit('1/minute', 'ws:chat', 'u1'))[0],
+        ]
+
+    assert asyncio.run(scenario()) == [True, False, True]
+    assert set(backend._buckets) == {'ws:user:u1', 'ws:chat:u1'}
+
+
+# --- Redis Lua script ----------------------------------------------------------
+
+@pytest.fixture
+def redis_backend():
+    """The real Lua script on fakeredis; needs `pip install fakeredis[lua]`."""
+    fakeredis = pytest.importorskip('fakeredis')
+    pytest.importorskip('lupa')
+    return RedisRateLimitBackend('redis://fake', fakeredis.FakeAsyncRedis())
+
+
+def rewind(backend: RedisRateLimitBackend, key: str, seconds: float):
+    """Move a bucket's last update into the past, as if time had passed."""
+    async def scenario():
+        ts = float(await backend.redis.hget(f'ratelimit:{key}', 'ts'))
+        await backend.redis.hset(f'ratelimit:{key}', 'ts', str(ts - seconds))
+
+    asyncio.run(scenario())
+
+
+def test_redis_burst_up_to_capacity_then_denied(redis_backend):
+    # one token a day, so the real clock adds nothing during the test
+    rate = 1 / 86400
+    assert take_all(redis_backend, 'k', 3, rate, 4) == [True, True, True, False]
+    allowed, retry_after = asyncio.run(redis_backend.take('k', 3, rate))
+    assert not allowed
+    assert retry_after == pytest.approx(86400, rel=1e-3)
+
+
+def test_redis_refill_is_proportional_to_elapsed_time(redis_backend):
+    rate = 1 / 60
+    take_all(redis_backend, 'k', 5, rate, 5)
+    rewind(redis_backend, 'k', 150)
+    # 2.5 tokens back
+    assert take_all(redis_backend, 'k', 5, rate, 3) == [True, True, False]
+
+
+def test_redis_refill_never_exceeds_capacity(redis_backend):
+    rate = 1 / 60
+    take_all(redis_backend, 'k', 2, rate, 2)
+    rewind(redis_backend, 'k', 86400)
+    assert take_all(redis_backend, 'k', 2, rate, 3) == [True, True, False]
+
+
+def test_redis_bucket_expires_once_it_would_be_full(redis_backend):
+    take_all(redis_backend, 'k', 10, 2.0, 1)
+    ttl = asyncio.run(redis_backend.redis.pttl('ratelimit:k'))
+    assert 0 < ttl <= 5000
@@ -1,7 +1,12 @@
 
-from datetime import datetime, timezone
+import base64
+import binascii
+from datetime import datetime, timedelta, timezone
 from uuid import uuid4
 
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+MILLISECOND = timedelta(milliseconds=1)
+
 
 #  Get current time
 def datetime_now() -> datetime:
@@ -11,3 +16,24 @@ def datetime_now() -> datetime:
 # Generate a random UUID
 def get_uuid4() -> str:
     return uuid4().hex
+
+
+
+# Opaque keyset cursor: '<timestamp ms>:<tie-breaking key>', base64url.
+# Mongo stores datetimes with millisecond precision, so ms is exact.
+def encode_keyset_cursor(timestamp: datetime, key: str) -> str:
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=timezone.utc)
+    millis = (timestamp - EPOCH) // MILLISECOND
+    raw = f'{millis}:{key}'.encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_keyset_cursor(cursor: str) -> tuple[datetime, str]:
+    """Raises ValueError for anything encode_keyset_cursor did not produce."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        millis, key = raw.split(':', 1)
+        return EPOCH + int(millis) * MILLISECOND, key
+    except (binascii.Error, UnicodeDecodeError, OverflowError) as e:
+        raise ValueError('Invalid cursor') from e
@@ -1,24 +1,65 @@
 
-import json
-from fastapi import Depends, HTTPException, WebSocket, WebSocketDisconnect
+import logging
+
+from fastapi import Depends, HTTPException, WebSocket, WebSocketDisconnect, status
 from pydantic import ValidationError
-from api.deps import get_private_chat_manager, get_token_manager
-from serializers.chat_serializers import message_serializer
-from crud.chat import PrivateChatManager
+from api.deps import get_group_chat_manager, get_private_chat_manager, get_token_manager
+from core import codec, metrics
+from crud.chat import ChatNotFoundException, PrivateChatManager
+from crud.group import GroupChatManager
 from service.token import TokenManager
 from schemas import shared
+from service.backplane import backplane, chat_channel
+from service.connections import ClientConnection, connections
+from service.rate_limit import limiter
+from service.presence import presence
+from service.receipts import RECEIPT_KINDS, parse_watermark_time, receipts
+from config import settings
 import schemas
-import time
-from collections import defaultdict, deque
 
-connected_clients: dict[str, set] = dict()
+logger = logging.getLogger(__name__)
+# per-frame events: only a sample is written
+SAMPLED = {'sample_rate': settings.LOG_SAMPLE_RATE}
+
+# connections held by *this* worker, by chat id; peers on other workers
+# are reached through the backplane
+connected_clients = connections.by_chat
+
+
+RATE_LIMITED_FRAME = codec.encode_frame({"error": "Too many messages. Please wait."})
+INVALID_FRAME = codec.encode_frame({"error": "Frames must be JSON objects."})
+INVALID_MESSAGE_FRAME = codec.encode_frame({"error": "Message is missing fields or malformed."})
+INVALID_RECEIPT_FRAME = codec.encode_frame({
+    "error": "Receipts need kind ('delivered' or 'read'), message_id and created_at."
+})
+
+
+def deliver_local(chat_id: str, frame: str):
+    # only enqueues; every connection's writer task sends concurrently
+    connections.broadcast(chat_id, frame)
+
 
+async def on_backplane_frame(channel: str, data: bytes):
+    chat_id = channel.split(':', 1)[1]
+    deliver_local(chat_id, data.decode())
 
-# rate limit 
-message_timestamps: dict[str, deque] = defaultdict(lambda: deque())
 
-RATE_LIMIT = 5
-INTERVAL = 1
+async def register_client(chat_id: str, member_ids: list[str], connection: ClientConnection):
+    connection.start()
+    presence.connect(connection.user_id, connection)
+    if connections.add(chat_id, connection):
+        # first local socket for this chat: start listening to other workers
+        await backplane.subscribe(chat_channel(chat_id), on_backplane_frame)
+        await presence.watch(chat_id, member_ids)
+
+
+async def unregister_client(chat_id: str, connection: ClientConnection):
+    connection.stop()
+    presence.disconnect(connection.user_id, connection)
+    if connections.remove(chat_id, connection):
+        await backplane.unsubscribe(chat_channel(chat_id))
+        await presence.unwatch(chat_id)
+        logger.debug('Last local client left chat %s', chat_id)
 
 async def chat_websocket_endpoint(
     chat_type: str,
@@ -28,13 +69,14 @@ async def chat_websocket_endpoint(
     token_subject_key: str = 'id',
     token_manager: TokenManager = Depends(get_token_manager),
     pvt_chat_manager: PrivateChatManager = Depends(get_private_chat_manager),
+    group_chat_manager: GroupChatManager = Depends(get_group_chat_manager),
 ):
     await websocket.accept()
     # print(f"[+] WebSocket connection accepted for chat type: {chat_type}, chat ID: {chat_id}")
     
     try:
        user_dict = await token_manager.get_user_form_jwt_token(token, token_subject_key)
-       current_user = schemas.User(**user_dict)          
+       current_user = schemas.UserAuth(**user_dict)          
     except ValidationError:
         await websocket.send_json({"error": "Invalid user data"})
         await websocket.close()
@@ -44,55 +86,119 @@ async def chat_websocket_endpoint(
         await websocket.close()
         return
     
-    connected_clients.setdefault(chat_id, set()).add(websocket)
-    print(f"[Connected Clients] {connected_clients}")
+    # loads the member list once for this connection; later sends hit the cache
+    member_ids = []
+    if chat_type == 'private':
+        try:
+            member_ids = (await pvt_chat_manager.get_chat_membership(chat_id))['member_ids']
+        except ChatNotFoundException:
+            pass
+        is_member = current_user.id in member_ids
+    elif chat_type == 'group':
+        # one cached lookup; a group's member list is never loaded, and its
+        # members' presence is not followed (that would be O(members))
+        is_member = await group_chat_manager.is_member(chat_id, current_user.id)
+    else:
+        is_member = False
+    if not is_member:
+        await websocket.send_json({"error": "You are not a participant in this chat."})
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    connection = ClientConnection(websocket, current_user.id, connections)
+    await register_client(chat_id, member_ids, connection)
+    logger.debug(
+        'User %s connected to %s chat %s (%d local sockets)',
+        current_user.id, chat_type, chat_id, len(connected_clients.get(chat_id, ())),
+    )
     
     try:
         while True:
             message = await websocket.receive_text()
-            
-            #  Rate limit check 
-            now = time.time()
-            timestamps = message_timestamps[current_user.id]
-            timestamps.append(now)
-            
-            # Remove timestamps outside the rate limit interval
-            while timestamps and now - timestamps[0] > INTERVAL:
-                timestamps.popleft()
-            if len(timestamps) > RATE_LIMIT:
-                await websocket.send_json({"error": "Too many messages. Please wait."})
+            metrics.ws_frames_received.inc()
+            logger.debug('Frame from user %s in chat %s', current_user.id, chat_id, extra=SAMPLED)
+            presence.heartbeat(current_user.id, connection)
+
+            # json_str = message.decode("utf-8")  # decode bytes -> string
+            try:
+                data = codec.loads(message)
+            except ValueError:
+                data = None
+            if not isinstance(data, dict):
+                connection.send(INVALID_FRAME)
+                continue
+            if data.get('type') == 'ping':
+                continue
+            if data.get('type') == 'receipt':
+                # in memory only; written and broadcast on the next receipts tick
+                allowed, _ = await limiter.hit(
+                    settings.WS_RATE_LIMIT_RECEIPTS, 'ws:receipt', current_user.id
+                )
+                if not allowed:
+                    connection.send(RATE_LIMITED_FRAME)
+                    continue
+                try:
+                    if data['kind'] not in RECEIPT_KINDS:
+                        raise ValueError(data['kind'])
+                    receipts.advance(
+                        chat_id, current_user.id, data['kind'],
+                        parse_watermark_time(data['created_at']), str(data['message_id']),
+                    )
+                except (KeyError, TypeError, ValueError):
+                    connection.send(INVALID_RECEIPT_FRAME)
+                continue
+
+            #  Rate limit check: per user, then per chat
+            allowed, _ = await limiter.hit(
+                settings.WS_RATE_LIMIT_PER_USER, 'ws:user', current_user.id
+            )
+            if allowed:
+                allowed, _ = await limiter.hit(
+                    settings.WS_RATE_LIMIT_PER_CHAT, 'ws:chat', chat_id
+                )
+            if not allowed:
+                connection.send(RATE_LIMITED_FRAME)
                 continue
             #  ==========================
             
-            # json_str = message.decode("utf-8")  # decode bytes -> string
-            data = json.loads(message)
             # print(f"[--------] Received message: {data.keys()}")
-            if chat_type == 'private':
-                # print(f'[-] current_user: {current_user}')
-                new_message = await pvt_chat_manager.create_message(
-                    current_user.id, chat_id, 
-                    data['message'], 
-                    data['encrypted_key_sender'],
-                    data['encrypted_key_receiver'],
-                    data['iv'],
-                )
+            try:
+                if chat_type == 'private':
+                    # print(f'[-] current_user: {current_user}')
+                    new_message = await pvt_chat_manager.create_message(
+                        current_user.id, chat_id, 
+                        data['message'], 
+                        data['encrypted_key_sender'],
+                        data['encrypted_key_receiver'],
+                        data['iv'],
+                    )
+                else:
+                    # one ciphertext under the group key, no per-member keys
+                    new_message = await group_chat_manager.create_message(
+                        current_user.id, chat_id,
+                        data['message'],
+                        data['iv'],
+                        data['key_epoch'],
+                    )
+            except (KeyError, TypeError, ValueError):
+                # missing fields, or values the message model rejects
+                connection.send(INVALID_MESSAGE_FRAME)
+                continue
+            except HTTPException as e:
+                # e.g. a rotated group key: tell the sender, keep the socket
+                connection.send(codec.encode_frame({"error": e.detail}))
+                continue
 
-            serialized_message = message_serializer(new_message.model_dump())
-            # print("[Response Message]", serialized_message)
-    
-            for client_ws in connected_clients[chat_id]:
-                print(f"client_ws: {client_ws}")
-                await client_ws.send_json(serialized_message)
+            # encoded once, the same frame goes to every recipient
+            frame = codec.encode_frame(new_message)
+
+            # deliver to our own sockets directly, publish once for the other workers
+            deliver_local(chat_id, frame)
+            await backplane.publish(chat_channel(chat_id), frame.encode())
     
     except WebSocketDisconnect:
-        print("[+] WebSocket connection closed")
+        logger.debug('User %s disconnected from chat %s', current_user.id, chat_id)
         
     finally:
-        print(f"Removed disconnected client websocket: {websocket} from the Chat id: {chat_id}")
         # remove clients
-        connected_clients[chat_id].remove(websocket)
-        
-        if not connected_clients[chat_id]:
-            del connected_clients[chat_id]
-            print(f"[+] No more clients connected to chat ID: {chat_id}. Removed from connected_clients.")
-        print("Finally remaining clints:", connected_clients)
\ No newline at end of file
+        await unregister_client(chat_id, connection)
\ No newline at end of file